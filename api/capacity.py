@@ -0,0 +1,38 @@
+"""Parse concurrency of an API worker, reported to the load balancer by ``/ready``."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class ParseSlots:
+    """Run at most ``limit`` parses at once, counting the running and waiting ones.
+
+    Only touched from the event loop, so the counters need no lock.
+    """
+
+    def __init__(self, limit: int = 1):
+        self.limit = limit
+        self.in_flight = 0
+        self.queue_depth = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.queue_depth += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "capacity": self.limit,
+        }
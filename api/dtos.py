@@ -1,8 +1,11 @@
 from pydantic import BaseModel
-from dtos import InvoiceData
+from dtos import InvoiceData, ParseProfile
 
 
 class InvoiceParseResponse(BaseModel):
     success: bool
     data: InvoiceData | None = None
     error_message: str | None = None
+    profile: ParseProfile | None = None
+    # qr, regex, ocr_fallback, index or no_data
+    pipeline_path: str | None = None
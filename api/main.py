@@ -1,9 +1,78 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Header
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from use_cases import ParseInvoiceUseCase
+from dtos import ParseProfile
+from utils import (
+    Deadline,
+    METRICS,
+    InvalidPDF,
+    ResourceLimitExceeded,
+    Profiler,
+    PROFILER_MODES,
+    track_path,
+)
+from pathlib import Path
 from io import BytesIO
+from contextlib import asynccontextmanager
+import asyncio
+import os
+from .capacity import ParseSlots
 from .dtos import InvoiceParseResponse
+from .warmup import warm_up
 
-app = FastAPI()
+# Server-side time budget (seconds) per parse, keep it below the gateway timeout
+DEFAULT_TIME_BUDGET = float(os.environ.get("INVOICE_API_TIME_BUDGET", "25"))
+
+# Requests may ask to be profiled (X-Invoice-Profiler header) only when this is set
+PROFILE_DIR = os.environ.get("INVOICE_API_PROFILE_DIR")
+_profilers: dict[str, Profiler] = {}
+
+# Status of each InvalidPDF code, anything else is 422
+INVALID_PDF_STATUS = {"empty": 400, "not_pdf": 415}
+
+# Parse a fixture before reporting ready, disable with INVOICE_API_WARMUP=0
+WARMUP = os.environ.get("INVOICE_API_WARMUP", "1") != "0"
+
+# PyMuPDF is not thread-safe, each worker process parses one document at a time
+PARSE_SLOTS = ParseSlots(1)
+_warmed_up = asyncio.Event()
+
+
+def _profiler(mode: str | None) -> Profiler | None:
+    """Per-worker profiler aggregating the profiled requests of ``mode``."""
+    if not PROFILE_DIR or mode not in PROFILER_MODES:
+        return None
+    return _profilers.setdefault(mode, Profiler(mode))
+
+
+def _write_profiles():
+    """Write the report of each profiler of this worker to its own directory."""
+    for mode, profiler in _profilers.items():
+        profiler.write(Path(PROFILE_DIR) / f"{mode}-{os.getpid()}")
+
+
+async def _warm_up():
+    if WARMUP:
+        # Holds a parse slot, requests arriving meanwhile wait in the queue
+        async with PARSE_SLOTS.acquire():
+            await run_in_threadpool(warm_up)
+    _warmed_up.set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In the background, so /health and /ready answer while the worker warms up
+    _warmed_up.clear()
+    task = asyncio.create_task(_warm_up())
+    yield
+    task.cancel()
+    # Once per worker at shutdown, not on the event loop after every request
+    if _profilers:
+        await run_in_threadpool(_write_profiles)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/health", status_code=200)
@@ -11,25 +80,71 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """503 until this worker warmed up, then its parse load for capacity routing."""
+    ready = _warmed_up.is_set()
+    return JSONResponse(
+        {"status": "ready" if ready else "warming_up", **PARSE_SLOTS.snapshot()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", status_code=200)
+async def metrics():
+    """Counters of this worker process (guard trips, rejected PDFs, ...)."""
+    return METRICS.snapshot()
+
+
 @app.post("/invoice/parse", status_code=200)
 async def parse_invoice(
     file: UploadFile = File(...),
     cuit: str | None = Form(None),
+    profile: ParseProfile = Form(ParseProfile.BALANCED),
+    time_budget: float | None = Form(None, gt=0),
+    x_invoice_profiler: str | None = Header(None),
 ) -> InvoiceParseResponse:
+    # The budget starts counting when the request arrives
+    deadline = Deadline(time_budget or DEFAULT_TIME_BUDGET)
     try:
         file_content = await file.read()
         file_bytes_io = BytesIO(file_content)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
 
+    profiler = _profiler(x_invoice_profiler)
+
+    def parse():
+        # Profiled in the thread that parses
+        with profiler.document() if profiler else track_path() as document:
+            invoice_data = ParseInvoiceUseCase.parse_invoice(
+                file_bytes_io, own_cuit=cuit, profile=profile, deadline=deadline
+            )
+        return invoice_data, document
+
     try:
-        invoice_data = ParseInvoiceUseCase.parse_invoice(file_bytes_io, own_cuit=cuit)
+        # Off the event loop, so /health and /ready keep answering during parses
+        async with PARSE_SLOTS.acquire():
+            invoice_data, document = await run_in_threadpool(parse)
+    except InvalidPDF as e:
+        raise HTTPException(
+            status_code=INVALID_PDF_STATUS.get(e.code, 422),
+            detail={"code": e.code, "message": str(e)},
+        )
+    except ResourceLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=f"Document too large: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing invoice: {e}")
 
     if not invoice_data:
         return InvoiceParseResponse(
-            success=False, data=None, error_message="No data extracted from invoice."
+            success=False,
+            data=None,
+            error_message="No data extracted from invoice.",
+            profile=profile,
+            pipeline_path=document.path,
         )
 
-    return InvoiceParseResponse(success=True, data=invoice_data)
+    return InvoiceParseResponse(
+        success=True, data=invoice_data, profile=profile, pipeline_path=document.path
+    )
@@ -0,0 +1,52 @@
+"""Per-worker warm-up parse, so the first real invoices do not pay the cold start."""
+
+import logging
+import time
+from io import BytesIO
+
+from dtos import ParseProfile
+from use_cases import ParseInvoiceUseCase
+
+logger = logging.getLogger(__name__)
+
+# Enough digital text for the regex stage, but no CUIT so the OCR fallback runs too
+FIXTURE_LINES = (
+    "FACTURA B",
+    "COD. 06",
+    "Punto de Venta: 00001 Comp. Nro: 00000001",
+    "Fecha de Emision: 01/01/2025",
+    "Razon Social: PROVEEDOR DE PRUEBA S.A.",
+    "Importe Neto Gravado: $ 1.000,00",
+    "Importe Total: $ 1.210,00",
+)
+
+
+def fixture_pdf() -> bytes:
+    """One-page invoice with digital text and an image for the QR scan."""
+    import pymupdf
+    from PIL import Image
+
+    doc = pymupdf.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_textbox(pymupdf.Rect(40, 50, 555, 400), "\n".join(FIXTURE_LINES))
+    image = BytesIO()
+    Image.new("L", (200, 200), "white").save(image, "PNG")
+    page.insert_image(pymupdf.Rect(40, 690, 140, 790), stream=image.getvalue())
+    return doc.tobytes()
+
+
+def warm_up() -> float:
+    """Parse the fixture through the whole pipeline, return the seconds it took.
+
+    Failures are only logged: a worker missing an engine still serves requests.
+    """
+    started = time.perf_counter()
+    try:
+        ParseInvoiceUseCase.parse_record(
+            BytesIO(fixture_pdf()), profile=ParseProfile.BALANCED
+        )
+    except Exception as e:
+        logger.warning(f"Warm-up parse failed: {e}")
+    elapsed = time.perf_counter() - started
+    logger.info(f"Worker warmed up in {elapsed:.2f} seconds")
+    return elapsed
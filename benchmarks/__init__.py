@@ -0,0 +1 @@
+"""Benchmarks for the parsing pipeline (not shipped with the package)."""
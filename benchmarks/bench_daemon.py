@@ -0,0 +1,129 @@
+"""Latency of ``invoice-parse`` per file: cold runs versus ``invoice-daemon``.
+
+Three ways to parse the same documents, one after the other:
+
+- ``cold``: ``python -m cli.parse --no-daemon``, interpreter start, imports and
+  cold engines on every file
+- ``client``: ``python -m cli.parse --daemon``, a fresh interpreter sending the
+  path to a running daemon
+- ``socket``: ``request_parse`` from this process, the daemon round trip alone
+
+    uv run python -m benchmarks.bench_daemon --runs 20
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import generate_corpus, load_corpus
+from cli.daemon import DaemonUnavailable, request, request_parse
+
+DEFAULT_CORPUS = Path(__file__).parent / "corpus"
+MODES = ("cold", "client", "socket")
+DAEMON_STARTUP_TIMEOUT = 60.0
+
+
+def _cli(pdf: Path, *options: str) -> float:
+    command = [sys.executable, "-m", "cli.parse", "--pdf", str(pdf), *options]
+    started = time.perf_counter()
+    subprocess.run(command, check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def _socket(pdf: Path, socket_path: Path) -> float:
+    started = time.perf_counter()
+    request_parse(pdf, socket_path=socket_path)
+    return time.perf_counter() - started
+
+
+def _wait_for_daemon(process: subprocess.Popen, socket_path: Path):
+    started = time.monotonic()
+    while time.monotonic() - started < DAEMON_STARTUP_TIMEOUT:
+        if process.poll() is not None:
+            raise RuntimeError(f"Daemon exited with code {process.returncode}")
+        try:
+            request({"op": "ping"}, socket_path, timeout=1)
+            return
+        except (DaemonUnavailable, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Daemon not ready after {DAEMON_STARTUP_TIMEOUT:.0f} s")
+
+
+def _summary(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "runs": len(latencies),
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "mean_ms": 1000 * statistics.fmean(latencies),
+    }
+
+
+def run(pdfs: list[Path], runs: int, workers: int) -> dict:
+    """Parse ``runs`` files (cycling over ``pdfs``) in each mode."""
+    files = [pdfs[i % len(pdfs)] for i in range(runs)]
+    latencies = {mode: [] for mode in MODES}
+    latencies["cold"] = [_cli(pdf, "--no-daemon") for pdf in files]
+
+    with tempfile.TemporaryDirectory() as socket_dir:
+        socket_path = Path(socket_dir) / "daemon.sock"
+        command = [
+            sys.executable,
+            "-m",
+            "cli.daemon",
+            "--socket",
+            str(socket_path),
+            "--workers",
+            str(workers),
+        ]
+        daemon = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            _wait_for_daemon(daemon, socket_path)
+            latencies["client"] = [
+                _cli(pdf, "--daemon", str(socket_path)) for pdf in files
+            ]
+            latencies["socket"] = [_socket(pdf, socket_path) for pdf in files]
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    return {mode: _summary(values) for mode, values in latencies.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold CLI vs daemon latency")
+    parser.add_argument("--corpus", type=str, default=str(DEFAULT_CORPUS))
+    parser.add_argument(
+        "--count", type=int, default=40, help="Corpus size when it is generated"
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Files parsed per mode")
+    parser.add_argument("--workers", type=int, default=1, help="Daemon workers")
+    parser.add_argument("--json", type=str, help="Also write the results here")
+    args = parser.parse_args()
+
+    if not (Path(args.corpus) / "manifest.json").is_file():
+        print(f"Generating {args.count} documents in {args.corpus}")
+        generate_corpus(args.corpus, count=args.count)
+    pdfs = [Path(args.corpus) / document.file for document in load_corpus(args.corpus)]
+
+    results = run(pdfs, args.runs, args.workers)
+    cold = results["cold"]["p50_ms"]
+    print(f"{'mode':<8} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'vs cold':>8}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<8} {result['runs']:>5} {result['p50_ms']:>9.1f} "
+            f"{result['p95_ms']:>9.1f} {result['mean_ms']:>9.1f} "
+            f"{cold / result['p50_ms']:>7.1f}x"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Per-document cost of handing PDF bytes to a worker process.
+
+Compares sending the bytes pickled through the executor (what ``invoice-batch``
+does for paths read in the worker, and any caller submitting bytes) with writing
+them once to shared memory and sending only the handle, which the worker reads
+in place (``invoice-batch`` over a .zip). Each round trip submits one document
+and waits for the worker's answer, the worker only touches the first and last
+byte unless ``--open`` makes it open the document with PyMuPDF.
+
+    uv run python -m benchmarks.bench_ipc --sizes 0.1 1 5 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from utils.shm import SharedDocument, SharedDocuments, open_shared
+
+TRANSPORTS = ("pickle", "shm")
+DEFAULT_SIZES_MB = (0.1, 1.0, 5.0, 20.0)
+
+
+def _touch(content, open_document: bool) -> int:
+    if open_document:
+        import pymupdf
+
+        with pymupdf.open(stream=content) as doc:
+            return len(doc)
+    return content[0] + content[-1]
+
+
+def _receive_pickled(data: bytes, open_document: bool) -> int:
+    return _touch(data, open_document)
+
+
+def _receive_shared(document: SharedDocument, open_document: bool) -> int:
+    with open_shared(document) as buffer:
+        return _touch(buffer.getvalue(), open_document)
+
+
+def _payload(size: int, pdf: bytes | None) -> bytes:
+    """``size`` bytes, a real PDF padded with a trailing comment when given."""
+    if pdf is None:
+        return os.urandom(size)
+    return pdf + b"\n%" + b"0" * max(0, size - len(pdf) - 2)
+
+
+def run(
+    transport: str,
+    data: bytes,
+    executor: ProcessPoolExecutor,
+    repeat: int,
+    open_document: bool = False,
+) -> dict:
+    """Round trips of ``data`` through ``transport``, shared memory setup included."""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if transport == "pickle":
+            executor.submit(_receive_pickled, data, open_document).result()
+        else:
+            with SharedDocuments() as shared:
+                document = shared.put(data)
+                executor.submit(_receive_shared, document, open_document).result()
+        latencies.append(time.perf_counter() - started)
+    median = statistics.median(latencies)
+    return {
+        "transport": transport,
+        "size_mb": len(data) / 2**20,
+        "median_us": 1e6 * median,
+        "min_us": 1e6 * min(latencies),
+        "mb_per_sec": len(data) / 2**20 / median,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pickle vs shared memory handoff")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=float,
+        default=list(DEFAULT_SIZES_MB),
+        help="Document sizes in MiB",
+    )
+    parser.add_argument("--repeat", type=int, default=50, help="Round trips per size")
+    parser.add_argument(
+        "--pdf", type=str, help="Pad this PDF to each size instead of random bytes"
+    )
+    parser.add_argument(
+        "--open", action="store_true", help="Open the document with PyMuPDF"
+    )
+    parser.add_argument("--json", type=str, help="Also write the results here")
+    args = parser.parse_args()
+    if args.open and not args.pdf:
+        parser.error("--open needs --pdf")
+
+    pdf = Path(args.pdf).read_bytes() if args.pdf else None
+    results = []
+    with ProcessPoolExecutor(1, mp_context=get_context("forkserver")) as executor:
+        # Start the worker before timing anything
+        executor.submit(_receive_pickled, b"\0", False).result()
+        for size_mb in args.sizes:
+            data = _payload(int(size_mb * 2**20), pdf)
+            for transport in TRANSPORTS:
+                results.append(run(transport, data, executor, args.repeat, args.open))
+
+    print(f"{'MiB':>7} {'transport':<9} {'median us':>11} {'min us':>10} {'MiB/s':>9}")
+    for result in results:
+        print(
+            f"{result['size_mb']:>7.1f} {result['transport']:<9} "
+            f"{result['median_us']:>11.0f} {result['min_us']:>10.0f} "
+            f"{result['mb_per_sec']:>9.0f}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
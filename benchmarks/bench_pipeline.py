@@ -0,0 +1,275 @@
+"""Throughput, latency and memory of the parsing pipeline over the synthetic corpus.
+
+Each suite runs in a fresh process so peak memory is not shared between them:
+
+- ``text``: ``OCRService.extract_digital_text``
+- ``qr``: ``QRParser.extract_and_parse``
+- ``regex``: ``RegexParser.extract_data`` over the pre-extracted text
+- ``use_case``: ``ParseInvoiceUseCase.parse_record`` end to end
+- ``batch``: ``invoice-batch`` over the corpus directory
+
+Results can be stored as a baseline and later runs checked against it; the check
+exits with status 1 when latency, throughput or peak memory regress beyond the
+thresholds. Baselines only compare runs on the same machine.
+
+    uv run python -m benchmarks.bench_pipeline --save-baseline
+    uv run python -m benchmarks.bench_pipeline --check
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.corpus import generate_corpus, load_corpus
+
+SUITES = ("text", "qr", "regex", "use_case", "batch")
+DEFAULT_CORPUS = Path(__file__).parent / "corpus"
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Lower is better for latencies and memory, higher for throughput
+LATENCY_METRICS = ("p50_ms", "p95_ms", "mean_ms")
+THROUGHPUT_METRIC = "docs_per_sec"
+MEMORY_METRIC = "peak_rss_mib"
+
+
+def _rss_mib(ru_maxrss: int) -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return ru_maxrss / 2**20 if sys.platform == "darwin" else ru_maxrss / 1024
+
+
+def _summary(latencies: list[float], errors: int, peak_rss_mib: float) -> dict:
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return {
+        "docs": len(latencies),
+        "errors": errors,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * p95,
+        "mean_ms": 1000 * total / len(latencies),
+        "docs_per_sec": len(latencies) / total if total else 0.0,
+        "peak_rss_mib": peak_rss_mib,
+    }
+
+
+def _stage(name: str, profile: str):
+    """Callable parsing one PDF (bytes) for suite ``name``."""
+    from dtos import ParseProfile
+    from parsers import QRParser, RegexParser
+    from services import OCRService
+    from use_cases import ParseInvoiceUseCase
+
+    if name == "text":
+        return lambda pdf: OCRService(BytesIO(pdf)).extract_digital_text()
+    if name == "qr":
+        return lambda pdf: QRParser(BytesIO(pdf)).extract_and_parse()
+    if name == "regex":
+        return lambda text: RegexParser(text).extract_data()
+    if name == "use_case":
+        return lambda pdf: ParseInvoiceUseCase.parse_record(
+            BytesIO(pdf), profile=ParseProfile(profile)
+        )
+    raise ValueError(f"Unknown suite {name!r}")
+
+
+def run_suite(name: str, corpus_dir: str, profile: str, repeat: int) -> dict:
+    """Run one in-process suite, keeping each document's best time over ``repeat``."""
+    from services import OCRService
+    from utils import preload_dependencies
+
+    preload_dependencies()
+    inputs = [
+        (Path(corpus_dir) / document.file).read_bytes()
+        for document in load_corpus(corpus_dir)
+    ]
+    if name == "regex":
+        texts = [OCRService(BytesIO(pdf)).extract_digital_text() for pdf in inputs]
+        inputs = [text for text in texts if text]
+
+    stage = _stage(name, profile)
+    latencies = []
+    errors = 0
+    for document in inputs:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                stage(document)
+            except Exception:
+                errors += 1
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best)
+    peak = _rss_mib(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return _summary(latencies, errors, peak)
+
+
+def run_batch(corpus_dir: str, profile: str, workers: int) -> dict:
+    """Run ``invoice-batch`` over the corpus as a subprocess."""
+    documents = len(load_corpus(corpus_dir))
+    with tempfile.TemporaryDirectory() as output_dir:
+        command = [
+            sys.executable,
+            "-m",
+            "cli.batch",
+            "--input_dir",
+            str(corpus_dir),
+            "--output_file",
+            str(Path(output_dir) / "batch.xlsx"),
+            "--profile",
+            profile,
+            "--workers",
+            str(workers),
+        ]
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        # wait4 reports the peak RSS of the batch process and its workers
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+    per_doc = elapsed / documents
+    return {
+        "docs": documents,
+        "errors": int(os.waitstatus_to_exitcode(status) != 0),
+        "p50_ms": 1000 * per_doc,
+        "p95_ms": 1000 * per_doc,
+        "mean_ms": 1000 * per_doc,
+        "docs_per_sec": documents / elapsed,
+        "peak_rss_mib": _rss_mib(usage.ru_maxrss),
+    }
+
+
+def compare(
+    baseline: dict,
+    results: dict,
+    max_slowdown: float = 0.25,
+    max_memory_growth: float = 0.25,
+    min_delta_ms: float = 1.0,
+) -> list[str]:
+    """Regressions of ``results`` against ``baseline`` beyond the thresholds.
+
+    Latency changes under ``min_delta_ms`` are ignored, they are timer noise.
+    """
+    regressions = []
+    for suite, current in results.items():
+        reference = baseline.get(suite)
+        if not reference:
+            continue
+        for metric in LATENCY_METRICS:
+            if (
+                current[metric] > reference[metric] * (1 + max_slowdown)
+                and current[metric] - reference[metric] > min_delta_ms
+            ):
+                regressions.append(
+                    f"{suite}.{metric}: {current[metric]:.1f} > "
+                    f"{reference[metric]:.1f} (+{max_slowdown:.0%})"
+                )
+        minimum = reference[THROUGHPUT_METRIC] / (1 + max_slowdown)
+        if current[THROUGHPUT_METRIC] < minimum:
+            regressions.append(
+                f"{suite}.{THROUGHPUT_METRIC}: {current[THROUGHPUT_METRIC]:.2f} < "
+                f"{minimum:.2f}"
+            )
+        if current[MEMORY_METRIC] > reference[MEMORY_METRIC] * (1 + max_memory_growth):
+            regressions.append(
+                f"{suite}.{MEMORY_METRIC}: {current[MEMORY_METRIC]:.1f} > "
+                f"{reference[MEMORY_METRIC]:.1f} (+{max_memory_growth:.0%})"
+            )
+    return regressions
+
+
+def _print_results(results: dict):
+    print(
+        f"{'suite':<10} {'docs':>5} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'mean ms':>9} {'docs/s':>8} {'peak MiB':>9}"
+    )
+    for suite, result in results.items():
+        print(
+            f"{suite:<10} {result['docs']:>5} {result['errors']:>6} "
+            f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+            f"{result['mean_ms']:>9.1f} {result['docs_per_sec']:>8.2f} "
+            f"{result['peak_rss_mib']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite")
+    parser.add_argument("--corpus", type=str, default=str(DEFAULT_CORPUS))
+    parser.add_argument(
+        "--count", type=int, default=40, help="Corpus size when it is generated"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--suites", nargs="+", choices=SUITES, default=list(SUITES), metavar="SUITE"
+    )
+    parser.add_argument("--profile", type=str, default="balanced")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N per document")
+    parser.add_argument("--workers", type=int, default=2, help="invoice-batch workers")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Fail on regressions")
+    parser.add_argument("--max-slowdown", type=float, default=0.25)
+    parser.add_argument("--max-memory-growth", type=float, default=0.25)
+    parser.add_argument("--json", type=str, help="Also write the results here")
+    args = parser.parse_args()
+
+    if not (Path(args.corpus) / "manifest.json").is_file():
+        print(f"Generating {args.count} documents in {args.corpus}")
+        generate_corpus(args.corpus, count=args.count, seed=args.seed)
+
+    results = {}
+    for suite in args.suites:
+        if suite == "batch":
+            results[suite] = run_batch(args.corpus, args.profile, args.workers)
+            continue
+        # A fresh process per suite so imports and peak memory are not shared
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            results[suite] = executor.submit(
+                run_suite, suite, args.corpus, args.profile, args.repeat
+            ).result()
+    _print_results(results)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline = {
+            "machine": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            "suites": results,
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2))
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.check:
+        if not baseline_path.is_file():
+            sys.exit(f"No baseline at {baseline_path}, run with --save-baseline first")
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare(
+            baseline["suites"], results, args.max_slowdown, args.max_memory_growth
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Allocation and peak memory of the batch result path.
+
+Compares the previous path (pydantic ``InvoiceData`` with amount debug info per
+invoice, ``model_dump()`` dicts, DataFrame from a list of dicts) with the
+current one (``InvoiceRecord`` slots dataclasses, no debug info, columnar
+``InvoiceColumns`` accumulator). Only the result path is measured: the regex
+parser runs over an in-memory text so PDF I/O does not dominate.
+
+    uv run python -m benchmarks.bench_results --n 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dtos import ImportesResult, InvoiceColumns
+from parsers import RegexParser
+
+SAMPLE_TEXT = """FACTURA A
+COD. 01
+Punto de Venta: 00001 Comp. Nro: 00000301
+Fecha de Emision: 11/07/2025
+CUIT: 20161247953
+Orden de Compra: 4612345678
+1 ARMF121C2 URANGA Man. HSS MACHO 51,000.78 51,000.78
+2 ARMF181C2 URANGA Man. HSS MACHO 89,645.57 89,645.57
+Subtotal 140,646.35
+IVA 21.00% 29,535.73
+TOTAL $ 170,182.08"""
+
+EXTRA = {"pdf_path": "pdf_path_{}.pdf", "profile": "balanced"}
+
+
+def legacy_path(n: int):
+    rows = []
+    for i in range(n):
+        parser = RegexParser(SAMPLE_TEXT, debug=True)
+        record = parser.extract_data()
+        importes = parser.extract_importes()
+        ImportesResult(
+            importe_bruto=importes.importe_bruto,
+            importe_neto=importes.importe_neto,
+            debug=importes.debug,
+        )
+        data_dict = record.to_model().model_dump()
+        data_dict["pdf_path"] = EXTRA["pdf_path"].format(i)
+        data_dict["profile"] = EXTRA["profile"]
+        data_dict["processing_time_sec"] = 0.01
+        rows.append(data_dict)
+
+    import pandas as pd
+
+    return pd.DataFrame(rows)
+
+
+def columnar_path(n: int):
+    columns = InvoiceColumns(
+        extra={"pdf_path": "str", "profile": "str", "processing_time_sec": "float"}
+    )
+    for i in range(n):
+        parser = RegexParser(SAMPLE_TEXT)
+        record = parser.extract_data()
+        parser.extract_importes()
+        columns.append(
+            record,
+            pdf_path=EXTRA["pdf_path"].format(i),
+            profile=EXTRA["profile"],
+            processing_time_sec=0.01,
+        )
+    return columns.to_dataframe()
+
+
+def measure(path, n: int) -> dict:
+    import pandas  # noqa: F401  (import cost is not part of the measurement)
+
+    # Timed without tracing, tracemalloc slows allocations down by an order of magnitude
+    gc.collect()
+    started = time.perf_counter()
+    path(n)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    frame = path(n)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    live_blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    del frame
+    return {
+        "seconds": elapsed,
+        "peak_mib": peak / 2**20,
+        "live_blocks": live_blocks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch result path benchmark")
+    parser.add_argument("--n", type=int, default=20000, help="Invoices to simulate")
+    args = parser.parse_args()
+
+    print(f"{'path':<10} {'seconds':>9} {'peak MiB':>9} {'live blocks':>12}")
+    for name, path in (("pydantic", legacy_path), ("columnar", columnar_path)):
+        result = measure(path, args.n)
+        print(
+            f"{name:<10} {result['seconds']:>9.2f} {result['peak_mib']:>9.1f} "
+            f"{result['live_blocks']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Reproducible synthetic AFIP invoice corpus.
+
+Generates PDF fixtures covering the mix seen in production plus a
+``manifest.json`` with the expected fields of each document:
+
+- ``qr``: digital invoice with the AFIP QR (valid ``p=`` base64 payload)
+- ``digital``: digital invoice without QR
+- ``scanned``: image-only invoice (page rendered to a JPEG, no text layer)
+- ``multipage``: statement of 45-60 pages with the QR on the last one
+- ``large_image``: QR invoice with a large embedded letterhead photo
+
+The same seed always produces the same files. The QR needs ``segno``
+(``uv sync --group bench``).
+
+    uv run python -m benchmarks.corpus --output benchmarks/corpus --count 40
+"""
+
+import argparse
+import base64
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
+from pathlib import Path
+
+KINDS = ("qr", "digital", "scanned", "multipage", "large_image")
+# Share of each kind in the default corpus
+DEFAULT_MIX = {
+    "qr": 0.5,
+    "digital": 0.2,
+    "scanned": 0.1,
+    "multipage": 0.05,
+    "large_image": 0.15,
+}
+
+AFIP_QR_URL = "https://www.afip.gob.ar/fe/qr/?p="
+OWN_CUIT = "30540080298"
+# AFIP code -> letter
+INVOICE_TYPES = {1: "A", 6: "B", 11: "C", 51: "M"}
+CUIT_WEIGHTS = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+SCAN_DPI = 150
+LARGE_IMAGE_SIDE = 4000
+
+
+@dataclass
+class CorpusDocument:
+    file: str
+    kind: str
+    pages: int
+    expected: dict = field(default_factory=dict)
+
+
+def _cuit(rng: random.Random, prefix: int) -> str:
+    """Random CUIT with a valid check digit."""
+    while True:
+        base = f"{prefix}{rng.randrange(10**8):08d}"
+        remainder = 11 - sum(int(d) * w for d, w in zip(base, CUIT_WEIGHTS)) % 11
+        check = {11: 0, 10: None}.get(remainder, remainder)
+        if check is not None:
+            return f"{base}{check}"
+
+
+def _amount(value: float) -> str:
+    """Argentine format: 170.182,08"""
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _invoice(rng: random.Random, number: int) -> dict:
+    tipo_cmp = rng.choice(list(INVOICE_TYPES))
+    items = [
+        (
+            f"ART{rng.randrange(1000, 9999)}",
+            rng.randrange(1, 20),
+            rng.randrange(100, 90000) + rng.randrange(100) / 100,
+        )
+        for _ in range(rng.randrange(2, 8))
+    ]
+    neto = round(sum(quantity * price for _, quantity, price in items), 2)
+    iva = round(neto * 0.21, 2)
+    return {
+        "cuit": _cuit(rng, rng.choice((20, 27, 30, 33))),
+        "tipo_cmp": tipo_cmp,
+        "letra": INVOICE_TYPES[tipo_cmp],
+        "pto_vta": rng.randrange(1, 20),
+        "nro": number,
+        "fecha": f"2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+        "items": items,
+        "importe_neto": neto,
+        "iva": iva,
+        "importe_bruto": round(neto + iva, 2),
+    }
+
+
+def _expected(invoice: dict) -> dict:
+    return {
+        "cuit": invoice["cuit"],
+        "tipo_cmp": invoice["tipo_cmp"],
+        "letra": invoice["letra"],
+        "referencia": f"{invoice['pto_vta']:04d}-{invoice['nro']:08d}",
+        "fecha": invoice["fecha"],
+        "importe_bruto": invoice["importe_bruto"],
+        "importe_neto": invoice["importe_neto"],
+    }
+
+
+def afip_qr_url(invoice: dict) -> str:
+    """QR content as printed by AFIP/ARCA (RG 4291)."""
+    payload = {
+        "ver": 1,
+        "fecha": invoice["fecha"],
+        "cuit": int(invoice["cuit"]),
+        "ptoVta": invoice["pto_vta"],
+        "tipoCmp": invoice["tipo_cmp"],
+        "nroCmp": invoice["nro"],
+        "importe": invoice["importe_bruto"],
+        "moneda": "PES",
+        "ctz": 1,
+        "tipoDocRec": 80,
+        "nroDocRec": int(OWN_CUIT),
+        "tipoCodAut": "E",
+        "codAut": 70000000000000 + invoice["nro"],
+    }
+    encoded = base64.b64encode(json.dumps(payload).encode()).decode()
+    return AFIP_QR_URL + encoded
+
+
+def _qr_png(url: str) -> bytes:
+    import segno
+
+    buffer = BytesIO()
+    segno.make(url, error="m").save(buffer, kind="png", scale=4, border=4)
+    return buffer.getvalue()
+
+
+def _header_lines(invoice: dict) -> list[str]:
+    fecha = "/".join(reversed(invoice["fecha"].split("-")))
+    return [
+        f"FACTURA {invoice['letra']}",
+        f"COD. {invoice['tipo_cmp']:02d}",
+        f"Punto de Venta: {invoice['pto_vta']:05d} Comp. Nro: {invoice['nro']:08d}",
+        f"Fecha de Emision: {fecha}",
+        "Razon Social: PROVEEDOR SINTETICO S.A.",
+        f"Domicilio Comercial: Av. Siempre Viva {invoice['nro'] % 9000} "
+        f"CUIT: {invoice['cuit']}",
+        f"Ingresos Brutos: {invoice['cuit']}",
+        f"CUIT cliente: {OWN_CUIT}",
+        "Condicion frente al IVA: Responsable Inscripto",
+    ]
+
+
+def _item_lines(items: list) -> list[str]:
+    return [
+        f"{number} {code} Articulo sintetico {quantity} "
+        f"{_amount(price)} {_amount(quantity * price)}"
+        for number, (code, quantity, price) in enumerate(items, start=1)
+    ]
+
+
+def _totals_lines(invoice: dict) -> list[str]:
+    return [
+        f"Importe Neto Gravado: $ {_amount(invoice['importe_neto'])}",
+        f"IVA 21%: $ {_amount(invoice['iva'])}",
+        f"Importe Total: $ {_amount(invoice['importe_bruto'])}",
+        f"CAE N°: {70000000000000 + invoice['nro']}",
+    ]
+
+
+def _write_lines(page, lines: list[str], top: float = 50):
+    import pymupdf
+
+    rect = pymupdf.Rect(40, top, PAGE_WIDTH - 40, PAGE_HEIGHT - 40)
+    page.insert_textbox(rect, "\n".join(lines), fontsize=9, fontname="helv")
+
+
+def _insert_qr(page, invoice: dict):
+    import pymupdf
+
+    qr = _qr_png(afip_qr_url(invoice))
+    page.insert_image(pymupdf.Rect(40, 690, 140, 790), stream=qr)
+
+
+def _large_image(rng: random.Random) -> bytes:
+    from PIL import Image
+
+    side = LARGE_IMAGE_SIDE
+    gradient = Image.linear_gradient("L").resize((side, side))
+    image = Image.merge(
+        "RGB",
+        (gradient, gradient.rotate(90), gradient.rotate(rng.choice((180, 270)))),
+    )
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _invoice_document(invoice: dict, with_qr: bool):
+    import pymupdf
+
+    doc = pymupdf.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    lines = _header_lines(invoice) + [""] + _item_lines(invoice["items"])
+    _write_lines(page, lines + [""] + _totals_lines(invoice))
+    if with_qr:
+        _insert_qr(page, invoice)
+    return doc
+
+
+def _scanned_document(invoice: dict):
+    """Render the QR invoice and keep only the bitmap, like a scanner would."""
+    import pymupdf
+
+    source = _invoice_document(invoice, with_qr=True)
+    pixmap = source[0].get_pixmap(dpi=SCAN_DPI, colorspace=pymupdf.csGRAY)
+    doc = pymupdf.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, stream=pixmap.tobytes("jpeg", jpg_quality=80))
+    return doc
+
+
+def _multipage_document(rng: random.Random, invoice: dict):
+    import pymupdf
+
+    doc = pymupdf.open()
+    pages = rng.randrange(45, 61)
+    for number in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        if number == 0:
+            lines = _header_lines(invoice)
+        else:
+            lines = [f"Hoja {number + 1} de {pages}"]
+        lines += [
+            f"{number * 60 + line} MOV{rng.randrange(10**6):06d} Movimiento de cuenta "
+            f"{_amount(rng.randrange(100, 10**6) / 100)}"
+            for line in range(60 if number else 40)
+        ]
+        if number == pages - 1:
+            lines += [""] + _totals_lines(invoice)
+            _write_lines(page, lines)
+            _insert_qr(page, invoice)
+        else:
+            _write_lines(page, lines)
+    return doc
+
+
+def build_document(rng: random.Random, kind: str, number: int):
+    """Return the pymupdf document and the invoice it represents."""
+    invoice = _invoice(rng, number)
+    if kind == "qr":
+        doc = _invoice_document(invoice, with_qr=True)
+    elif kind == "digital":
+        doc = _invoice_document(invoice, with_qr=False)
+    elif kind == "scanned":
+        doc = _scanned_document(invoice)
+    elif kind == "multipage":
+        doc = _multipage_document(rng, invoice)
+    elif kind == "large_image":
+        import pymupdf
+
+        doc = _invoice_document(invoice, with_qr=True)
+        letterhead = _large_image(rng)
+        doc[0].insert_image(pymupdf.Rect(380, 40, 555, 215), stream=letterhead)
+    else:
+        raise ValueError(f"Unknown document kind {kind!r}, use one of {KINDS}")
+    return doc, invoice
+
+
+def _kinds(count: int, mix: dict[str, float]) -> list[str]:
+    """``count`` kinds in the proportions of ``mix``, every kind at least once."""
+    total = sum(mix.values())
+    counts = {
+        kind: max(1, round(count * share / total)) for kind, share in mix.items()
+    }
+    # Rounding may miss the total, the most common kind absorbs the difference
+    counts[max(mix, key=mix.get)] += count - sum(counts.values())
+    return [kind for kind, kind_count in counts.items() for _ in range(kind_count)]
+
+
+def generate_corpus(
+    output_dir: str | Path,
+    count: int = 40,
+    seed: int = 0,
+    mix: dict[str, float] | None = None,
+) -> list[CorpusDocument]:
+    """Write ``count`` PDFs and ``manifest.json`` to ``output_dir``."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    documents = []
+    for number, kind in enumerate(_kinds(count, mix or DEFAULT_MIX), start=1):
+        doc, invoice = build_document(rng, kind, number)
+        name = f"{number:04d}_{kind}.pdf"
+        doc.set_metadata({})
+        doc.save(output_dir / name, garbage=3, deflate=True, no_new_id=True)
+        documents.append(CorpusDocument(name, kind, len(doc), _expected(invoice)))
+        doc.close()
+
+    manifest = {"seed": seed, "documents": [asdict(document) for document in documents]}
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return documents
+
+
+def load_corpus(corpus_dir: str | Path) -> list[CorpusDocument]:
+    manifest = json.loads((Path(corpus_dir) / "manifest.json").read_text())
+    return [CorpusDocument(**document) for document in manifest["documents"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic AFIP invoice corpus")
+    parser.add_argument("--output", type=str, default="benchmarks/corpus")
+    parser.add_argument("--count", type=int, default=40, help="Documents to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = generate_corpus(args.output, count=args.count, seed=args.seed)
+    for kind in KINDS:
+        print(f"{kind:<12} {sum(d.kind == kind for d in documents):>4}")
+    print(f"{len(documents)} documents written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
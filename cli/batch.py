@@ -2,39 +2,170 @@
 
 from pathlib import Path
 import glob
-import pandas as pd
+import os
 import time
+import zipfile
+from collections import deque
 from io import BytesIO
-from utils import setup_logging
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator
+from utils import (
+    setup_logging,
+    add_cpu_budget_args,
+    budget_from_args,
+    ResourceLimitExceeded,
+    InvalidPDF,
+    Profiler,
+    PROFILER_MODES,
+    SharedDocument,
+    SharedDocuments,
+    open_shared,
+)
 from use_cases import ParseInvoiceUseCase
+from services.invoice_index import INDEX_PATH_ENV
+from dtos import InvoiceColumns, InvoiceRecord, ParseProfile
 import argparse
-from concurrent.futures import ProcessPoolExecutor
-import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+# Extra columns added to the batch output
+BATCH_COLUMNS = {"pdf_path": "str", "profile": "str", "processing_time_sec": "float"}
+
+# Zip members held in shared memory at once; Docker's /dev/shm is 64 MB by default
+SHM_BUDGET_ENV = "INVOICE_SHM_BUDGET_MB"
+DEFAULT_SHM_BUDGET_MB = 32
+
 
+@contextmanager
+def _open_source(source: str | SharedDocument):
+    """File content of a PDF path, or of a document in shared memory read in place."""
+    if isinstance(source, SharedDocument):
+        with open_shared(source) as file_content:
+            yield file_content
+    else:
+        with open(source, "rb") as f:
+            yield BytesIO(f.read())
 
-def _process_batch_files(pdf_paths: list, own_cuit: str | None, logger):
-    """Process a single PDF file and return extracted invoice data."""
-    tmp_results = []
+
+def _source_name(source: str | SharedDocument) -> str:
+    return source.label if isinstance(source, SharedDocument) else source
+
+
+def _parse_file(
+    pdf_path: str | SharedDocument,
+    own_cuit: str | None,
+    logger,
+    profile: ParseProfile = ParseProfile.BALANCED,
+) -> tuple[InvoiceRecord | None, float]:
+    """Parse a single PDF file, return the invoice record and the elapsed seconds."""
+    current_time = time.time()
+    try:
+        with _open_source(pdf_path) as file_content:
+            invoice_record = ParseInvoiceUseCase.parse_record(
+                file_content, own_cuit=own_cuit, profile=profile
+            )
+    except (ResourceLimitExceeded, InvalidPDF) as e:
+        logger.warning(f"Descartada {_source_name(pdf_path)}: {e}")
+        invoice_record = None
+    elapsed_time = time.time() - current_time
+    if invoice_record:
+        logger.info(
+            f"Procesada {_source_name(pdf_path)} en {elapsed_time:.2f} segundos"
+        )
+    return invoice_record, elapsed_time
+
+
+def _process_file(
+    pdf_path: str,
+    own_cuit: str | None,
+    logger,
+    profile: ParseProfile = ParseProfile.BALANCED,
+) -> dict | None:
+    """Parse a single PDF file and return its invoice data as a dict."""
+    invoice_record, elapsed_time = _parse_file(pdf_path, own_cuit, logger, profile)
+    if not invoice_record:
+        return None
+
+    data_dict = invoice_record.to_dict()
+    data_dict["pdf_path"] = pdf_path
+    data_dict["profile"] = str(profile)
+    data_dict["processing_time_sec"] = round(elapsed_time, 2)
+    return data_dict
+
+
+def _process_batch_files(
+    pdf_paths: list[str | SharedDocument],
+    own_cuit: str | None,
+    logger,
+    profile: ParseProfile = ParseProfile.BALANCED,
+    profiler_mode: str | None = None,
+) -> tuple[InvoiceColumns, dict | None]:
+    """Process a batch of PDF files, given as paths or as shared memory documents.
+
+    Returns the extracted invoice data as columns and, when ``profiler_mode`` is
+    set, the profile data of the batch to be merged by the parent process.
+    """
+    columns = InvoiceColumns(extra=BATCH_COLUMNS)
+    profiler = Profiler(profiler_mode) if profiler_mode else None
     for pdf_path in pdf_paths:
-        if not Path(pdf_path).exists():
+        if not isinstance(pdf_path, SharedDocument) and not Path(pdf_path).exists():
             logger.warning(f"File not found: {pdf_path}")
             continue
 
-        with open(pdf_path, "rb") as f:
-            file_content = BytesIO(f.read())
+        with profiler.document() if profiler else nullcontext():
+            invoice_record, elapsed_time = _parse_file(
+                pdf_path, own_cuit, logger, profile
+            )
+        if invoice_record:
+            columns.append(
+                invoice_record,
+                pdf_path=_source_name(pdf_path),
+                profile=str(profile),
+                processing_time_sec=round(elapsed_time, 2),
+            )
+    return columns, profiler.data if profiler else None
 
-        current_time = time.time()
-        invoice_data = ParseInvoiceUseCase.parse_invoice(
-            file_content, own_cuit=own_cuit
-        )
-        if invoice_data:
-            data_dict = invoice_data.model_dump()
-            data_dict["pdf_path"] = pdf_path
-            elapsed_time = time.time() - current_time
-            data_dict["processing_time_sec"] = round(elapsed_time, 2)
-            logger.info(f"Procesada {pdf_path} en {elapsed_time:.2f} segundos")
-            tmp_results.append(data_dict)
-    return tmp_results
+
+def _zip_members(archive: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    return [
+        member
+        for member in archive.infolist()
+        if not member.is_dir() and member.filename.lower().endswith(".pdf")
+    ]
+
+
+def _shm_budget() -> int:
+    return int(float(os.environ.get(SHM_BUDGET_ENV, DEFAULT_SHM_BUDGET_MB)) * 2**20)
+
+
+def _windowed(
+    batches: Iterable[list],
+    load: Callable[[list], list],
+    submit: Callable[[list], Future],
+    shared: SharedDocuments,
+    max_in_flight: int,
+    shm_budget: int,
+    size: Callable[[object], int] = lambda item: 0,
+) -> Iterator[tuple[Future, list]]:
+    """Submit ``batches`` while at most ``max_in_flight`` of them are pending.
+
+    Yields each (future, sources) in submission order; the caller collects it and
+    releases its shared documents before the next batch is loaded. A batch is
+    only ``load``ed into shared memory when its ``size`` fits the ``shm_budget``
+    left by the pending ones (or nothing is pending), so an archive never sits
+    in /dev/shm as a whole.
+    """
+    pending = deque()
+    for batch in batches:
+        needed = sum(size(item) for item in batch)
+        while pending and (
+            len(pending) >= max_in_flight or shared.nbytes + needed > shm_budget
+        ):
+            yield pending.popleft()
+        sources = load(batch)
+        pending.append((submit(sources), sources))
+    while pending:
+        yield pending.popleft()
 
 
 def main():
@@ -44,12 +175,44 @@ def main():
         "--input_dir",
         type=str,
         required=True,
-        help="Ruta al directorio con archivos PDF de facturas",
+        help="Ruta al directorio o archivo .zip con archivos PDF de facturas",
     )
     parser.add_argument(
         "--output_file", type=str, required=True, help="Ruta al archivo Excel de salida"
     )
     parser.add_argument("--cuit", type=str, help="Own CUIT number", default=None)
+    parser.add_argument(
+        "--profile",
+        type=ParseProfile,
+        choices=list(ParseProfile),
+        default=ParseProfile.BALANCED,
+        help="Speed/accuracy profile: fast, balanced or thorough (default: balanced)",
+    )
+    add_cpu_budget_args(parser)
+    parser.add_argument(
+        "--profiler",
+        choices=PROFILER_MODES,
+        default=None,
+        help="Profile each document with cProfile or stack sampling",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default="profile",
+        help="Directory for the profiling report and stacks (default: profile)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=30,
+        help="Hotspots per pipeline path in the report (default: 30)",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="SQLite index of parsed invoices (default: $INVOICE_INDEX_PATH)",
+    )
     parser.add_argument("--debug", action="store_true", help="Debug")
     args = parser.parse_args()
 
@@ -58,30 +221,88 @@ def main():
         input_dir = Path(args.input_dir)
         output_file = Path(args.output_file)
         output_file.parent.mkdir(parents=True, exist_ok=True)
-        all_invoice_data = []
-        pdf_files = glob.glob(str(input_dir / "*.pdf"))
+        if args.index:
+            # Inherited by the worker processes
+            os.environ[INDEX_PATH_ENV] = args.index
+        all_invoice_data = InvoiceColumns(extra=BATCH_COLUMNS)
+        profiler = Profiler(args.profiler) if args.profiler else None
+        shared = SharedDocuments()
+        archive = None
+        if input_dir.suffix.lower() == ".zip":
+            # Workers read the archive's PDFs in place instead of receiving pickles
+            archive = zipfile.ZipFile(input_dir)
+            pdf_files = _zip_members(archive)
+        else:
+            pdf_files = glob.glob(str(input_dir / "*.pdf"))
 
-        # Use process pool with max_workers=CPU cores
-        num_workers = os.cpu_count() or 2
+        # Use process pool sized by the CPU budget
+        num_workers = budget_from_args(args, logger).workers
         logger.info(f"Processing {len(pdf_files)} files using {num_workers} workers")
 
-        with ProcessPoolExecutor(max_workers=num_workers) as executor:
-            futures = []
+        if archive:
+            # One document per batch, loaded only when the window has room for it
+            batch_size = 1
+
+            def load(members):
+                return [
+                    shared.put(archive.read(m), label=f"{input_dir}!{m.filename}")
+                    for m in members
+                ]
+
+        else:
             batch_size = max(1, len(pdf_files) // (num_workers * 2))
-            for i in range(0, len(pdf_files), batch_size):
-                batch_files = pdf_files[i : i + batch_size]
-                future = executor.submit(
-                    _process_batch_files, batch_files, args.cuit, logger
-                )
-                futures.append(future)
 
-            for future in futures:
-                all_invoice_data.extend(future.result())
+            def load(paths):
+                return paths
+
+        with (
+            archive or nullcontext(),
+            shared,
+            ProcessPoolExecutor(max_workers=num_workers) as executor,
+        ):
+            batches = (
+                pdf_files[i : i + batch_size]
+                for i in range(0, len(pdf_files), batch_size)
+            )
+            results = _windowed(
+                batches,
+                load,
+                lambda sources: executor.submit(
+                    _process_batch_files,
+                    sources,
+                    args.cuit,
+                    logger,
+                    args.profile,
+                    args.profiler,
+                ),
+                shared,
+                max_in_flight=num_workers * 2,
+                shm_budget=_shm_budget(),
+                size=lambda member: getattr(member, "file_size", 0),
+            )
+            for future, batch_files in results:
+                try:
+                    columns, profile_data = future.result()
+                finally:
+                    # The batch is done, its documents can leave shared memory
+                    for source in batch_files:
+                        if isinstance(source, SharedDocument):
+                            shared.release(source)
+                all_invoice_data.extend(columns)
+                if profiler and profile_data:
+                    profiler.merge(profile_data)
+
+        if profiler:
+            for path in profiler.write(args.profile_dir, top=args.profile_top):
+                logger.info(f"Profile written to {path}")
 
         if all_invoice_data:
-            df = pd.DataFrame(all_invoice_data)
+            df = all_invoice_data.to_dataframe()
             df.to_excel(output_file, index=False)
             logger.info(f"Invoice data saved to {output_file}")
+            if os.environ.get(INDEX_PATH_ENV):
+                hits = int(df["from_index"].sum())
+                logger.info(f"{hits} of {len(df)} invoices served from the index")
         else:
             logger.info("No invoice data extracted.")
     except Exception as e:
@@ -0,0 +1,357 @@
+"""Local parse daemon: a warm worker pool behind a Unix domain socket.
+
+Integrations that run ``invoice-parse`` once per file pay the interpreter start,
+the heavy imports and cold engines on every call. ``invoice-daemon`` keeps a
+pool of warmed-up workers and ``invoice-parse`` sends it the file path when it
+is running (see ``request_parse``).
+
+Protocol: one JSON object per line in each direction. Requests are
+``{"op": "parse", "pdf": <absolute path>, "cuit": ..., "profile": ..., "index": ...}``
+or ``{"op": "ping"}``; parse responses mirror the API's ``InvoiceParseResponse``
+(``success``, ``data``, ``error_message``) plus the worker's ``elapsed`` seconds.
+Rejected inputs carry an ``error_code``: the ``InvalidPDF`` code, or
+``resource_limit`` (with the ``limit``) for documents beyond the resource limits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+
+from dtos import ParseProfile
+from utils import (
+    InvalidPDF,
+    ResourceLimitExceeded,
+    add_cpu_budget_args,
+    budget_from_args,
+    preload_dependencies,
+    setup_logging,
+)
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "INVOICE_DAEMON_SOCKET"
+# Seconds a client waits for its answer, queueing included
+DEFAULT_TIMEOUT = 120.0
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket, or it did not answer in time."""
+
+
+def default_socket_path() -> Path:
+    """``$INVOICE_DAEMON_SOCKET``, else a per-user socket in the runtime directory."""
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "invoice-parser.sock"
+    return Path(tempfile.gettempdir()) / f"invoice-parser-{os.getuid()}.sock"
+
+
+def request(
+    message: dict,
+    socket_path: str | Path | None = None,
+    timeout: float | None = DEFAULT_TIMEOUT,
+) -> dict:
+    """Send ``message`` to the daemon and return its answer."""
+    socket_path = socket_path or default_socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        try:
+            client.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(f"No daemon listening on {socket_path}") from e
+        client.sendall(json.dumps(message).encode() + b"\n")
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    except TimeoutError as e:
+        # A stuck or overloaded daemon is no better than a missing one
+        raise DaemonUnavailable(
+            f"Daemon on {socket_path} did not answer within {timeout} s"
+        ) from e
+    finally:
+        client.close()
+    if not line:
+        raise DaemonUnavailable(f"Daemon on {socket_path} closed the connection")
+    return json.loads(line)
+
+
+def request_parse(
+    pdf_path: str | Path,
+    own_cuit: str | None = None,
+    profile: ParseProfile = ParseProfile.BALANCED,
+    verbose: bool = False,
+    socket_path: str | Path | None = None,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    index_path: str | Path | None = None,
+) -> dict:
+    """Parse ``pdf_path`` in the daemon, ``DaemonUnavailable`` when none is running.
+
+    ``index_path`` is the invoice index the worker uses instead of the daemon's
+    own ``$INVOICE_INDEX_PATH``.
+    """
+    message = {
+        "op": "parse",
+        # The daemon may run in another working directory
+        "pdf": str(Path(pdf_path).resolve()),
+        "cuit": own_cuit,
+        "profile": str(profile),
+        "verbose": verbose,
+        "index": str(Path(index_path).resolve()) if index_path else None,
+    }
+    return request(message, socket_path, timeout)
+
+
+_started = None
+# Invoice indexes requested by the clients, opened once per worker
+_indexes = {}
+
+
+def _init_worker(started):
+    """Import the parsing stack and warm the engines up once per worker."""
+    from api.warmup import warm_up
+
+    global _started
+    _started = started
+    # Shutdown is driven by the parent, in-flight invoices must not be interrupted
+    # by a Ctrl-C or a SIGTERM sent to the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    preload_dependencies()
+    warm_up()
+
+
+def _ready(worker: int) -> int:
+    # Blocks its worker until all of them got here, so each one takes one call
+    _started.wait()
+    return os.getpid()
+
+
+def _rejected(message: str, code: str | None = None, **details) -> dict:
+    return {
+        "success": False,
+        "data": None,
+        "error_message": message,
+        "error_code": code,
+        **details,
+    }
+
+
+def _parse_path(
+    pdf_path: str,
+    own_cuit: str | None,
+    profile: str,
+    verbose: bool,
+    index_path: str | None = None,
+) -> dict:
+    """Parse in a worker and return the response, rejected documents included.
+
+    Rejections are answered here rather than raised back to the parent, one
+    document over the limits must not fail the requests sharing its pool.
+    """
+    from io import BytesIO
+    from services import InvoiceIndex
+    from use_cases import ParseInvoiceUseCase
+
+    index = None
+    if index_path:
+        index = _indexes.setdefault(index_path, InvoiceIndex(index_path))
+    with open(pdf_path, "rb") as f:
+        file_content = BytesIO(f.read())
+    started = time.perf_counter()
+    try:
+        invoice_data = ParseInvoiceUseCase.parse_invoice(
+            file_content,
+            own_cuit=own_cuit,
+            verbose=verbose,
+            profile=ParseProfile(profile),
+            index=index,
+        )
+    except InvalidPDF as e:
+        return _rejected(str(e), e.code)
+    except ResourceLimitExceeded as e:
+        return _rejected(f"Document too large: {e}", "resource_limit", limit=e.limit)
+    data = invoice_data.model_dump(mode="json") if invoice_data else None
+    elapsed = time.perf_counter() - started
+    return {"success": data is not None, "data": data, "elapsed": elapsed}
+
+
+class ParseDaemon:
+    """Worker pool answering the requests of the socket server's threads.
+
+    A worker that dies (segfault in an engine, OOM kill) breaks the whole
+    ``ProcessPoolExecutor``; the pool is then replaced by a fresh one.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.executor = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        # Pools are replaced while the server's threads run, fork would copy their locks
+        context = get_context("forkserver")
+        started = context.Barrier(self.workers)
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(started,),
+        )
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Replace ``broken`` unless another request thread already did."""
+        with self._lock:
+            if self.executor is broken:
+                logger.warning("A worker died, starting a new pool")
+                # The pool stops its surviving workers with SIGTERM, which they ignore
+                for process in list((broken._processes or {}).values()):
+                    process.kill()
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._start_pool()
+            return self.executor
+
+    def _run(self, fn, *args):
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Broken since the last request, nothing of this one ran yet
+            executor = self._restart_pool(executor)
+            future = executor.submit(fn, *args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Its worker died during this request, the next ones get a new pool
+            self._restart_pool(executor)
+            raise
+
+    def warm_up(self):
+        """Start and warm every worker up now instead of on the first requests."""
+        pids = set(self.executor.map(_ready, range(self.workers)))
+        logger.info(f"{len(pids)} workers warmed up")
+
+    def handle(self, message: dict) -> dict:
+        op = message.get("op")
+        if op == "ping":
+            return {"status": "ok", "pid": os.getpid(), "workers": self.workers}
+        if op != "parse":
+            return _rejected(f"Bad op {op!r}")
+
+        pdf_path = message.get("pdf") or ""
+        if not Path(pdf_path).is_file():
+            return _rejected(f"File not found: {pdf_path}")
+        try:
+            response = self._run(
+                _parse_path,
+                pdf_path,
+                message.get("cuit"),
+                message.get("profile", ParseProfile.BALANCED),
+                bool(message.get("verbose")),
+                message.get("index"),
+            )
+        except Exception as e:
+            logger.error(f"Error parsing {pdf_path}: {e}")
+            return _rejected(str(e))
+        if "elapsed" in response:
+            logger.info(f"Procesada {pdf_path} en {response['elapsed']:.2f} segundos")
+        else:
+            logger.warning(f"Descartada {pdf_path}: {response['error_message']}")
+        return response
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while line := self.rfile.readline(MAX_REQUEST_BYTES):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = {"op": None}
+            response = self.server.daemon.handle(message)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, daemon: ParseDaemon):
+        self.daemon = daemon
+        # Owner-only from the moment bind() creates it, same access rules as the
+        # files the clients could read themselves
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _Handler)
+        finally:
+            os.umask(umask)
+
+
+def _claim_socket(socket_path: Path):
+    """Remove a stale socket file, refuse to start when a daemon answers on it."""
+    if not socket_path.exists():
+        return
+    try:
+        request({"op": "ping"}, socket_path, timeout=1)
+    except (DaemonUnavailable, OSError, ValueError):
+        socket_path.unlink()
+        return
+    raise SystemExit(f"A daemon is already running on {socket_path}")
+
+
+def main():
+    """Serve parse requests on a Unix domain socket until SIGINT/SIGTERM."""
+    parser = argparse.ArgumentParser(description="Invoice parse daemon")
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help=f"Unix socket path (default: ${SOCKET_ENV} or {default_socket_path()})",
+    )
+    add_cpu_budget_args(parser)
+    parser.add_argument("--debug", action="store_true", help="Debug")
+    args = parser.parse_args()
+
+    log = setup_logging(debug=args.debug)
+    socket_path = Path(args.socket) if args.socket else default_socket_path()
+    _claim_socket(socket_path)
+
+    budget = budget_from_args(args, log)
+
+    daemon = ParseDaemon(budget.workers)
+    daemon.warm_up()
+    server = _Server(socket_path, daemon)
+
+    def _handle_signal(signum, frame):
+        log.info("Shutdown requested")
+        # shutdown() waits for serve_forever(), which runs in this thread
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    log.info(f"Listening on {socket_path} with {budget.workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        daemon.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""Load generator for the invoice parsing API."""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+PARSE_ENDPOINT = "/invoice/parse"
+API_STARTUP_TIMEOUT = 120.0
+
+
+@dataclass
+class Sample:
+    group: str
+    status: int | None
+    latency: float
+    # qr, regex, ocr_fallback, index, no_data (from the response) or the error kind
+    path: str
+    # Transport errors and non-200 responses
+    error: str | None = None
+
+
+@dataclass
+class Document:
+    name: str
+    group: str
+    content: bytes
+
+
+def load_documents(input_dir: Path) -> list[Document]:
+    """PDFs of ``input_dir``, grouped by corpus kind or sub-directory."""
+    kinds = {}
+    manifest = input_dir / "manifest.json"
+    if manifest.is_file():
+        # Synthetic corpus (benchmarks/corpus.py)
+        for document in json.loads(manifest.read_text())["documents"]:
+            kinds[document["file"]] = document["kind"]
+
+    documents = []
+    for pdf_path in sorted(input_dir.rglob("*.pdf")):
+        relative = pdf_path.relative_to(input_dir)
+        group = kinds.get(str(relative)) or (
+            relative.parts[0] if len(relative.parts) > 1 else "all"
+        )
+        documents.append(Document(str(relative), group, pdf_path.read_bytes()))
+    return documents
+
+
+def parse_mix(mix: str | None) -> dict[str, float]:
+    """``qr=5,digital=2`` -> {"qr": 5.0, "digital": 2.0}"""
+    weights = {}
+    for item in (mix or "").split(","):
+        if item.strip():
+            group, _, weight = item.partition("=")
+            weights[group.strip()] = float(weight or 1)
+    return weights
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = max(1, round(percent / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class LoadTest:
+    """Replays documents against the API.
+
+    Without ``rate`` it is a closed loop: ``concurrency`` clients send requests
+    back to back. With ``rate`` requests arrive as a Poisson process and their
+    latency is measured from the scheduled arrival, so time spent waiting for a
+    free connection counts (no coordinated omission).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        documents: list[Document],
+        concurrency: int = 8,
+        rate: float | None = None,
+        mix: dict[str, float] | None = None,
+        form: dict[str, str] | None = None,
+        timeout: float = 60.0,
+        seed: int = 0,
+    ):
+        self.url = url.rstrip("/") + PARSE_ENDPOINT
+        self.concurrency = concurrency
+        self.rate = rate
+        self.form = form or {}
+        self.timeout = timeout
+        self.random = random.Random(seed)
+
+        by_group = defaultdict(list)
+        for document in documents:
+            by_group[document.group].append(document)
+        mix = mix or {group: len(docs) for group, docs in by_group.items()}
+        unknown = set(mix) - set(by_group)
+        if unknown:
+            raise ValueError(f"No documents for {sorted(unknown)} in the input")
+        self.groups = [group for group in mix if mix[group] > 0]
+        self.weights = [mix[group] for group in self.groups]
+        self.by_group = by_group
+
+    def _next_document(self) -> Document:
+        group = self.random.choices(self.groups, self.weights)[0]
+        return self.random.choice(self.by_group[group])
+
+    async def _send(self, client, document: Document, scheduled: float) -> Sample:
+        import httpx
+
+        files = {"file": (document.name, document.content, "application/pdf")}
+        try:
+            response = await client.post(self.url, files=files, data=self.form)
+            latency = time.perf_counter() - scheduled
+        except httpx.HTTPError as e:
+            latency = time.perf_counter() - scheduled
+            kind = type(e).__name__
+            return Sample(document.group, None, latency, kind, error=kind)
+
+        if response.status_code != 200:
+            error = f"http_{response.status_code}"
+            return Sample(document.group, response.status_code, latency, error, error)
+        path = response.json().get("pipeline_path") or "unknown"
+        return Sample(document.group, 200, latency, path)
+
+    async def run(
+        self, requests: int | None = None, duration: float | None = None
+    ) -> list[Sample]:
+        """Send ``requests`` requests, or keep sending for ``duration`` seconds."""
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+        )
+        samples: list[Sample] = []
+        deadline = time.perf_counter() + duration if duration else None
+        sent = 0
+
+        def more() -> bool:
+            nonlocal sent
+            if requests is not None and sent >= requests:
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            sent += 1
+            return True
+
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            if self.rate:
+                semaphore = asyncio.Semaphore(self.concurrency)
+
+                async def arrival(document, scheduled):
+                    async with semaphore:
+                        samples.append(await self._send(client, document, scheduled))
+
+                tasks = []
+                next_arrival = time.perf_counter()
+                while more():
+                    await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+                    tasks.append(
+                        asyncio.create_task(
+                            arrival(self._next_document(), next_arrival)
+                        )
+                    )
+                    next_arrival += self.random.expovariate(self.rate)
+                await asyncio.gather(*tasks)
+            else:
+
+                async def client_loop():
+                    while more():
+                        document = self._next_document()
+                        samples.append(
+                            await self._send(client, document, time.perf_counter())
+                        )
+
+                await asyncio.gather(
+                    *(client_loop() for _ in range(self.concurrency))
+                )
+        return samples
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict:
+    """Throughput, latency percentiles and error rates, overall and per breakdown."""
+
+    def stats(group: list[Sample]) -> dict:
+        latencies = sorted(sample.latency for sample in group)
+        errors = defaultdict(int)
+        for sample in group:
+            if sample.error:
+                errors[sample.error] += 1
+        return {
+            "requests": len(group),
+            "error_rate": sum(errors.values()) / len(group) if group else 0.0,
+            "errors": dict(errors),
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p95_ms": 1000 * percentile(latencies, 95),
+            "p99_ms": 1000 * percentile(latencies, 99),
+            "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+        }
+
+    def breakdown(key) -> dict:
+        groups = defaultdict(list)
+        for sample in samples:
+            groups[key(sample)].append(sample)
+        return {name: stats(group) for name, group in sorted(groups.items())}
+
+    return {
+        "elapsed_sec": elapsed,
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "overall": stats(samples),
+        "by_path": breakdown(lambda sample: sample.path),
+        "by_group": breakdown(lambda sample: sample.group),
+    }
+
+
+def format_report(summary: dict, title: str = "") -> str:
+    header = (
+        f"{'':<16} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'max ms':>9}"
+    )
+
+    def row(name: str, stats: dict) -> str:
+        return (
+            f"{name:<16} {stats['requests']:>8} {stats['error_rate']:>6.1%} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+            f"{stats['max_ms']:>9.1f}"
+        )
+
+    lines = [
+        f"=== {title} ===" if title else "",
+        f"{summary['overall']['requests']} requests in {summary['elapsed_sec']:.1f}s, "
+        f"{summary['throughput_rps']:.2f} req/s",
+        header,
+        row("overall", summary["overall"]),
+    ]
+    for section, title in (("by_path", "path"), ("by_group", "documents")):
+        lines.append(f"-- by {title}")
+        lines += [row(name, stats) for name, stats in summary[section].items()]
+    errors = summary["overall"]["errors"]
+    if errors:
+        lines.append("-- errors: " + ", ".join(f"{k}={v}" for k, v in errors.items()))
+    return "\n".join(line for line in lines if line)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalAPI:
+    """``invoice-api`` started through ``cli.run_api`` on a free local port."""
+
+    def __init__(self, workers: int, extra_args: list[str] | None = None):
+        self.workers = workers
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.extra_args = extra_args or []
+        self.process: subprocess.Popen | None = None
+
+    def __enter__(self) -> "LocalAPI":
+        import httpx
+
+        command = [
+            sys.executable,
+            "-m",
+            "cli.run_api",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self.port),
+            "--workers",
+            str(self.workers),
+            "--log-level",
+            "warning",
+            *self.extra_args,
+        ]
+        logger.info(f"Starting API with {self.workers} workers on {self.url}")
+        self.process = subprocess.Popen(command, start_new_session=True)
+
+        started = time.monotonic()
+        while time.monotonic() - started < API_STARTUP_TIMEOUT:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API exited with code {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"API did not start within {API_STARTUP_TIMEOUT:.0f}s")
+
+    def __exit__(self, *exc_info):
+        if self.process is None or self.process.poll() is not None:
+            return
+        # uvicorn's supervisor and its workers share the session
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+
+def _run(load_test: LoadTest, args) -> dict:
+    if args.warmup:
+        asyncio.run(load_test.run(requests=args.warmup))
+    started = time.perf_counter()
+    samples = asyncio.run(load_test.run(requests=args.requests, duration=args.duration))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def main():
+    """Replay a directory of PDFs against the API and report latency percentiles."""
+    parser = argparse.ArgumentParser(description="Invoice API load test")
+    parser.add_argument(
+        "--input_dir",
+        type=str,
+        required=True,
+        help="Directorio con los PDF a enviar (p. ej. benchmarks/corpus)",
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        default="http://127.0.0.1:8000",
+        help="Running API to load (default: http://127.0.0.1:8000)",
+    )
+    parser.add_argument(
+        "--api-workers",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Start the API locally with each of these worker counts instead of --url",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Requests in flight (default: 8)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Arrival rate in requests/second (default: closed loop)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=None, help="Requests to send (default: 200)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=None, help="Seconds to keep sending"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=5, help="Requests sent before measuring"
+    )
+    parser.add_argument(
+        "--mix",
+        type=str,
+        default=None,
+        help="Document group weights, e.g. qr=5,digital=2,scanned=1 (default: as found)",
+    )
+    parser.add_argument(
+        "--profile", type=str, default=None, help="Parse profile sent with each request"
+    )
+    parser.add_argument("--cuit", type=str, default=None, help="Own CUIT number")
+    parser.add_argument(
+        "--time-budget", type=float, default=None, help="time_budget sent per request"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="Client timeout (default: 60s)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=str, help="Write the summary to this file")
+    args = parser.parse_args()
+
+    setup_logging()
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.requests is None and args.duration is None:
+        args.requests = 200
+
+    documents = load_documents(Path(args.input_dir))
+    if not documents:
+        logger.error(f"No PDF files found in {args.input_dir}")
+        sys.exit(1)
+
+    form = {}
+    if args.profile:
+        form["profile"] = args.profile
+    if args.cuit:
+        form["cuit"] = args.cuit
+    if args.time_budget:
+        form["time_budget"] = str(args.time_budget)
+
+    def load_test(url: str) -> LoadTest:
+        return LoadTest(
+            url,
+            documents,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            mix=parse_mix(args.mix),
+            form=form,
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+
+    summaries = {}
+    if args.api_workers:
+        for workers in args.api_workers:
+            with LocalAPI(workers) as api:
+                summaries[f"{workers} workers"] = _run(load_test(api.url), args)
+            print(format_report(summaries[f"{workers} workers"], f"{workers} workers"))
+    else:
+        summaries[args.url] = _run(load_test(args.url), args)
+        print(format_report(summaries[args.url]))
+
+    if len(summaries) > 1:
+        print("\n=== comparison ===")
+        print(f"{'':<16} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, summary in summaries.items():
+            overall = summary["overall"]
+            print(
+                f"{name:<16} {summary['throughput_rps']:>8.2f} "
+                f"{overall['p50_ms']:>9.1f} {overall['p95_ms']:>9.1f} "
+                f"{overall['p99_ms']:>9.1f}"
+            )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(summaries, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,38 @@
 """Single invoice parser CLI."""
 
 import argparse
+import os
+import time
 from pathlib import Path
 from io import BytesIO
-from utils import setup_logging
-from use_cases import ParseInvoiceUseCase
+from contextlib import nullcontext
+from utils import setup_logging, Profiler, PROFILER_MODES
+from dtos import InvoiceData, ParseProfile
+from cli.daemon import DaemonUnavailable, default_socket_path, request_parse
+
+
+def _parse_with_daemon(args, socket_path: Path, logger) -> InvoiceData | None:
+    """Parse through ``invoice-daemon``, ``DaemonUnavailable`` when none answers."""
+    from services.invoice_index import INDEX_PATH_ENV
+
+    started = time.perf_counter()
+    response = request_parse(
+        args.pdf,
+        args.cuit,
+        args.profile,
+        args.verbose,
+        socket_path=socket_path,
+        # The same index as parsing in-process, not the daemon's own
+        index_path=args.index or os.environ.get(INDEX_PATH_ENV),
+    )
+    round_trip = time.perf_counter() - started
+    if response.get("error_message"):
+        raise RuntimeError(response["error_message"])
+    logger.info(
+        f"Parsed by invoice-daemon in {round_trip * 1000:.0f} ms "
+        f"({response['elapsed'] * 1000:.0f} ms in the worker)"
+    )
+    return InvoiceData(**response["data"]) if response["data"] else None
 
 
 def main():
@@ -14,31 +42,102 @@ def main():
     )
     parser.add_argument("--cuit", type=str, help="Own CUIT number", default=None)
     parser.add_argument("--debug", action="store_true", help="Debug", default=False)
+    parser.add_argument(
+        "--profile",
+        type=ParseProfile,
+        choices=list(ParseProfile),
+        default=ParseProfile.BALANCED,
+        help="Speed/accuracy profile: fast, balanced or thorough (default: balanced)",
+    )
     parser.add_argument(
         "--verbose", action="store_true", help="Verbose output", default=False
     )
+    parser.add_argument(
+        "--profiler",
+        choices=PROFILER_MODES,
+        default=None,
+        help="Profile each document with cProfile or stack sampling",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default="profile",
+        help="Directory for the profiling report and stacks (default: profile)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=30,
+        help="Hotspots per pipeline path in the report (default: 30)",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="SQLite index of parsed invoices (default: $INVOICE_INDEX_PATH)",
+    )
+    parser.add_argument(
+        "--daemon",
+        nargs="?",
+        const=str(default_socket_path()),
+        default=None,
+        metavar="SOCKET",
+        help="Parse through invoice-daemon, in-process if it is not running "
+        "(default: when its socket exists)",
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true", help="Always parse in-process"
+    )
     args = parser.parse_args()
 
     logger = setup_logging(debug=args.debug)
+    if args.index:
+        from services.invoice_index import INDEX_PATH_ENV
+
+        os.environ[INDEX_PATH_ENV] = args.index
 
     if not Path(args.pdf).is_file():
         logger.error(f"File not found: {args.pdf}")
         exit(1)
 
-    with open(args.pdf, "rb") as f:
-        file_content = BytesIO(f.read())
+    socket_path = Path(args.daemon) if args.daemon else default_socket_path()
+    # The daemon's workers cannot be profiled from here
+    use_daemon = not args.no_daemon and not args.profiler
+    use_daemon = use_daemon and (args.daemon is not None or socket_path.exists())
 
+    profiler = Profiler(args.profiler) if args.profiler else None
     try:
-        invoice_data = ParseInvoiceUseCase.parse_invoice(
-            file_content, own_cuit=args.cuit, verbose=args.verbose
-        )
+        served = False
+        if use_daemon:
+            try:
+                invoice_data = _parse_with_daemon(args, socket_path, logger)
+                served = True
+            except DaemonUnavailable as e:
+                logger.info(f"{e}, parsing in-process")
+        if not served:
+            # Only imported when parsing here, clients of the daemon skip it
+            from use_cases import ParseInvoiceUseCase
+
+            with open(args.pdf, "rb") as f:
+                file_content = BytesIO(f.read())
+            with profiler.document() if profiler else nullcontext():
+                invoice_data = ParseInvoiceUseCase.parse_invoice(
+                    file_content,
+                    own_cuit=args.cuit,
+                    verbose=args.verbose,
+                    profile=args.profile,
+                )
         if invoice_data:
-            logger.info(f"Extracted data: {invoice_data}")
+            logger.info(f"Extracted data ({args.profile} profile): {invoice_data}")
         else:
             logger.warning("No data could be extracted from the invoice.")
     except Exception as e:
         logger.error(f"Error parsing the invoice: {e}")
 
+    if profiler:
+        for path in profiler.write(args.profile_dir, top=args.profile_top):
+            logger.info(f"Profile written to {path}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,118 @@
 """FastAPI application runner."""
 
 import argparse
-import multiprocessing
+import importlib
+import os
+import signal
+import time
 import uvicorn
+from utils import (
+    setup_logging,
+    add_cpu_budget_args,
+    budget_from_args,
+    preload_dependencies,
+)
+
+APP = "api.main:app"
+
+# A worker that dies sooner than this after its start crashed at startup
+MIN_WORKER_UPTIME = 10.0
+RESTART_DELAY = 0.5
+MAX_RESTART_DELAY = 30.0
+# Startup crashes in a row before the parent gives up
+MAX_STARTUP_CRASHES = 5
+
+
+class _RestartBackoff:
+    """Delay before replacing a dead worker, doubling while workers die at startup.
+
+    A bad config or an import error after the fork kills every new worker right
+    away; instead of forking in a tight loop the parent waits longer each time
+    and gives up (``delay`` returns None) after ``MAX_STARTUP_CRASHES`` in a row.
+    A worker that ran for ``MIN_WORKER_UPTIME`` resets the count.
+    """
+
+    def __init__(self):
+        self.startup_crashes = 0
+
+    def delay(self, uptime: float) -> float | None:
+        if uptime >= MIN_WORKER_UPTIME:
+            self.startup_crashes = 0
+            return 0.0
+        self.startup_crashes += 1
+        if self.startup_crashes > MAX_STARTUP_CRASHES:
+            return None
+        return min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** (self.startup_crashes - 1))
+
+
+def _serve_preforked(config: uvicorn.Config, workers: int, logger):
+    """Fork ``workers`` uvicorn servers sharing the modules imported so far.
+
+    uvicorn spawns its workers, which then import everything again; forking
+    after the preload keeps a single copy-on-write copy of the PDF/OCR stack.
+    Workers that die are replaced until the server is asked to stop, with a
+    growing delay while they keep dying at startup (see ``_RestartBackoff``).
+    """
+    sock = config.bind_socket()
+    # pid -> start time
+    children: dict[int, float] = {}
+    stopping = False
+    failed = False
+    backoff = _RestartBackoff()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} workers from parent process {os.getpid()}")
+    while children:
+        pid, status = os.wait()
+        uptime = time.monotonic() - children.pop(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        delay = backoff.delay(uptime)
+        if delay is None:
+            logger.error(
+                f"Workers keep crashing at startup ({MAX_STARTUP_CRASHES} in a row), "
+                "stopping"
+            )
+            failed = True
+            stop(None, None)
+            continue
+        logger.warning(
+            f"Worker {pid} exited with status {code} after {uptime:.1f} s, "
+            f"restarting it in {delay:.1f} s"
+        )
+        # Short sleeps, a stop request must not wait for the whole delay
+        restart_at = time.monotonic() + delay
+        while not stopping and time.monotonic() < restart_at:
+            time.sleep(max(0.0, min(0.5, restart_at - time.monotonic())))
+        if not stopping:
+            spawn()
+    sock.close()
+    if failed:
+        raise SystemExit(1)
 
 
 def main():
@@ -25,11 +135,11 @@ def main():
         action="store_true",
         help="Enable auto-reload on code changes (development only)",
     )
-    parser.add_argument(
-        "--workers",
-        type=int,
-        default=None,
-        help="Number of worker processes (default: auto-detect CPU count, ignored with --reload)",
+    add_cpu_budget_args(
+        parser,
+        page_workers=True,
+        workers_help="Number of worker processes "
+        "(default: derived from the CPU budget, ignored with --reload)",
     )
     parser.add_argument(
         "--log-level",
@@ -41,17 +151,28 @@ def main():
 
     args = parser.parse_args()
 
+    logger = setup_logging()
+
     # Calculate workers if not specified and not in reload mode
-    workers = 1 if args.reload else (args.workers or multiprocessing.cpu_count())
-
-    uvicorn.run(
-        "api.main:app",
-        host=args.host,
-        port=args.port,
-        reload=args.reload,
-        workers=workers,
-        log_level=args.log_level,
+    budget = budget_from_args(args, logger, workers=1 if args.reload else None)
+    workers = budget.workers
+
+    if args.reload:
+        uvicorn.run(
+            APP, host=args.host, port=args.port, reload=True, log_level=args.log_level
+        )
+        return
+
+    # Import the heavy stack and the app once, before the workers are forked
+    preload_dependencies()
+    importlib.import_module(APP.split(":")[0])
+    config = uvicorn.Config(
+        APP, host=args.host, port=args.port, workers=workers, log_level=args.log_level
     )
+    if workers == 1:
+        uvicorn.Server(config).run()
+    else:
+        _serve_preforked(config, workers, logger)
 
 
 if __name__ == "__main__":
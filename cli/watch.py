@@ -0,0 +1,473 @@
+"""Watch-folder invoice processing daemon."""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator
+from utils import (
+    setup_logging,
+    add_cpu_budget_args,
+    budget_from_args,
+    preload_dependencies,
+)
+from cli.batch import _process_file
+from dtos import ParseProfile
+from services.invoice_index import INDEX_PATH_ENV
+
+logger = logging.getLogger(__name__)
+
+# (size, mtime_ns) of a file, used to detect changes and partial writes
+FileSignature = tuple[int, int]
+
+# Parses of a file cut short by a dying worker before it is recorded as failed
+MAX_ATTEMPTS = 3
+
+# Outcome of each file in the sink
+STATUS_OK = "ok"
+STATUS_NO_DATA = "no_data"
+STATUS_FAILED = "failed"
+
+
+def _file_signature(path: Path) -> FileSignature | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FolderWatcher:
+    """Detect new or changed PDF files in one or more directories.
+
+    Uses inotify (through ``watchfiles``) when available and falls back to
+    polling otherwise. A file is only reported once its size and mtime have not
+    changed for ``settle_seconds``, so partially written files are skipped until
+    the writer is done. Paths are resolved, as watchfiles reports them, so a file
+    has the same key whichever way it was found.
+    """
+
+    def __init__(
+        self,
+        directories: list[Path],
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        recursive: bool = False,
+        force_polling: bool = False,
+        known: dict[Path, FileSignature] | None = None,
+    ):
+        self.directories = [Path(directory).resolve() for directory in directories]
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.force_polling = force_polling
+        self.stop_event = threading.Event()
+        # Last signature reported per file
+        self._reported: dict[Path, FileSignature] = {
+            Path(path).resolve(): signature for path, signature in (known or {}).items()
+        }
+        # Files waiting to settle: path -> (signature, time of last change)
+        self._pending: dict[Path, tuple[FileSignature, float]] = {}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _is_pdf(self, path: Path) -> bool:
+        return path.suffix.lower() == ".pdf"
+
+    def _scan(self) -> Iterator[Path]:
+        pattern = "**/*" if self.recursive else "*"
+        for directory in self.directories:
+            for path in directory.glob(pattern):
+                if self._is_pdf(path) and path.is_file():
+                    yield path
+
+    def _mark(self, path: Path):
+        path = path.resolve()
+        signature = _file_signature(path)
+        if signature is None:
+            self._pending.pop(path, None)
+            return
+        if self._reported.get(path) == signature:
+            return
+        pending = self._pending.get(path)
+        if pending is None or pending[0] != signature:
+            self._pending[path] = (signature, time.monotonic())
+
+    def _settled(self) -> list[Path]:
+        now = time.monotonic()
+        ready = []
+        for path, (signature, changed_at) in list(self._pending.items()):
+            current = _file_signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            elif now - changed_at >= self.settle_seconds:
+                del self._pending[path]
+                self._reported[path] = current
+                ready.append(path)
+        return ready
+
+    def _inotify_batches(self) -> Iterator[set[Path]] | None:
+        if self.force_polling:
+            return None
+        try:
+            import watchfiles
+        except ImportError:
+            logger.info("watchfiles not available, falling back to polling")
+            return None
+
+        def batches():
+            for changes in watchfiles.watch(
+                *self.directories,
+                stop_event=self.stop_event,
+                debounce=200,
+                rust_timeout=int(self.poll_interval * 1000),
+                yield_on_timeout=True,
+                recursive=self.recursive,
+                raise_interrupt=False,
+            ):
+                yield {Path(path) for change, path in changes}
+
+        return batches()
+
+    def _polling_batches(self) -> Iterator[set[Path]]:
+        while not self.stop_event.is_set():
+            yield set(self._scan())
+            self.stop_event.wait(self.poll_interval)
+
+    def watch(self) -> Iterator[list[Path]]:
+        """Yield the files ready to be processed on every tick until ``stop`` is called."""
+        for path in self._scan():
+            self._mark(path)
+
+        batches = self._inotify_batches()
+        if batches is None:
+            batches = self._polling_batches()
+        else:
+            logger.info("Watching with inotify")
+
+        for paths in batches:
+            for path in paths:
+                if self._is_pdf(path):
+                    self._mark(path)
+            yield self._settled()
+            if self.stop_event.is_set():
+                break
+
+
+class JsonlSink:
+    """Append-only JSON lines output, flushed after every record.
+
+    Files that failed or yielded no data are recorded too (see ``status``), so
+    a restart does not parse them again until they change.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def processed_signatures(self) -> dict[Path, FileSignature]:
+        """Files already present in the sink, to resume after a restart."""
+        known = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    known[Path(record["pdf_path"]).resolve()] = (
+                        record["file_size"],
+                        record["file_mtime_ns"],
+                    )
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return known
+
+    def write(self, record: dict):
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+            self._file.write("\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _init_worker():
+    """Import the parsing stack once per worker so the pool stays warm."""
+    # Shutdown is driven by the parent, in-flight invoices must not be interrupted
+    # by a Ctrl-C or a SIGTERM sent to the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    preload_dependencies()
+
+
+def _watch_file(
+    pdf_path: str, own_cuit: str | None, profile: ParseProfile
+) -> dict | None:
+    return _process_file(pdf_path, own_cuit, logging.getLogger(__name__), profile)
+
+
+class _WatchPool:
+    """Warm worker pool feeding the sink, replaced when one of its workers dies.
+
+    A worker killed mid-parse (segfault in an engine, OOM kill) breaks the whole
+    ``ProcessPoolExecutor``: every in-flight file fails with ``BrokenProcessPool``
+    and later submits raise. The pool is then replaced and those files are
+    submitted again one at a time, so the file that kills its worker no longer
+    takes the others down with it; after ``MAX_ATTEMPTS`` it is recorded as
+    failed.
+
+    A file rewritten while it is being parsed is submitted again once its
+    current parse is recorded, never twice at the same time.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        sink: JsonlSink,
+        own_cuit: str | None = None,
+        profile: ParseProfile = ParseProfile.BALANCED,
+        parse: Callable[[str, str | None, ParseProfile], dict | None] = _watch_file,
+    ):
+        self.workers = workers
+        self.sink = sink
+        self.own_cuit = own_cuit
+        self.profile = profile
+        self.parse = parse
+        self.executor = self._start()
+        # future -> (path, signature, start time, pool it runs in, attempt)
+        self.in_flight: dict[
+            Future, tuple[Path, FileSignature | None, float, ProcessPoolExecutor, int]
+        ] = {}
+        # Files submitted and not recorded yet, retries included
+        self._active: set[Path] = set()
+        # Files that changed while active, submitted again once recorded
+        self._changed: set[Path] = set()
+        # Files caught in a pool crash and their next attempt, retried one at a time
+        self._suspects: deque[tuple[Path, int]] = deque()
+        self._retrying: Path | None = None
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        if self.executor is broken:
+            logger.warning("A worker died, starting a new pool")
+            # The pool stops its surviving workers with SIGTERM, which they ignore
+            for process in list((broken._processes or {}).values()):
+                process.kill()
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._start()
+
+    def submit(self, path: Path):
+        path = path.resolve()
+        if path in self._active:
+            self._changed.add(path)
+            return
+        self._active.add(path)
+        self._submit(path, 1)
+
+    def _submit(self, path: Path, attempt: int):
+        args = (str(path), self.own_cuit, self.profile)
+        try:
+            future = self.executor.submit(self.parse, *args)
+        except BrokenProcessPool:
+            self._restart(self.executor)
+            future = self.executor.submit(self.parse, *args)
+        self.in_flight[future] = (
+            path,
+            _file_signature(path),
+            time.monotonic(),
+            self.executor,
+            attempt,
+        )
+
+    def _record(
+        self,
+        path: Path,
+        signature: FileSignature | None,
+        started: float,
+        record: dict | None,
+        status: str,
+        error: str | None = None,
+    ):
+        record = record or {"pdf_path": str(path)}
+        record["status"] = status
+        if error:
+            record["error"] = error
+        record["file_size"], record["file_mtime_ns"] = signature or (None, None)
+        record["processed_at"] = datetime.now().isoformat(timespec="seconds")
+        record["latency_sec"] = round(time.monotonic() - started, 2)
+        self.sink.write(record)
+
+    def _finish(self, future: Future):
+        path, signature, started, executor, attempt = self.in_flight.pop(future)
+        if path == self._retrying:
+            self._retrying = None
+        try:
+            record = future.result()
+        except BrokenProcessPool as e:
+            self._restart(executor)
+            if attempt < MAX_ATTEMPTS:
+                logger.warning(f"Worker died processing {path}, retrying it alone")
+                self._suspects.append((path, attempt + 1))
+                return
+            logger.error(f"Worker died processing {path}, giving up")
+            self._record(path, signature, started, None, STATUS_FAILED, str(e))
+        except Exception as e:
+            logger.error(f"Error processing {path}: {e}")
+            self._record(path, signature, started, None, STATUS_FAILED, str(e))
+        else:
+            if record:
+                self._record(path, signature, started, record, STATUS_OK)
+            else:
+                logger.warning(f"No data extracted from {path}")
+                self._record(path, signature, started, None, STATUS_NO_DATA)
+        self._active.discard(path)
+        if path in self._changed:
+            self._changed.discard(path)
+            self.submit(path)
+
+    def collect(self, wait: bool = False):
+        """Record the finished files, all of them (retries included) if ``wait``."""
+        while True:
+            for future in list(self.in_flight):
+                if wait or future.done():
+                    self._finish(future)
+            if self._retrying is None and self._suspects:
+                self._retrying, attempt = self._suspects.popleft()
+                self._submit(self._retrying, attempt)
+            if not wait or not (self.in_flight or self._suspects):
+                return
+
+    def close(self):
+        self.collect(wait=True)
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    """Watch directories for new invoices and append parsed results to a JSONL file."""
+    parser = argparse.ArgumentParser(description="Invoice watch-folder daemon")
+    parser.add_argument(
+        "--input_dir",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Directorios a vigilar en busca de facturas PDF",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        required=True,
+        help="Ruta al archivo JSONL de salida (se agregan registros)",
+    )
+    parser.add_argument("--cuit", type=str, help="Own CUIT number", default=None)
+    parser.add_argument(
+        "--profile",
+        type=ParseProfile,
+        choices=list(ParseProfile),
+        default=ParseProfile.BALANCED,
+        help="Speed/accuracy profile: fast, balanced or thorough (default: balanced)",
+    )
+    add_cpu_budget_args(parser)
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds a file must stay unchanged before parsing (default: 2)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Polling interval in seconds (default: 1)",
+    )
+    parser.add_argument(
+        "--poll", action="store_true", help="Force polling instead of inotify"
+    )
+    parser.add_argument(
+        "--recursive", action="store_true", help="Watch subdirectories too"
+    )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Ignore PDFs already present when the daemon starts",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="SQLite index of parsed invoices (default: $INVOICE_INDEX_PATH)",
+    )
+    parser.add_argument("--debug", action="store_true", help="Debug")
+    args = parser.parse_args()
+
+    log = setup_logging(debug=args.debug)
+    if args.index:
+        # Inherited by the worker processes
+        os.environ[INDEX_PATH_ENV] = args.index
+    directories = [Path(d).resolve() for d in args.input_dir]
+    for directory in directories:
+        if not directory.is_dir():
+            log.error(f"Directory not found: {directory}")
+            exit(1)
+
+    sink = JsonlSink(Path(args.output_file))
+    known = sink.processed_signatures()
+    if args.skip_existing:
+        for directory in directories:
+            pattern = "**/*.pdf" if args.recursive else "*.pdf"
+            for path in directory.glob(pattern):
+                signature = _file_signature(path)
+                if signature:
+                    known[path] = signature
+
+    watcher = FolderWatcher(
+        directories,
+        settle_seconds=args.settle,
+        poll_interval=args.poll_interval,
+        recursive=args.recursive,
+        force_polling=args.poll,
+        known=known,
+    )
+
+    def _handle_signal(signum, frame):
+        if watcher.stop_event.is_set():
+            return
+        log.info("Shutdown requested, draining in-flight invoices")
+        watcher.stop()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    num_workers = budget_from_args(args, log).workers
+
+    log.info(
+        f"Watching {', '.join(map(str, directories))} using {num_workers} workers"
+    )
+    pool = _WatchPool(num_workers, sink, args.cuit, args.profile)
+    try:
+        for ready in watcher.watch():
+            for path in ready:
+                pool.submit(path)
+            pool.collect()
+    finally:
+        pool.close()
+    sink.close()
+    log.info("Watcher stopped")
+
+
+if __name__ == "__main__":
+    main()
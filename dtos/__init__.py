@@ -1,7 +1,16 @@
 from .models import InvoiceData, ImportesResult, ImportesDebugInfo
+from .profiles import ParseProfile, ProfileSettings, PROFILE_SETTINGS
+from .records import InvoiceRecord, ImportesRecord
+from .columns import InvoiceColumns
 
 __all__ = [
     "InvoiceData",
     "ImportesResult",
     "ImportesDebugInfo",
+    "InvoiceRecord",
+    "ImportesRecord",
+    "InvoiceColumns",
+    "ParseProfile",
+    "ProfileSettings",
+    "PROFILE_SETTINGS",
 ]
@@ -0,0 +1,111 @@
+import math
+from array import array
+from typing import TYPE_CHECKING
+from .records import InvoiceRecord
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Column kind -> array typecode (strings are kept in lists)
+_TYPECODES = {"float": "d", "int": "q", "bool": "b"}
+
+
+class InvoiceColumns:
+    """Column-oriented accumulator of batch results.
+
+    Numbers and flags live in typed ``array.array`` buffers (NaN or a validity mask
+    for missing values) and text in plain lists, so a batch holds one buffer per
+    field instead of one dict per invoice. Chunks built in worker processes pickle
+    as flat buffers and are merged with ``extend``.
+    """
+
+    COLUMNS = {
+        "referencia": "str",
+        "fecha": "str",
+        "cuit": "str",
+        "importe_bruto": "float",
+        "importe_neto": "float",
+        "moneda": "str",
+        "tipo_cmp": "int",
+        "letra": "str",
+        "orden_compra": "str",
+        "qr_decoded": "bool",
+        "from_index": "bool",
+        "skipped_stages": "str",
+        "check": "bool",
+    }
+
+    def __init__(self, extra: dict[str, str] | None = None):
+        self.kinds = {**self.COLUMNS, **(extra or {})}
+        self._data = {
+            name: array(_TYPECODES[kind]) if kind in _TYPECODES else []
+            for name, kind in self.kinds.items()
+        }
+        self._valid = {
+            name: array("b") for name, kind in self.kinds.items() if kind == "int"
+        }
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, record: InvoiceRecord, **extra):
+        """Add one invoice, ``extra`` holds the values of the extra columns."""
+        for name, kind in self.kinds.items():
+            if name == "skipped_stages":
+                value = ",".join(record.skipped_stages)
+            elif name == "check":
+                value = record.check
+            elif name in extra:
+                value = extra[name]
+            else:
+                value = getattr(record, name, None)
+
+            column = self._data[name]
+            if kind == "float":
+                column.append(math.nan if value is None else value)
+            elif kind == "int":
+                column.append(0 if value is None else value)
+                self._valid[name].append(value is not None)
+            elif kind == "bool":
+                column.append(bool(value))
+            else:
+                column.append(value)
+        self._length += 1
+
+    def extend(self, other: "InvoiceColumns"):
+        if other.kinds != self.kinds:
+            raise ValueError("Cannot merge InvoiceColumns with different columns")
+        for name, column in other._data.items():
+            self._data[name].extend(column)
+        for name, valid in other._valid.items():
+            self._valid[name].extend(valid)
+        self._length += other._length
+
+    def to_numpy(self) -> dict[str, "np.ndarray"]:
+        """One NumPy array per column; numeric buffers are wrapped without copying."""
+        import numpy as np
+
+        arrays = {}
+        for name, kind in self.kinds.items():
+            column = self._data[name]
+            if kind == "float":
+                arrays[name] = np.frombuffer(column, dtype=np.float64)
+            elif kind == "int":
+                arrays[name] = np.frombuffer(column, dtype=np.int64)
+            elif kind == "bool":
+                arrays[name] = np.frombuffer(column, dtype=np.int8).astype(bool)
+            else:
+                arrays[name] = np.array(column, dtype=object)
+        return arrays
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        import numpy as np
+        import pandas as pd
+
+        arrays = self.to_numpy()
+        for name, valid in self._valid.items():
+            mask = ~np.frombuffer(valid, dtype=np.int8).astype(bool)
+            arrays[name] = pd.arrays.IntegerArray(arrays[name], mask)
+        return pd.DataFrame(arrays)
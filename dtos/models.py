@@ -24,37 +24,47 @@ class InvoiceData(BaseModel):
     letra: str | None = None  #!TODO Validate if letra can be inferred from tipo_cmp
     orden_compra: str | None = None
     qr_decoded: bool = Field(default=False)
+    # Result served from the invoice index instead of being parsed again
+    from_index: bool = Field(default=False)
+    # Pipeline stages skipped because the time budget ran out
+    skipped_stages: list[str] = Field(default_factory=list)
 
-    def _check_amounts(self):
-        if self.importe_neto is None or self.importe_bruto is None:
-            return False
+    @computed_field
+    @property
+    def check(self) -> bool:
+        return check_invoice(self)
 
-        # net amount cannot be greater than gross amount
-        if self.importe_neto > self.importe_bruto:
-            return False
 
-        # net amount + tax should be approximately equal to gross amount
-        tolerancia = 1.32
-        if self.importe_neto * tolerancia < self.importe_bruto:
-            return False
+def _check_amounts(invoice) -> bool:
+    if invoice.importe_neto is None or invoice.importe_bruto is None:
+        return False
 
-        return True
+    # net amount cannot be greater than gross amount
+    if invoice.importe_neto > invoice.importe_bruto:
+        return False
 
-    @computed_field
-    @property
-    def check(self) -> bool:
-        return (
-            any(
-                field is None
-                for field in [
-                    self.referencia,
-                    self.fecha,
-                    self.cuit,
-                    self.importe_bruto,
-                    self.importe_neto,
-                    self.letra,
-                    self.tipo_cmp,
-                ]
-            )
-            and self._check_amounts()
+    # net amount + tax should be approximately equal to gross amount
+    tolerancia = 1.32
+    if invoice.importe_neto * tolerancia < invoice.importe_bruto:
+        return False
+
+    return True
+
+
+def check_invoice(invoice) -> bool:
+    """Validation flag shared by ``InvoiceData`` and the internal ``InvoiceRecord``."""
+    return (
+        any(
+            field is None
+            for field in [
+                invoice.referencia,
+                invoice.fecha,
+                invoice.cuit,
+                invoice.importe_bruto,
+                invoice.importe_neto,
+                invoice.letra,
+                invoice.tipo_cmp,
+            ]
         )
+        and _check_amounts(invoice)
+    )
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from enum import StrEnum
+
+
+class ParseProfile(StrEnum):
+    """Speed/accuracy trade-off of the parsing pipeline."""
+
+    FAST = "fast"
+    BALANCED = "balanced"
+    THOROUGH = "thorough"
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    # Pages to extract digital text from (None = all pages)
+    max_text_pages: int | None = None
+    # Pages to scan for embedded QR images (None = all pages)
+    max_qr_pages: int | None = None
+    # Retry QR decoding with upscaling and binarization
+    qr_enhancements: bool = True
+    # Render whole pages and scan them when no embedded image holds the QR
+    qr_page_render: bool = False
+    # OCR the header when cuit/tipo_cmp/letra are missing
+    ocr_fallback: bool = True
+    # OCR the whole first page instead of the header crop
+    ocr_full_page: bool = False
+    # OCR the first page when the PDF has no digital text (scanned invoices)
+    ocr_without_text: bool = False
+
+
+PROFILE_SETTINGS: dict[ParseProfile, ProfileSettings] = {
+    ParseProfile.FAST: ProfileSettings(
+        max_text_pages=1,
+        max_qr_pages=1,
+        qr_enhancements=False,
+        ocr_fallback=False,
+    ),
+    ParseProfile.BALANCED: ProfileSettings(),
+    ParseProfile.THOROUGH: ProfileSettings(
+        qr_page_render=True,
+        ocr_full_page=True,
+        ocr_without_text=True,
+    ),
+}
@@ -0,0 +1,50 @@
+from dataclasses import dataclass, field, fields
+from .models import ImportesDebugInfo, InvoiceData, check_invoice
+
+
+@dataclass(slots=True)
+class ImportesRecord:
+    """Amounts found by the regex parser, debug info only when requested."""
+
+    importe_bruto: float | None = None
+    importe_neto: float | None = None
+    debug: ImportesDebugInfo | None = None
+
+
+@dataclass(slots=True)
+class InvoiceRecord:
+    """Lightweight invoice result used inside the pipeline.
+
+    Mirrors ``InvoiceData``; the pydantic model is only built at the API boundary
+    with ``to_model``.
+    """
+
+    referencia: str | None = None
+    fecha: str | None = None
+    cuit: str | None = None
+    importe_bruto: float | None = None
+    importe_neto: float | None = None
+    moneda: str = "ARS"
+    tipo_cmp: int | None = None
+    letra: str | None = None
+    orden_compra: str | None = None
+    qr_decoded: bool = False
+    # Result served from the invoice index instead of being parsed again
+    from_index: bool = False
+    skipped_stages: list[str] = field(default_factory=list)
+
+    @property
+    def check(self) -> bool:
+        return check_invoice(self)
+
+    def to_dict(self) -> dict:
+        """Same keys and order as ``InvoiceData.model_dump()``."""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["skipped_stages"] = list(self.skipped_stages)
+        data["check"] = self.check
+        return data
+
+    def to_model(self) -> InvoiceData:
+        return InvoiceData(
+            **{f.name: getattr(self, f.name) for f in fields(self)},
+        )
@@ -1,7 +1,74 @@
-import ollama
+import hashlib
 import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from .prompt_compaction import DEFAULT_TOKEN_BUDGET, compact_text
+
+if TYPE_CHECKING:
+    import asyncio
+    import ollama
+    from dtos import InvoiceData, InvoiceRecord
 
 TEXT_MODEL = "qwen2.5"
+DEFAULT_HOST = os.environ.get("OLLAMA_HOST", "http://172.20.160.1:11434")
+DEFAULT_TIMEOUT = 120.0
+
+# Prompt key -> (InvoiceData attribute, definition)
+FIELD_DEFINITIONS = {
+    "fecha": (
+        "fecha",
+        """The main invoice date. Convert to ISO format "YYYY-MM-DD".
+   - Look for "Fecha de Emision", "Fecha", or dates like "DD/MM/YYYY" or "DD-MM-YY".""",
+    ),
+    "cuit": (
+        "cuit",
+        """The issuer's Tax ID.
+   - Extract only the 11 digits (remove dashes/spaces).
+   - Look for "CUIT", "C.U.I.T".
+   - Formats: 30-12345678-9, 20123456789, etc.""",
+    ),
+    "referencia": (
+        "referencia",
+        """The full invoice number (Point of Sale + ID).
+   - Format: "XXXX-XXXXXXXX" (e.g., 0003-00004567).
+   - Look for "Comp. Nro", "Factura Nro", "Nº",  or patterns like 0001-00000001.""",
+    ),
+    "importe_bruto": (
+        "importe_bruto",
+        """The final TOTAL amount including taxes.
+   - Look for "Total", "Total a Pagar", "Importe Total".
+   - **Format:** The input uses comma (,) as decimal separator (e.g. 1.500,00 = 1500.00). Return a JSON Number (float).""",
+    ),
+    "importe_neto": (
+        "importe_neto",
+        """The taxable amount BEFORE taxes (Subtotal).
+   - Look for "Importe Neto", "Neto Gravado", "Subtotal".
+   - If multiple subtotals exist, sum them or pick the main one.""",
+    ),
+    "moneda": (
+        "moneda",
+        """Currency. "ARS" (Pesos) or "USD" (Dollars). Default to "ARS" if symbol is "$" or missing.""",
+    ),
+    "tipoCmp": (
+        "tipo_cmp",
+        """The numeric AFIP Document Code.
+   - Look for "Cod.", "Codigo", "Cod.Nº". Examples: 001, 006, 011, 051.
+   - Return as an Integer (e.g., 6).""",
+    ),
+    "tipoCodAut": (
+        "letra",
+        """The Invoice Letter/Class.
+   - Examples: "A", "B", "C", "M".
+   - Usually found in a box with the text "Factura" or just the big letter itself.""",
+    ),
+}
 
 PROMPT_TEMPLATE = """
 ### ROLE
@@ -11,70 +78,272 @@ Your goal is to parse raw OCR text from invoices and return a strictly formatted
 
 ### TARGET FIELDS DEFINITION
 Extract these fields from the text below. If a field is not found, return null.
+Lines marked [...] were omitted because they are not relevant.
 
-1. "fecha": The main invoice date. Convert to ISO format "YYYY-MM-DD".
-   - Look for "Fecha de Emision", "Fecha", or dates like "DD/MM/YYYY" or "DD-MM-YY".
-2. "cuit": The issuer's Tax ID. 
-   - Extract only the 11 digits (remove dashes/spaces).
-   - Look for "CUIT", "C.U.I.T".
-   - Formats: 30-12345678-9, 20123456789, etc.
-3. "referencia": The full invoice number (Point of Sale + ID).
-   - Format: "XXXX-XXXXXXXX" (e.g., 0003-00004567).
-   - Look for "Comp. Nro", "Factura Nro", "Nº",  or patterns like 0001-00000001.
-4. "importe_bruto": The final TOTAL amount including taxes.
-   - Look for "Total", "Total a Pagar", "Importe Total".
-   - **Format:** The input uses comma (,) as decimal separator (e.g. 1.500,00 = 1500.00). Return a JSON Number (float).
-5. "importe_neto": The taxable amount BEFORE taxes (Subtotal).
-   - Look for "Importe Neto", "Neto Gravado", "Subtotal".
-   - If multiple subtotals exist, sum them or pick the main one.
-6. "moneda": Currency. "ARS" (Pesos) or "USD" (Dollars). Default to "ARS" if symbol is "$" or missing.
-7. "tipoCmp": The numeric AFIP Document Code.
-   - Look for "Cod.", "Codigo", "Cod.Nº". Examples: 001, 006, 011, 051.
-   - Return as an Integer (e.g., 6).
-8. "tipoCodAut": The Invoice Letter/Class.
-   - Examples: "A", "B", "C", "M".
-   - Usually found in a box with the text "Factura" or just the big letter itself.
+{field_definitions}
 
 ### RAW TEXT INPUT
 {raw_text}
 
 ### RESPONSE
-Output ONLY the valid JSON object. Do not explain your reasoning.
+Output ONLY the valid JSON object with the keys {field_keys}. Do not explain your reasoning.
 """
 
+
+def build_prompt(raw_text: str, fields: list[str] | None = None) -> str:
+    """Fill ``PROMPT_TEMPLATE`` asking only for ``fields`` (prompt keys, default all)."""
+    fields = fields or list(FIELD_DEFINITIONS)
+    field_definitions = "\n".join(
+        f'{number}. "{key}": {FIELD_DEFINITIONS[key][1]}'
+        for number, key in enumerate(fields, start=1)
+    )
+    return PROMPT_TEMPLATE.format(
+        field_definitions=field_definitions,
+        raw_text=raw_text,
+        field_keys=", ".join(f'"{key}"' for key in fields),
+    )
+
+
+def missing_fields(invoice_data: "InvoiceData | InvoiceRecord") -> list[str]:
+    """Prompt keys of the fields the deterministic parsers did not find."""
+    return [
+        key
+        for key, (attribute, _) in FIELD_DEFINITIONS.items()
+        if key != "moneda" and getattr(invoice_data, attribute) is None
+    ]
+
+
+class ResponseCache:
+    """Thread-safe LRU of model responses keyed by model name and prompt hash."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+RESPONSE_CACHE = ResponseCache()
+
 logger = logging.getLogger(__name__)
 
+# Clients are shared per (host, timeout, client_args) so connections are kept alive
+# across calls. httpx.AsyncClient is bound to an event loop, async ones are per loop.
+_clients: dict[tuple, "ollama.Client"] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def _client_key(host: str, timeout: float | None, client_args: dict) -> tuple:
+    return host, timeout, repr(sorted(client_args.items()))
+
+
+def get_client(
+    host: str = DEFAULT_HOST,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    client_args: dict | None = None,
+) -> "ollama.Client":
+    """Return the shared, connection-pooled client for ``host``."""
+    import ollama
+
+    client_args = client_args or {}
+    key = _client_key(host, timeout, client_args)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = ollama.Client(host=host, timeout=timeout, **client_args)
+            _clients[key] = client
+    return client
+
+
+def get_async_client(
+    host: str = DEFAULT_HOST,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    client_args: dict | None = None,
+) -> "ollama.AsyncClient":
+    """Return the shared async client for ``host`` on the running event loop."""
+    import asyncio
+    import ollama
+
+    client_args = client_args or {}
+    key = _client_key(host, timeout, client_args)
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(key)
+    if client is None:
+        client = ollama.AsyncClient(host=host, timeout=timeout, **client_args)
+        clients[key] = client
+    return client
+
+
+def _is_retryable(error: Exception) -> bool:
+    import httpx
+    import ollama
+
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
 
 class AIParser:
     def __init__(
         self,
         text_content,
-        model="qwen2.5",
-        host="http://172.20.160.1:11434",
-        chat_args={},
-        client_args={},
+        model=TEXT_MODEL,
+        host=DEFAULT_HOST,
+        chat_args=None,
+        client_args=None,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        retries: int = 2,
+        backoff: float = 0.5,
+        fields: list[str] | None = None,
+        token_budget: int | None = DEFAULT_TOKEN_BUDGET,
+        own_cuit: str | None = None,
+        cache: ResponseCache | None = RESPONSE_CACHE,
     ):
+        """
+        ``fields`` limits the request to those prompt keys (see ``missing_fields``),
+        ``token_budget`` bounds the raw text sent (None sends it whole) and ``cache``
+        stores responses so identical prompts never reach the model twice.
+        """
         self.text_content = text_content
         self.model = model
         self.host = host
-        self.chat_args = chat_args
-        self.client_args = client_args
+        self.chat_args = chat_args or {}
+        self.client_args = client_args or {}
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.fields = fields
+        self.token_budget = token_budget
+        self.own_cuit = own_cuit
+        self.cache = cache
+        self._prompt = None
+
+    @property
+    def prompt(self) -> str:
+        if self._prompt is None:
+            text = self.text_content
+            if self.token_budget:
+                text = compact_text(text, self.token_budget, own_cuit=self.own_cuit)
+            self._prompt = build_prompt(text, self.fields)
+        return self._prompt
+
+    def _cache_key(self) -> str | None:
+        return ResponseCache.key(self.model, self.prompt) if self.cache else None
+
+    def _chat_kwargs(self) -> dict:
+        return dict(
+            model=self.model,
+            messages=[{"role": "user", "content": self.prompt}],
+            format="json",
+            **self.chat_args,
+        )
+
+    def _retry_delay(self, attempt: int) -> float | None:
+        """Seconds to wait before retrying ``attempt``, None when out of retries."""
+        if attempt >= self.retries:
+            return None
+        # Exponential backoff with jitter so parallel callers do not retry in lockstep
+        return self.backoff * 2**attempt * random.uniform(0.5, 1.5)
 
     def parse(self):
-        try:
-            client = ollama.Client(host=self.host, **self.client_args)
-            response = client.chat(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": PROMPT_TEMPLATE.format(raw_text=self.text_content),
-                    }
-                ],
-                format="json",
-                **self.chat_args,
-            )
-            return response["message"]["content"]
-        except Exception as e:
-            logger.error(f"Error during AI parsing: {e}")
-            return
+        cache_key = self._cache_key()
+        if cache_key and (cached := self.cache.get(cache_key)) is not None:
+            return cached
+
+        client = get_client(self.host, self.timeout, self.client_args)
+        attempt = 0
+        while True:
+            try:
+                response = client.chat(**self._chat_kwargs())
+                content = response["message"]["content"]
+                if cache_key:
+                    self.cache.set(cache_key, content)
+                return content
+            except Exception as e:
+                delay = self._retry_delay(attempt) if _is_retryable(e) else None
+                if delay is None:
+                    logger.error(f"Error during AI parsing: {e}")
+                    return
+                logger.warning(f"AI parsing failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    async def aparse(self):
+        import asyncio
+
+        cache_key = self._cache_key()
+        if cache_key and (cached := self.cache.get(cache_key)) is not None:
+            return cached
+
+        client = get_async_client(self.host, self.timeout, self.client_args)
+        attempt = 0
+        while True:
+            try:
+                response = await client.chat(**self._chat_kwargs())
+                content = response["message"]["content"]
+                if cache_key:
+                    self.cache.set(cache_key, content)
+                return content
+            except Exception as e:
+                delay = self._retry_delay(attempt) if _is_retryable(e) else None
+                if delay is None:
+                    logger.error(f"Error during AI parsing: {e}")
+                    return
+                logger.warning(f"AI parsing failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @classmethod
+    def parse_many(cls, texts: list[str], concurrency: int = 4, **kwargs) -> list:
+        """Parse several texts keeping up to ``concurrency`` requests in flight.
+
+        Results are returned in input order; ``kwargs`` are passed to ``AIParser``.
+        """
+        parsers = [cls(text, **kwargs) for text in texts]
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            return list(executor.map(lambda parser: parser.parse(), parsers))
+
+    @classmethod
+    async def aparse_many(
+        cls, texts: list[str], concurrency: int = 4, **kwargs
+    ) -> list:
+        """Async variant of ``parse_many``."""
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _parse(text):
+            async with semaphore:
+                return await cls(text, **kwargs).aparse()
+
+        return await asyncio.gather(*(_parse(text) for text in texts))
@@ -0,0 +1,77 @@
+import re
+from .regex_parser import RegexParser
+
+# Rough size of a token for Spanish invoice text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1500
+
+HEADER_LINES = 10
+TAIL_LINES = 8
+CONTEXT_LINES = 1
+TOTALS_REGEX = re.compile(
+    r"total|subtotal|neto|gravado|iva|importe|a pagar", re.IGNORECASE
+)
+GAP_MARKER = "[...]"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def compact_text(
+    raw_text: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    own_cuit: str | None = None,
+) -> str:
+    """Keep only the spans of ``raw_text`` relevant to the header fields and totals.
+
+    Lines are picked by priority until the token budget is used: the header, the
+    totals region (keyword lines and the tail of the document), date and CUIT
+    candidates from the top and amount candidates from the bottom, each with one
+    line of context. The kept lines are returned in document order, with a marker
+    where lines were dropped. Texts already within budget are returned unchanged.
+    """
+    if estimate_tokens(raw_text) <= token_budget:
+        return raw_text
+
+    regex_parser = RegexParser(raw_text, own_cuit=own_cuit)
+    lines = regex_parser.lines
+    candidates = regex_parser.candidate_lines()
+
+    def with_context(indexes):
+        for index in indexes:
+            yield from range(index - CONTEXT_LINES, index + CONTEXT_LINES + 1)
+
+    totals = [i for i, line in enumerate(lines) if TOTALS_REGEX.search(line)]
+    tail = range(len(lines) - TAIL_LINES, len(lines))
+    priorities = [
+        range(HEADER_LINES),
+        reversed(totals),
+        tail,
+        with_context(candidates["cuit"]),
+        with_context(candidates["fecha"]),
+        with_context(reversed(candidates["importe"])),
+    ]
+
+    selected: set[int] = set()
+    used = 0
+    for group in priorities:
+        for index in group:
+            if index in selected or not 0 <= index < len(lines):
+                continue
+            cost = estimate_tokens(lines[index])
+            if used + cost > token_budget:
+                break
+            selected.add(index)
+            used += cost
+
+    compacted = []
+    previous = -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            compacted.append(GAP_MARKER)
+        compacted.append(lines[index])
+        previous = index
+    if previous != len(lines) - 1:
+        compacted.append(GAP_MARKER)
+    return "\n".join(compacted)
@@ -1,20 +1,47 @@
 from urllib.parse import parse_qs, urlparse
 import base64
 import json
-import pymupdf
-from PIL import Image, ImageOps, ImageEnhance
-from pyzbar.pyzbar import decode
 import io
 import logging
-from dtos import InvoiceData
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator
+from dtos import InvoiceRecord
+from utils import Deadline, ResourceGuard, ResourceLimitExceeded
+from utils.pages import page_executor, page_workers, use_parallel_pages
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# pymupdf, PIL and pyzbar are imported where used, they dominate startup time
 
 logger = logging.getLogger(__name__)
 
+# Minimum remaining budget (seconds) to attempt the heavy stages
+ENHANCEMENT_MIN_SECONDS = 0.2
+PAGE_RENDER_MIN_SECONDS = 0.5
+
+PAGE_RENDER_DPI = 150
+# Only JPEG images can be decoded straight at a lower resolution (PIL draft mode)
+DOWNSCALABLE_FILTERS = ("DCTDecode",)
+
 
 class QRParser:
-    def __init__(self, file_content: io.BytesIO):
+    def __init__(
+        self,
+        file_content: io.BytesIO,
+        enhancements: bool = True,
+        render_pages: bool = False,
+        max_pages: int | None = None,
+        deadline: Deadline | None = None,
+        guard: ResourceGuard | None = None,
+    ):
         self.file_content = file_content
-        self.invoice_data = InvoiceData()
+        self.enhancements = enhancements
+        self.render_pages = render_pages
+        self.max_pages = max_pages
+        self.deadline = deadline or Deadline()
+        self.guard = guard or ResourceGuard()
+        self.invoice_data = InvoiceRecord()
 
     def _decode_afip_qr(self, url) -> dict | None:
         try:
@@ -47,8 +74,11 @@ class QRParser:
             logger.error(f"Error decoding AFIP QR: {e}")
             return None
 
-    def _try_decode_with_enhancements(self, pil_image: Image.Image):
+    def _try_decode_with_enhancements(self, pil_image: "Image.Image"):
         """Try to decode QR code with image enhancements."""
+        from PIL import Image, ImageOps
+        from pyzbar.pyzbar import decode
+
         width, height = pil_image.size
         if width < 60 or height < 60:
             return None  # Too small to be a QR code
@@ -62,6 +92,23 @@ class QRParser:
         except Exception:
             pass
 
+        if not self.enhancements:
+            return None
+
+        if not self.deadline.allows(ENHANCEMENT_MIN_SECONDS):
+            self.deadline.skip("qr_enhancements")
+            return None
+
+        # The enhanced copy is twice as large on each side
+        if self.guard.image_scale(width * 2, height * 2) < 1:
+            self.guard.trip(
+                "enhancement_skipped",
+                f"Image of {width}x{height} too large to enhance for QR decoding",
+            )
+            return None
+        if not self.guard.reserve_pixels(width * height * 4):
+            return None
+
         try:
             # A. Resize: Zoom x2
 
@@ -84,11 +131,156 @@ class QRParser:
         except Exception:
             pass
 
-    def extract_and_parse(self) -> InvoiceData | None:
+    def _afip_invoice_data(self, qr_codes) -> InvoiceRecord | None:
+        for qr_code in qr_codes:
+            qr_data = qr_code.data.decode("utf-8")
+            if "arca.gob.ar" in qr_data or "afip.gob.ar" in qr_data:
+                afip_data = self._decode_afip_qr(qr_data)
+                if afip_data:
+                    return InvoiceRecord(**afip_data, qr_decoded=True)
+        return None
+
+    def _scan_rendered_pages(self, doc, page_count: int) -> InvoiceRecord | None:
+        """Render whole pages and look for the QR (vector or tiled QR codes)."""
+        from PIL import Image
+        from pyzbar.pyzbar import decode
+
+        for page_num in range(page_count):
+            if page_num and not self.deadline.allows(PAGE_RENDER_MIN_SECONDS):
+                self.deadline.skip("qr_page_render")
+                return None
+            self.guard.check_memory("QR page render")
+            page = doc[page_num]
+            width = page.rect.width / 72 * PAGE_RENDER_DPI
+            height = page.rect.height / 72 * PAGE_RENDER_DPI
+            scale = self.guard.image_scale(width, height)
+            dpi = PAGE_RENDER_DPI
+            if scale < 1:
+                dpi = max(1, int(PAGE_RENDER_DPI * scale))
+                self.guard.trip(
+                    "render_downscaled",
+                    f"Page {page_num + 1} too large to render at "
+                    f"{PAGE_RENDER_DPI} dpi, using {dpi}",
+                )
+            if not self.guard.reserve_pixels(int(width * height * scale**2)):
+                return None
+            pixmap = page.get_pixmap(dpi=dpi)
+            image = Image.frombytes(
+                "RGB", (pixmap.width, pixmap.height), pixmap.samples
+            )
+            qr_codes = decode(image)
+            if qr_codes:
+                invoice_data = self._afip_invoice_data(qr_codes)
+                if invoice_data:
+                    return invoice_data
+        return None
+
+    def _page_images(self, doc, page_num: int) -> Iterator[tuple[bytes, float]]:
+        """Embedded images of a page and their downscale factor, last first.
+
+        The QR is usually at the end. Images above the size limit are kept only
+        when they can be decoded at a lower resolution (JPEG), others are skipped.
+        Images are extracted one at a time, a scan that stops at the QR does not
+        extract the rest of the page.
+        """
+        for xref, _, width, height, *_, image_filter, _ in reversed(
+            doc[page_num].get_images(full=True)
+        ):
+            scale = self.guard.image_scale(width, height)
+            if scale < 1 and image_filter not in DOWNSCALABLE_FILTERS:
+                self.guard.trip(
+                    "image_skipped",
+                    f"Skipping {width}x{height} {image_filter or 'raw'} image "
+                    f"on page {page_num + 1}",
+                )
+                continue
+            yield doc.extract_image(xref)["image"], scale
+
+    def _open_image(self, image_bytes: bytes, scale: float) -> "Image.Image | None":
+        """Open an embedded image, decoding it at ``scale`` when below 1."""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(image_bytes))
+        if scale < 1:
+            width, height = image.size
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            # draft() picks the smallest JPEG reduction still >= size, then resize
+            image.draft(image.mode, size)
+            image.thumbnail(size)
+            self.guard.trip(
+                "image_downscaled",
+                f"Downscaled {width}x{height} image to {image.width}x{image.height}",
+            )
+        if not self.guard.reserve_pixels(image.width * image.height):
+            return None
+        return image
+
+    def _scan_images(
+        self, images: Iterable[tuple[bytes, float]]
+    ) -> InvoiceRecord | None:
+        for image_bytes, scale in images:
+            if self.guard.exhausted:
+                return None
+            image = self._open_image(image_bytes, scale)
+            if image is None:
+                return None
+            qr_codes = self._try_decode_with_enhancements(image)
+
+            if not qr_codes:
+                continue
+
+            invoice_data = self._afip_invoice_data(qr_codes)
+            if invoice_data:
+                return invoice_data
+        return None
+
+    def _scan_pages_parallel(self, doc, page_count: int) -> InvoiceRecord | None:
+        """Decode the images of several pages at once, first hit in page order wins.
+
+        PyMuPDF is not thread-safe: each thread extracts its page's images one at
+        a time under a lock shared by the document, and decodes them (PIL and
+        pyzbar release the GIL) outside of it. Extraction stays lazy, a page
+        stops at its QR and the other pages stop once the winner is known.
+        """
+        workers = page_workers()
+        executor = page_executor("thread", workers)
+        window = workers * 2
+        doc_lock = threading.Lock()
+        found = threading.Event()
+
+        def images(page_num: int) -> Iterator[tuple[bytes, float]]:
+            page_images = self._page_images(doc, page_num)
+            while not found.is_set():
+                with doc_lock:
+                    image = next(page_images, None)
+                if image is None:
+                    return
+                yield image
+
+        for start in range(0, page_count, window):
+            if self.guard.exhausted:
+                return None
+            self.guard.check_memory("QR scan")
+            futures = [
+                executor.submit(self._scan_images, images(page_num))
+                for page_num in range(start, min(start + window, page_count))
+            ]
+            for future in futures:
+                invoice_data = future.result()
+                if invoice_data:
+                    found.set()
+                    for pending in futures:
+                        pending.cancel()
+                    return invoice_data
+        return None
+
+    def extract_and_parse(self) -> InvoiceRecord | None:
         """
         Look for QR code.
         """
         try:
+            import pymupdf
+
             doc = pymupdf.open(stream=self.file_content)
             if not doc:
                 return None
@@ -97,30 +289,27 @@ class QRParser:
             return None
 
         try:
-            for page_num in range(len(doc)):
-                images = doc[page_num].get_images(full=True)
-
-                if not images:
-                    continue
-
-                # List of QR founded
-                for img_index, img in enumerate(
-                    reversed(images)
-                ):  # QR is usually at the end
-                    base_image = doc.extract_image(img[0])
-                    image_bytes = base_image["image"]
-                    image = Image.open(io.BytesIO(image_bytes))
-                    qr_codes = self._try_decode_with_enhancements(image)
-
-                    if not qr_codes:
-                        continue
-
-                    for qr_code in qr_codes:
-                        qr_data = qr_code.data.decode("utf-8")
-                        if "arca.gob.ar" in qr_data or "afip.gob.ar" in qr_data:
-                            afip_data = self._decode_afip_qr(qr_data)
-                            if afip_data:
-                                return InvoiceData(**afip_data, qr_decoded=True)
+            page_count = self.guard.pages(min(len(doc), self.max_pages or len(doc)))
+            if use_parallel_pages(page_count):
+                invoice_data = self._scan_pages_parallel(doc, page_count)
+                if invoice_data:
+                    return invoice_data
+            else:
+                for page_num in range(page_count):
+                    if self.guard.exhausted:
+                        return None
+                    self.guard.check_memory("QR scan")
+                    invoice_data = self._scan_images(self._page_images(doc, page_num))
+                    if invoice_data:
+                        return invoice_data
+
+            if self.render_pages and not self.guard.exhausted:
+                if not self.deadline.allows(PAGE_RENDER_MIN_SECONDS):
+                    self.deadline.skip("qr_page_render")
+                    return None
+                return self._scan_rendered_pages(doc, page_count)
+        except ResourceLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error extracting QR codes: {e}")
             return None
@@ -2,10 +2,16 @@ import re
 from datetime import datetime
 import statistics
 import logging
-from dtos import InvoiceData, ImportesResult, ImportesDebugInfo
+from dtos import InvoiceRecord, ImportesRecord, ImportesDebugInfo
 
 logger = logging.getLogger(__name__)
 
+DATE_REGEX = r"\b(\d{1,2}([-\.\/\s])\d{1,2}\2\d{2,4})\b"
+CUIT_REGEX = r"\b(?:20|23|27|30|33)(?:-?\d{8}-?\d)\b"
+# Amounts with comma and with dot as decimal separator
+AMOUNT_ARG_REGEX = r"\b(?:\d{1,3}(?:\.\d{3})+|\d+),\d{2}\b"
+AMOUNT_US_REGEX = r"\b(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2}\b"
+
 
 class RegexParser:
     """
@@ -21,11 +27,17 @@ class RegexParser:
     """
 
     def __init__(
-        self, raw_text: str, own_cuit: str | None = None, verbose: bool = False
+        self,
+        raw_text: str,
+        own_cuit: str | None = None,
+        verbose: bool = False,
+        debug: bool = False,
     ):
         self.text = raw_text
         self.own_cuit = own_cuit
-        self.invoice_data = InvoiceData()
+        # Collect amount candidates in ImportesRecord.debug
+        self.debug = debug
+        self.invoice_data = InvoiceRecord()
         self.lines = [line.strip() for line in raw_text.split("\n") if line.strip()]
 
     def _parse_arg_float(self, num_str):
@@ -81,8 +93,7 @@ class RegexParser:
         return None
 
     def _extract_fecha(self) -> str | None:
-        date_regex = r"\b(\d{1,2}([-\.\/\s])\d{1,2}\2\d{2,4})\b"
-        date_matches = re.findall(date_regex, self.text)
+        date_matches = re.findall(DATE_REGEX, self.text)
         if date_matches:
             # The issue date is the first one in the document
             for full_date, separator in date_matches:
@@ -104,16 +115,15 @@ class RegexParser:
                     pass
 
     def _extract_cuit(self) -> str | None:
-        cuit_regex = r"\b(?:20|23|27|30|33)(?:-?\d{8}-?\d)\b"
         for line in self.lines[:10]:  # Only search in the header (first 10 lines)
-            matches = re.findall(cuit_regex, line)
+            matches = re.findall(CUIT_REGEX, line)
             for match in matches:
                 cuit = match.replace("-", "")
                 if cuit != self.own_cuit:
                     return cuit
         return None
 
-    def extract_importes(self) -> ImportesResult:
+    def extract_importes(self) -> ImportesRecord:
         """Extract amounts with comma and dot as separators.
         - The gross amount should be the largest of all.
         - The net amount should be immediately below the gross.
@@ -121,8 +131,7 @@ class RegexParser:
         """
         found_amounts_with_position = []
 
-        regex_arg = r"\b(?:\d{1,3}(?:\.\d{3})+|\d+),\d{2}\b"
-        matches_arg = re.finditer(regex_arg, self.text)
+        matches_arg = re.finditer(AMOUNT_ARG_REGEX, self.text)
 
         for m in matches_arg:
             val_str = m.group().replace(".", "").replace(",", ".")
@@ -132,8 +141,7 @@ class RegexParser:
             except ValueError:
                 continue
 
-        regex_us = r"\b(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2}\b"
-        matches_us = re.finditer(regex_us, self.text)
+        matches_us = re.finditer(AMOUNT_US_REGEX, self.text)
         for m in matches_us:
             val_str = m.group().replace(",", "")
             try:
@@ -157,8 +165,9 @@ class RegexParser:
             if not any(abs(existing - amt) < 1 for existing in unique_amounts):
                 unique_amounts.append(amt)
 
-        debug_info = ImportesDebugInfo(candidatos_encontrados=unique_amounts[:5])
-        result = ImportesResult(debug=debug_info)
+        result = ImportesRecord()
+        if self.debug:
+            result.debug = ImportesDebugInfo(candidatos_encontrados=unique_amounts[:5])
 
         if not unique_amounts:
             return result
@@ -174,8 +183,9 @@ class RegexParser:
                 if (median * lower) <= amt <= (median * upper)
             ]
             unique_amounts = sorted(filtered_amounts, reverse=True)
-            result.debug.median = median
-            result.debug.filtered_candidatos = unique_amounts
+            if result.debug:
+                result.debug.median = median
+                result.debug.filtered_candidatos = unique_amounts
 
         result.importe_bruto = unique_amounts[0]  # The largest is the gross amount
 
@@ -230,7 +240,19 @@ class RegexParser:
             return oc_matches[0]
         return None
 
-    def extract_data(self) -> InvoiceData:
+    def candidate_lines(self) -> dict[str, list[int]]:
+        """Indexes in ``self.lines`` of lines holding date, CUIT or amount candidates."""
+        candidates = {"fecha": [], "cuit": [], "importe": []}
+        for index, line in enumerate(self.lines):
+            if re.search(DATE_REGEX, line):
+                candidates["fecha"].append(index)
+            if re.search(CUIT_REGEX, line):
+                candidates["cuit"].append(index)
+            if re.search(AMOUNT_ARG_REGEX, line) or re.search(AMOUNT_US_REGEX, line):
+                candidates["importe"].append(index)
+        return candidates
+
+    def extract_data(self) -> InvoiceRecord:
         try:
             # 1. REFERENCE (format 0000-00000000)
             self.invoice_data.referencia = self._extract_referencia()
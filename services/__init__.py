@@ -1,4 +1,5 @@
 from .data_extraction_service import DataExtractionService
 from .ocr_service import OCRService
+from .invoice_index import InvoiceIndex, default_index
 
-__all__ = ["OCRService", "DataExtractionService"]
+__all__ = ["OCRService", "DataExtractionService", "InvoiceIndex", "default_index"]
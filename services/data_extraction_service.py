@@ -1,20 +1,44 @@
 from parsers import RegexParser, QRParser
-from dtos import InvoiceData
+from dtos import InvoiceRecord, ParseProfile, ProfileSettings
+from utils import Deadline, ResourceGuard
 from io import BytesIO
+from .invoice_index import InvoiceIndex
 
 
 class DataExtractionService:
     def __init__(
-        self, file_content: BytesIO, raw_text: str, own_cuit: str | None = None
+        self,
+        file_content: BytesIO,
+        raw_text: str,
+        own_cuit: str | None = None,
+        settings: ProfileSettings | None = None,
+        deadline: Deadline | None = None,
+        guard: ResourceGuard | None = None,
+        index: InvoiceIndex | None = None,
+        profile: ParseProfile = ParseProfile.BALANCED,
     ):
+        settings = settings or ProfileSettings()
+        self.index = index
+        self.profile = profile
         self.raw_text = raw_text
         self.regex_parser = RegexParser(raw_text, own_cuit=own_cuit)
-        self.qr_parser = QRParser(file_content)
+        self.qr_parser = QRParser(
+            file_content,
+            enhancements=settings.qr_enhancements,
+            render_pages=settings.qr_page_render,
+            max_pages=settings.max_qr_pages,
+            deadline=deadline,
+            guard=guard,
+        )
 
-    def parse(self) -> InvoiceData | None:
+    def parse(self) -> InvoiceRecord | None:
         # Primero intento con QR
         qr_data = self.qr_parser.extract_and_parse()
         if qr_data:
+            # Same invoice already parsed, maybe from other bytes: skip the rest
+            indexed = self.index.get(qr_data, self.profile) if self.index else None
+            if indexed:
+                return indexed
             qr_data = self._enrich_qr_with_regex(qr_data)
             return qr_data
         else:
@@ -22,7 +46,7 @@ class DataExtractionService:
             regex_data = self.regex_parser.extract_data()
             return regex_data
 
-    def _enrich_qr_with_regex(self, qr_data: InvoiceData) -> InvoiceData:
+    def _enrich_qr_with_regex(self, qr_data: InvoiceRecord) -> InvoiceRecord:
         # El importe neto no viene en el qr
         regex_importes = self.regex_parser.extract_importes()
         qr_data.importe_neto = regex_importes.importe_neto
@@ -0,0 +1,175 @@
+"""Persistent index of parsed invoices keyed by their AFIP identity."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+
+from dtos import InvoiceRecord, ParseProfile
+from utils import METRICS
+
+logger = logging.getLogger(__name__)
+
+# SQLite file of the index, unset to disable it
+INDEX_PATH_ENV = "INVOICE_INDEX_PATH"
+
+# Per-document outcome of the pipeline, never stored
+_TRANSIENT_FIELDS = ("skipped_stages", "from_index")
+
+# From the cheapest to the most complete pass
+_PROFILE_ORDER = tuple(ParseProfile)
+
+# Bumped when the table changes, older index files are rebuilt from scratch
+_SCHEMA_VERSION = 2
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    cuit TEXT NOT NULL,
+    tipo_cmp INTEGER NOT NULL,
+    pto_vta INTEGER NOT NULL,
+    nro INTEGER NOT NULL,
+    profile TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (cuit, tipo_cmp, pto_vta, nro, profile)
+)
+"""
+
+
+class InvoiceIndex:
+    """Finalized invoices keyed by (issuer CUIT, tipo_cmp, punto de venta, número).
+
+    The same invoice often arrives as different PDF bytes (re-prints, e-mail
+    producers), but its QR always carries that identity. After a QR hit the
+    pipeline returns the stored result instead of running regex enrichment and
+    the OCR fallback again. Hits and misses are counted in ``METRICS``
+    (``index.hit``, ``index.miss``, ``index.stored``).
+
+    Results are stored per profile: a ``fast`` parse skips pages and the OCR
+    fallback, so it is only served to ``fast`` lookups. A lookup accepts the
+    result of its own profile or of a more complete one.
+
+    Safe to share between threads; each process opens its own connection, so
+    batch and API workers can use the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection inherited through fork must not be used by the child
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            # Readers do not block the writer of another worker
+            connection.execute("PRAGMA journal_mode=WAL")
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version < _SCHEMA_VERSION:
+                # Only a cache of parse results, dropping it is safe
+                connection.execute("DROP TABLE IF EXISTS invoices")
+                connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            connection.execute(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    @staticmethod
+    def key(record: InvoiceRecord) -> tuple[str, int, int, int] | None:
+        """Identity of ``record``, None when the QR did not provide all of it."""
+        if not (record.qr_decoded and record.cuit and record.tipo_cmp):
+            return None
+        try:
+            pto_vta, nro = (int(part) for part in (record.referencia or "").split("-"))
+        except ValueError:
+            return None
+        return record.cuit, record.tipo_cmp, pto_vta, nro
+
+    def get(
+        self, record: InvoiceRecord, profile: ParseProfile = ParseProfile.BALANCED
+    ) -> InvoiceRecord | None:
+        """Stored invoice with the identity of ``record``, flagged ``from_index``.
+
+        Only results of ``profile`` or a more complete one are returned, the most
+        complete first.
+        """
+        key = self.key(record)
+        if key is None:
+            return None
+        with self._lock:
+            rows = dict(
+                self._connect()
+                .execute(
+                    "SELECT profile, data FROM invoices "
+                    "WHERE cuit = ? AND tipo_cmp = ? AND pto_vta = ? AND nro = ?",
+                    key,
+                )
+                .fetchall()
+            )
+        accepted = _PROFILE_ORDER[_PROFILE_ORDER.index(ParseProfile(profile)) :]
+        data = next((rows[p] for p in reversed(accepted) if p in rows), None)
+        if data is None:
+            METRICS.increment("index.miss")
+            return None
+        METRICS.increment("index.hit")
+        return InvoiceRecord(**json.loads(data), from_index=True)
+
+    def put(
+        self, record: InvoiceRecord, profile: ParseProfile = ParseProfile.BALANCED
+    ) -> bool:
+        """Store ``record`` parsed with ``profile``, replacing an older result."""
+        key = self.key(record)
+        if key is None:
+            return False
+        data = {
+            f.name: getattr(record, f.name)
+            for f in fields(record)
+            if f.name not in _TRANSIENT_FIELDS
+        }
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO invoices VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, str(ParseProfile(profile)), json.dumps(data), time.time()),
+            )
+        METRICS.increment("index.stored")
+        return True
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*) FROM invoices").fetchone()
+        return row[0]
+
+    def stats(self) -> dict:
+        """Entries in the index and this process' lookups."""
+        hits, misses = METRICS.get("index.hit"), METRICS.get("index.miss")
+        lookups = hits + misses
+        return {
+            "entries": self.count(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+_default_index: InvoiceIndex | None = None
+
+
+def default_index() -> InvoiceIndex | None:
+    """Index at ``$INVOICE_INDEX_PATH``, None when it is not set."""
+    global _default_index
+    path = os.environ.get(INDEX_PATH_ENV)
+    if not path:
+        return None
+    if _default_index is None or _default_index.path != path:
+        _default_index = InvoiceIndex(path)
+    return _default_index
@@ -1,37 +1,145 @@
-import pdfplumber
-import pytesseract
-from pdf2image import convert_from_bytes
-from typing import TYPE_CHECKING
+import time
+from io import BytesIO
+from concurrent.futures import TimeoutError as FutureTimeout
+from utils import Deadline, ResourceGuard
+from utils.pages import page_chunks, page_executor, page_workers, use_parallel_pages
 
-if TYPE_CHECKING:
-    from io import BytesIO
+
+def _extract_text_range(pdf_bytes: bytes, start: int, stop: int) -> list[str]:
+    """Digital text of pages ``start``..``stop - 1``, run in a page worker process."""
+    import pdfplumber
+
+    with pdfplumber.open(BytesIO(pdf_bytes), pages=range(start + 1, stop + 1)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+# pdf2image default resolution for the OCR pass
+OCR_DPI = 200
+# Stage reported when the time budget cut the text extraction short
+TEXT_STAGE = "text_pages"
 
 
 class OCRService:
-    def __init__(self, file_content: "BytesIO"):
+    def __init__(self, file_content: BytesIO, guard: ResourceGuard | None = None):
         self.file_content = file_content
+        self.guard = guard or ResourceGuard()
+        # First page size in points, known once the digital text was read
+        self.page_size: tuple[float, float] | None = None
 
-    def extract_digital_text(self) -> str | None:
-        text = ""
+    def _extract_pages_parallel(self, page_count: int, deadline: Deadline) -> list[str]:
+        """Split the pages across the page worker processes, keeping page order.
+
+        The first chunk (the header) is always awaited; later chunks only while
+        the deadline lasts, the pages read so far are returned when it expires.
+        """
+        workers = page_workers()
+        executor = page_executor("process", workers)
+        # bytes() is a no-op for BytesIO, shared memory views must be copied to pickle
+        pdf_bytes = bytes(self.file_content.getvalue())
+        futures = [
+            executor.submit(_extract_text_range, pdf_bytes, chunk.start, chunk.stop)
+            for chunk in page_chunks(page_count, workers)
+        ]
+        texts = futures[0].result()
+        for index, future in enumerate(futures[1:], start=1):
+            try:
+                texts += future.result(timeout=deadline.remaining())
+            except FutureTimeout:
+                deadline.skip(TEXT_STAGE)
+                for pending in futures[index:]:
+                    pending.cancel()
+                break
+        return texts
+
+    def extract_digital_text(
+        self, max_pages: int | None = None, deadline: Deadline | None = None
+    ) -> str | None:
+        """Digital text of the first ``max_pages`` pages, None for scanned PDFs.
+
+        The first page is always read. The ``deadline`` is checked between pages
+        (between chunks when they are split across workers); once it expires the
+        rest is skipped as ``text_pages`` and the text read so far is returned.
+        """
+        import pdfplumber
+
+        deadline = deadline or Deadline()
         with pdfplumber.open(self.file_content) as pdf:
-            for page in pdf.pages:
-                text += (page.extract_text() or "") + "\n"
+            pages = pdf.pages[:max_pages]
+            pages = pages[: self.guard.pages(len(pages))]
+            if pages:
+                self.page_size = (float(pages[0].width), float(pages[0].height))
+            if use_parallel_pages(len(pages)):
+                texts = self._extract_pages_parallel(len(pages), deadline)
+            else:
+                texts = []
+                for page in pages:
+                    if texts and deadline.expired:
+                        deadline.skip(TEXT_STAGE)
+                        break
+                    texts.append(page.extract_text() or "")
+        self.guard.check_memory("text extraction")
+        text = "".join(page_text + "\n" for page_text in texts)
         return text if len(text.strip()) > 50 else None
 
-    def extract_text_with_ocr(self) -> str:
-        """Extract text from PDF using OCR (limited to first page header)."""
+    def _ocr_dpi(self) -> int | None:
+        """Resolution for the OCR pass within the guard's limits, None to skip it."""
+        if self.page_size is None:
+            return OCR_DPI
+        width, height = (side / 72 * OCR_DPI for side in self.page_size)
+        scale = self.guard.image_scale(width, height)
+        dpi = OCR_DPI
+        if scale < 1:
+            dpi = max(1, int(OCR_DPI * scale))
+            self.guard.trip(
+                "ocr_downscaled", f"Page too large for OCR at {OCR_DPI} dpi, using {dpi}"
+            )
+        if not self.guard.reserve_pixels(int(width * height * (dpi / OCR_DPI) ** 2)):
+            return None
+        return dpi
+
+    def extract_text_with_ocr(
+        self, header_only: bool = True, timeout: float | None = None
+    ) -> str:
+        """Extract text from PDF using OCR (first page, limited to the header by default).
+
+        ``timeout`` bounds the whole call in seconds; poppler and tesseract raise
+        when it is exceeded. Oversized pages are rasterized at a lower resolution
+        and the pass is skipped once the document's pixel budget is spent.
+        """
+        import pytesseract
+        from pdf2image import convert_from_bytes
+
         text = ""
+        dpi = self._ocr_dpi()
+        if dpi is None:
+            return text
+        self.guard.check_memory("OCR")
+
+        started = time.monotonic()
         images = convert_from_bytes(
-            self.file_content.getvalue(), first_page=1, last_page=1, fmt="jpeg"
+            self.file_content.getvalue(),
+            dpi=dpi,
+            first_page=1,
+            last_page=1,
+            fmt="jpeg",
+            timeout=timeout,
         )
         if not images:
             return text
 
         page_image = images[0]
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - started), 0.001)
+        # pytesseract treats a zero timeout as "no timeout"
+        tesseract_timeout = timeout or 0
+        if not header_only:
+            return pytesseract.image_to_string(page_image, timeout=tesseract_timeout)
 
         # Crop first 30% of the image
         width, height = page_image.size
         cropped_image = page_image.crop(
             (0, 0, width, height * 0.3)
         )  # left, upper, right, lower
-        return pytesseract.image_to_string(cropped_image, config="--psm 6")
+        return pytesseract.image_to_string(
+            cropped_image, config="--psm 6", timeout=tesseract_timeout
+        )
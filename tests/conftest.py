@@ -0,0 +1,39 @@
+from io import BytesIO
+
+import pytest
+
+
+def _make_pdf(
+    text: str = "",
+    pages: int = 1,
+    images: list[tuple[int, int, str]] = (),
+    **save_options,
+) -> bytes:
+    """PDF with ``pages`` text pages and (width, height, format) images on page 1.
+
+    Each page starts with a ``Pagina <n>`` line followed by ``text`` and enough
+    filler to count as digital text. ``save_options`` go to ``Document.tobytes``
+    (encryption, passwords).
+    """
+    import pymupdf
+
+    doc = pymupdf.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(
+            pymupdf.Rect(72, 72, 500, 400),
+            f"Pagina {number + 1}\n{text}\n" + "texto " * 20,
+        )
+    for width, height, image_format in images:
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (width, height), "white").save(buffer, image_format)
+        doc[0].insert_image(pymupdf.Rect(72, 100, 272, 300), stream=buffer.getvalue())
+    return doc.tobytes(**save_options)
+
+
+@pytest.fixture
+def make_pdf():
+    """Factory building PDFs with pymupdf, see ``_make_pdf``."""
+    return _make_pdf
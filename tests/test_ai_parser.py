@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from parsers import AIParser
+from parsers.ai_parser import RESPONSE_CACHE, build_prompt, missing_fields
+from parsers.prompt_compaction import compact_text, estimate_tokens
+from dtos import InvoiceData
+
+CONTENT = json.dumps({"cuit": "20161247953", "referencia": "0001-00000301"})
+
+
+class OllamaStub(ThreadingHTTPServer):
+    """Minimal emulation of the Ollama /api/chat endpoint."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), _ChatHandler)
+        self.latency = latency
+        self.failures = failures
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.client_ports = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.client_ports.add(self.client_address[1])
+            fail = server.failures > 0
+            server.failures -= 1
+        try:
+            time.sleep(server.latency)
+            if fail:
+                payload, status = {"error": "model overloaded"}, 503
+            else:
+                payload = {
+                    "model": body["model"],
+                    "created_at": "2025-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": CONTENT},
+                    "done": True,
+                }
+                status = 200
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    RESPONSE_CACHE.clear()
+    yield
+    RESPONSE_CACHE.clear()
+
+
+@pytest.fixture
+def ollama_stub():
+    servers = []
+
+    def start(**kwargs):
+        server = OllamaStub(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_reuses_connection(ollama_stub):
+    server = ollama_stub()
+    for i in range(3):
+        assert AIParser(f"texto {i}", host=server.url).parse() == CONTENT
+    assert server.requests == 3
+    assert len(server.client_ports) == 1
+
+
+def test_parse_many_keeps_requests_in_flight(ollama_stub):
+    server = ollama_stub(latency=0.2)
+    started = time.monotonic()
+    texts = [f"texto {i}" for i in range(8)]
+    results = AIParser.parse_many(texts, concurrency=4, host=server.url)
+    elapsed = time.monotonic() - started
+
+    assert results == [CONTENT] * 8
+    assert server.max_in_flight == 4
+    assert elapsed < 8 * 0.2 * 0.75
+
+
+def test_aparse_many_keeps_requests_in_flight(ollama_stub):
+    server = ollama_stub(latency=0.2)
+    results = asyncio.run(
+        AIParser.aparse_many(
+            [f"texto {i}" for i in range(6)], concurrency=3, host=server.url
+        )
+    )
+    assert results == [CONTENT] * 6
+    assert server.max_in_flight == 3
+
+
+def test_parse_retries_server_errors(ollama_stub):
+    server = ollama_stub(failures=2)
+    parser = AIParser("texto", host=server.url, retries=2, backoff=0.01)
+    assert parser.parse() == CONTENT
+    assert server.requests == 3
+
+
+def test_parse_gives_up_after_retries(ollama_stub):
+    server = ollama_stub(failures=5)
+    parser = AIParser("texto", host=server.url, retries=1, backoff=0.01)
+    assert parser.parse() is None
+    assert server.requests == 2
+
+
+def test_parse_timeout(ollama_stub):
+    server = ollama_stub(latency=1.0)
+    parser = AIParser("texto", host=server.url, timeout=0.2, retries=0)
+    started = time.monotonic()
+    assert parser.parse() is None
+    assert time.monotonic() - started < 0.9
+
+
+def test_identical_prompts_hit_the_model_once(ollama_stub):
+    server = ollama_stub()
+    assert AIParser("texto", host=server.url).parse() == CONTENT
+    assert AIParser("texto", host=server.url).parse() == CONTENT
+    assert AIParser("texto", model="otro", host=server.url).parse() == CONTENT
+    assert server.requests == 2
+    assert RESPONSE_CACHE.hits == 1
+
+
+def test_prompt_asks_only_for_missing_fields():
+    invoice_data = InvoiceData(
+        referencia="0001-00000301",
+        fecha="2025-07-11",
+        importe_bruto=1210.0,
+        importe_neto=1000.0,
+        tipo_cmp=1,
+    )
+    fields = missing_fields(invoice_data)
+    assert fields == ["cuit", "tipoCodAut"]
+
+    prompt = build_prompt("texto", fields)
+    assert '"cuit"' in prompt and '"tipoCodAut"' in prompt
+    assert '"importe_bruto"' not in prompt and '"fecha"' not in prompt
+
+
+def test_compact_text_keeps_header_and_totals():
+    header = [
+        "FACTURA A",
+        "Punto de Venta: 00001 Comp. Nro: 00000301",
+        "Fecha de Emision: 11/07/2025",
+        "CUIT: 20161247953",
+    ]
+    items = [
+        f"Item {i} TORNILLO HEXAGONAL 1/4 x 2 caja x 100 1.234,{i:02d}"
+        for i in range(80)
+    ]
+    totals = ["Subtotal 98.765,43", "IVA 21% 20.740,74", "TOTAL $ 119.506,17"]
+    raw_text = "\n".join(header + items + totals + ["CAE 75269276810625"])
+
+    compacted = compact_text(raw_text, token_budget=200)
+
+    assert estimate_tokens(compacted) <= 200 + 10
+    for line in header + totals:
+        assert line in compacted
+    assert "Item 40 " not in compacted
+    assert "[...]" in compacted
+    assert compact_text("FACTURA A 0001-00000301", token_budget=200) == (
+        "FACTURA A 0001-00000301"
+    )
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import api.main
+from api.capacity import ParseSlots
+from use_cases import ParseInvoiceUseCase
+from utils import tag_path
+
+
+def test_ready_only_after_warm_up(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(api.main, "WARMUP", True)
+    monkeypatch.setattr(api.main, "warm_up", lambda: release.wait(5))
+
+    with TestClient(api.main.app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        # The warm-up parse holds the worker's parse slot
+        assert response.json() == {
+            "status": "warming_up",
+            "in_flight": 1,
+            "queue_depth": 0,
+            "capacity": 1,
+        }
+        assert client.get("/health").status_code == 200
+
+        release.set()
+        for _ in range(50):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+        assert response.json()["status"] == "ready"
+        assert response.json()["in_flight"] == 0
+
+
+def test_parse_slots_count_waiting_requests():
+    async def scenario():
+        slots = ParseSlots(1)
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def parse():
+            async with slots.acquire():
+                started.set()
+                await finish.wait()
+
+        tasks = [asyncio.create_task(parse()) for _ in range(3)]
+        await started.wait()
+        await asyncio.sleep(0)
+        during = slots.snapshot()
+        finish.set()
+        await asyncio.gather(*tasks)
+        return during, slots.snapshot()
+
+    during, after = asyncio.run(scenario())
+    assert during == {"in_flight": 1, "queue_depth": 2, "capacity": 1}
+    assert after == {"in_flight": 0, "queue_depth": 0, "capacity": 1}
+
+
+def test_profiles_are_written_at_shutdown(monkeypatch, tmp_path):
+    monkeypatch.setattr(api.main, "WARMUP", False)
+    monkeypatch.setattr(api.main, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(api.main, "_profilers", {})
+    monkeypatch.setattr(
+        ParseInvoiceUseCase, "parse_invoice", lambda *args, **kwargs: tag_path("qr")
+    )
+
+    with TestClient(api.main.app) as client:
+        for _ in range(2):
+            response = client.post(
+                "/invoice/parse",
+                files={"file": ("factura.pdf", b"%PDF-1.4")},
+                headers={"X-Invoice-Profiler": "sample"},
+            )
+            assert response.json()["pipeline_path"] == "qr"
+        # Nothing is written while serving requests
+        assert not any(tmp_path.iterdir())
+
+    (report_dir,) = tmp_path.iterdir()
+    assert report_dir.name.startswith("sample-")
+    assert "=== qr: 2 documents" in (report_dir / "report.txt").read_text()
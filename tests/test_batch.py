@@ -0,0 +1,75 @@
+from concurrent.futures import Future
+
+from cli.batch import _windowed
+from utils import SharedDocuments
+
+
+def _done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_window_bounds_shared_memory():
+    documents = [b"%PDF-" + bytes(1000) for _ in range(10)]
+    peak = 0
+
+    def load(batch):
+        nonlocal peak
+        sources = [shared.put(data) for data in batch]
+        peak = max(peak, shared.nbytes)
+        return sources
+
+    with SharedDocuments() as shared:
+        collected = []
+        for future, sources in _windowed(
+            ([data] for data in documents),
+            load,
+            lambda sources: _done(len(sources)),
+            shared,
+            max_in_flight=8,
+            shm_budget=3000,
+            size=len,
+        ):
+            collected.append(future.result())
+            for source in sources:
+                shared.release(source)
+        assert collected == [1] * 10
+        assert shared.nbytes == 0
+    # Three documents fit the budget, never the whole archive
+    assert peak <= 3000
+
+
+def test_window_keeps_order_and_limits_pending_batches():
+    submitted, pending = [], []
+
+    def submit(batch):
+        submitted.append(batch)
+        pending.append(batch)
+        return _done(batch)
+
+    with SharedDocuments() as shared:
+        results = []
+        for future, _ in _windowed(
+            ([i] for i in range(7)), list, submit, shared, max_in_flight=2, shm_budget=0
+        ):
+            assert len(pending) <= 2
+            pending.remove(future.result())
+            results.append(future.result())
+    assert results == [[i] for i in range(7)]
+
+
+def test_oversized_document_still_goes_through():
+    with SharedDocuments() as shared:
+        results = list(
+            _windowed(
+                [[b"x" * 100]],
+                lambda batch: [shared.put(data) for data in batch],
+                lambda sources: _done(sources),
+                shared,
+                max_in_flight=2,
+                shm_budget=10,
+                size=len,
+            )
+        )
+    assert len(results) == 1
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from benchmarks.bench_pipeline import compare
+from benchmarks.corpus import afip_qr_url, generate_corpus, load_corpus
+from parsers import QRParser
+
+RESULT = {
+    "p50_ms": 100.0,
+    "p95_ms": 200.0,
+    "mean_ms": 120.0,
+    "docs_per_sec": 8.0,
+    "peak_rss_mib": 300.0,
+}
+
+
+def test_corpus_is_reproducible(tmp_path):
+    first = generate_corpus(tmp_path / "a", count=3, seed=7, mix={"digital": 1})
+    second = generate_corpus(tmp_path / "b", count=3, seed=7, mix={"digital": 1})
+
+    assert first == second
+    for document in first:
+        assert (tmp_path / "a" / document.file).read_bytes() == (
+            tmp_path / "b" / document.file
+        ).read_bytes()
+    assert load_corpus(tmp_path / "a") == first
+
+
+def test_corpus_covers_every_kind(tmp_path):
+    pytest.importorskip("segno")
+    import pymupdf
+
+    documents = generate_corpus(tmp_path, count=20, seed=1)
+
+    kinds = {document.kind for document in documents}
+    assert kinds == {"qr", "digital", "scanned", "multipage", "large_image"}
+    for document in documents:
+        doc = pymupdf.open(tmp_path / document.file)
+        assert len(doc) == document.pages
+        text = doc[0].get_text()
+        if document.kind == "scanned":
+            assert not text.strip()
+        else:
+            assert document.expected["cuit"] in text
+        if document.kind == "multipage":
+            assert document.pages >= 45
+
+
+def test_qr_payload_decodes_to_expected_fields(tmp_path):
+    invoice = {
+        "cuit": "30712345674",
+        "pto_vta": 3,
+        "tipo_cmp": 1,
+        "nro": 4567,
+        "fecha": "2025-07-11",
+        "importe_bruto": 1210.5,
+    }
+
+    decoded = QRParser(None)._decode_afip_qr(afip_qr_url(invoice))
+
+    assert decoded["cuit"] == "30712345674"
+    assert decoded["referencia"] == "0003-00004567"
+    assert decoded["tipo_cmp"] == 1
+    assert decoded["fecha"] == "2025-07-11"
+    assert decoded["importe_bruto"] == 1210.5
+    assert json.dumps(decoded)
+
+
+def test_compare_flags_regressions_beyond_thresholds():
+    baseline = {"use_case": RESULT, "qr": RESULT}
+    results = {
+        "use_case": {**RESULT, "p95_ms": 260.0, "docs_per_sec": 6.0},
+        "qr": {**RESULT, "p50_ms": 120.0, "peak_rss_mib": 400.0},
+        "batch": RESULT,
+    }
+
+    regressions = compare(baseline, results, max_slowdown=0.25)
+
+    assert [r.split(":")[0] for r in regressions] == [
+        "use_case.p95_ms",
+        "use_case.docs_per_sec",
+        "qr.peak_rss_mib",
+    ]
+
+
+def test_compare_ignores_sub_millisecond_noise():
+    fast = {**RESULT, "p50_ms": 0.2, "p95_ms": 0.4, "mean_ms": 0.3}
+    noisy = {**fast, "p50_ms": 0.5, "p95_ms": 1.2}
+
+    assert compare({"regex": fast}, {"regex": noisy}) == []
@@ -0,0 +1,96 @@
+import argparse
+import logging
+import os
+
+from utils.cpu import (
+    add_cpu_budget_args,
+    budget_from_args,
+    cgroup_cpu_limit,
+    resolve_cpu_budget,
+)
+
+
+def test_cgroup_v2_limit(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+
+def test_cgroup_v1_limit(tmp_path):
+    cpu_dir = tmp_path / "cpu,cpuacct"
+    cpu_dir.mkdir()
+    (cpu_dir / "cpu.cfs_quota_us").write_text("400000\n")
+    (cpu_dir / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 4.0
+
+    (cpu_dir / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+
+def test_resolve_cpu_budget(monkeypatch):
+    monkeypatch.delenv("INVOICE_CPU_BUDGET", raising=False)
+    monkeypatch.delenv("INVOICE_OCR_THREADS", raising=False)
+    monkeypatch.delenv("INVOICE_PAGE_WORKERS", raising=False)
+
+    budget = resolve_cpu_budget(total=8, ocr_threads=2)
+    assert (budget.total, budget.workers, budget.ocr_threads) == (8, 4, 2)
+
+    monkeypatch.setenv("INVOICE_CPU_BUDGET", "6")
+    budget = resolve_cpu_budget()
+    assert (budget.total, budget.workers, budget.ocr_threads) == (6, 6, 1)
+    assert budget.source == "INVOICE_CPU_BUDGET"
+
+    budget = resolve_cpu_budget(total=2, workers=3)
+    assert budget.workers == 3
+
+
+def test_page_workers_count_against_the_budget(monkeypatch):
+    monkeypatch.delenv("INVOICE_OCR_THREADS", raising=False)
+    monkeypatch.delenv("INVOICE_PAGE_WORKERS", raising=False)
+
+    budget = resolve_cpu_budget(total=8, page_workers=4)
+    assert (budget.workers, budget.page_workers) == (2, 4)
+
+    budget = resolve_cpu_budget(total=8, ocr_threads=2, page_workers=2)
+    assert budget.workers * budget.ocr_threads * budget.page_workers <= 8
+
+    monkeypatch.setenv("INVOICE_PAGE_WORKERS", "3")
+    budget = resolve_cpu_budget(total=8)
+    assert (budget.workers, budget.page_workers) == (2, 3)
+
+    # Never less than one worker
+    assert resolve_cpu_budget(total=2, ocr_threads=2, page_workers=2).workers == 1
+
+
+def test_apply_sets_omp_thread_limit(monkeypatch):
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    resolve_cpu_budget(total=4, ocr_threads=2).apply()
+    assert os.environ["OMP_THREAD_LIMIT"] == "2"
+
+
+def test_budget_from_args(monkeypatch):
+    monkeypatch.delenv("INVOICE_OCR_THREADS", raising=False)
+    monkeypatch.setenv("INVOICE_PAGE_WORKERS", "2")
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    log = logging.getLogger(__name__)
+
+    # Without --page-workers the pages of each document stay serial
+    parser = argparse.ArgumentParser()
+    add_cpu_budget_args(parser)
+    args = parser.parse_args(["--cpu-budget", "8", "--ocr-threads", "2"])
+    budget = budget_from_args(args, log)
+    assert (budget.workers, budget.ocr_threads, budget.page_workers) == (4, 2, 1)
+    assert os.environ["OMP_THREAD_LIMIT"] == "2"
+    assert budget_from_args(args, log, workers=1).workers == 1
+
+    # apply() exported the serial page pool for the workers
+    assert os.environ["INVOICE_PAGE_WORKERS"] == "1"
+    monkeypatch.setenv("INVOICE_PAGE_WORKERS", "2")
+    parser = argparse.ArgumentParser()
+    add_cpu_budget_args(parser, page_workers=True)
+    args = parser.parse_args(["--cpu-budget", "8"])
+    assert budget_from_args(args, log).page_workers == 2
+    args = parser.parse_args(["--cpu-budget", "8", "--page-workers", "4"])
+    assert (budget_from_args(args, log).workers, args.workers) == (2, None)
@@ -0,0 +1,187 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+import cli.daemon
+import cli.parse
+from cli.daemon import (
+    DaemonUnavailable,
+    ParseDaemon,
+    _Server,
+    request,
+    request_parse,
+)
+from dtos import InvoiceRecord
+from parsers import QRParser
+from services import InvoiceIndex
+from use_cases import ParseInvoiceUseCase
+from utils import ResourceLimitExceeded
+
+
+INVOICE_TEXT = "\n".join(
+    [
+        "FACTURA A",
+        "COD. 01",
+        "Punto de Venta: 00003 Comp. Nro: 00001234",
+        "Fecha de Emision: 01/03/2025",
+        "Razon Social: PROVEEDOR S.A. CUIT: 30712345678",
+        "Importe Neto Gravado: $ 1.000,00",
+        "Importe Total: $ 1.210,00",
+    ]
+)
+
+
+@pytest.fixture
+def invoice_path(tmp_path, make_pdf):
+    path = tmp_path / "factura.pdf"
+    path.write_bytes(make_pdf(INVOICE_TEXT))
+    return path
+
+
+@pytest.fixture(scope="module")
+def daemon_socket(tmp_path_factory):
+    socket_path = tmp_path_factory.mktemp("daemon") / "daemon.sock"
+    daemon = ParseDaemon(1)
+    daemon.warm_up()
+    server = _Server(socket_path, daemon)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    daemon.close()
+
+
+def test_no_daemon_is_reported(tmp_path):
+    with pytest.raises(DaemonUnavailable):
+        request_parse(tmp_path / "factura.pdf", socket_path=tmp_path / "none.sock")
+
+
+def test_ping(daemon_socket):
+    assert request({"op": "ping"}, daemon_socket)["workers"] == 1
+
+
+def test_parse_in_warm_worker(daemon_socket, invoice_path):
+    response = request_parse(invoice_path, socket_path=daemon_socket)
+    assert response["success"]
+    assert response["data"]["referencia"] == "0003-00001234"
+    assert response["elapsed"] > 0
+
+
+def test_missing_file_is_an_error(daemon_socket, tmp_path):
+    response = request_parse(tmp_path / "missing.pdf", socket_path=daemon_socket)
+    assert not response["success"]
+    assert response["error_message"].startswith("File not found")
+
+
+def test_socket_is_owner_only(daemon_socket):
+    assert stat.S_IMODE(daemon_socket.stat().st_mode) == 0o600
+
+
+def test_index_path_is_sent_to_the_worker(tmp_path, monkeypatch, invoice_path):
+    sent = []
+    monkeypatch.setattr(cli.daemon, "request", lambda message, *_: sent.append(message))
+    monkeypatch.chdir(tmp_path)
+    request_parse("factura.pdf", index_path="index.db")
+    assert sent[0]["index"] == str(tmp_path / "index.db")
+
+    # What the worker then does with it
+    monkeypatch.setattr(
+        QRParser,
+        "extract_and_parse",
+        lambda self: InvoiceRecord(
+            referencia="0003-00001234", cuit="30712345678", tipo_cmp=1, qr_decoded=True
+        ),
+    )
+    response = cli.daemon._parse_path(
+        str(invoice_path), None, "balanced", False, sent[0]["index"]
+    )
+    assert response["data"]["referencia"] == "0003-00001234"
+    assert InvoiceIndex(sent[0]["index"]).count() == 1
+
+
+def test_index_from_the_environment_is_sent_too(tmp_path, monkeypatch):
+    sent = []
+
+    def request(message, *args):
+        sent.append(message)
+        return {"success": False, "data": None, "elapsed": 0.01}
+
+    monkeypatch.setattr(cli.daemon, "request", request)
+    monkeypatch.setenv("INVOICE_INDEX_PATH", str(tmp_path / "index.db"))
+    args = argparse.Namespace(
+        pdf="factura.pdf", cuit=None, profile="balanced", verbose=False, index=None
+    )
+    socket_path = tmp_path / "daemon.sock"
+    assert cli.parse._parse_with_daemon(args, socket_path, logging.getLogger()) is None
+    assert sent[0]["index"] == str(tmp_path / "index.db")
+
+
+def test_document_over_the_limits_is_answered_by_the_worker(invoice_path, monkeypatch):
+    def parse_invoice(*args, **kwargs):
+        raise ResourceLimitExceeded("rss", "Memory grew by 2048 MiB")
+
+    monkeypatch.setattr(ParseInvoiceUseCase, "parse_invoice", parse_invoice)
+    response = cli.daemon._parse_path(str(invoice_path), None, "balanced", False)
+    assert response == {
+        "success": False,
+        "data": None,
+        "error_message": "Document too large: Memory grew by 2048 MiB",
+        "error_code": "resource_limit",
+        "limit": "rss",
+    }
+
+
+def test_timeout_counts_as_unavailable(tmp_path):
+    socket_path = tmp_path / "silent.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen()
+    try:
+        with pytest.raises(DaemonUnavailable):
+            request({"op": "ping"}, socket_path, timeout=0.2)
+    finally:
+        server.close()
+
+
+def test_pool_is_replaced_after_a_worker_dies(invoice_path):
+    daemon = ParseDaemon(1)
+    try:
+        daemon.warm_up()
+        broken = daemon.executor
+        (pid,) = broken._processes
+        os.kill(pid, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while not broken._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        pdf = str(invoice_path)
+        response = daemon.handle({"op": "parse", "pdf": pdf})
+        assert response["success"]
+        assert daemon.executor is not broken
+        assert daemon.handle({"op": "parse", "pdf": pdf})["success"]
+    finally:
+        daemon.close()
+
+
+def test_workers_ignore_sigterm(invoice_path):
+    daemon = ParseDaemon(1)
+    try:
+        daemon.warm_up()
+        executor = daemon.executor
+        # As a systemd stop sends it to the whole process group
+        for pid in executor._processes:
+            os.kill(pid, signal.SIGTERM)
+        time.sleep(0.2)
+        response = daemon.handle({"op": "parse", "pdf": str(invoice_path)})
+        assert response["success"]
+        assert daemon.executor is executor
+    finally:
+        daemon.close()
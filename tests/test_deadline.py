@@ -0,0 +1,96 @@
+import time
+from io import BytesIO
+
+import pytest
+
+from dtos import InvoiceRecord
+from parsers import QRParser
+from services import OCRService
+from use_cases import ParseInvoiceUseCase
+from utils import Deadline
+
+
+def _pages_read(text: str) -> list[int]:
+    lines = text.splitlines()
+    return [int(line.split()[1]) for line in lines if line.startswith("Pagina")]
+
+
+def test_without_budget_nothing_expires():
+    deadline = Deadline()
+    assert deadline.remaining() is None
+    assert not deadline.expired
+    assert deadline.allows(3600)
+
+
+def test_budget_runs_out():
+    deadline = Deadline(0.05)
+    assert deadline.allows(0.01) and not deadline.allows(1)
+    time.sleep(0.06)
+    assert deadline.remaining() == 0.0
+    assert deadline.expired and not deadline.allows(0.01)
+
+
+def test_skipped_stages_are_listed_once_in_order():
+    deadline = Deadline(0)
+    deadline.skip("ocr_fallback")
+    deadline.skip("qr_enhancements")
+    deadline.skip("ocr_fallback")
+    assert deadline.skipped == ["ocr_fallback", "qr_enhancements"]
+
+
+def test_text_extraction_stops_at_the_deadline(make_pdf):
+    pdf = make_pdf(pages=5)
+    deadline = Deadline(0)
+    text = OCRService(BytesIO(pdf)).extract_digital_text(deadline=deadline)
+    # The first page is always read
+    assert _pages_read(text) == [1]
+    assert deadline.skipped == ["text_pages"]
+
+    deadline = Deadline(60)
+    text = OCRService(BytesIO(pdf)).extract_digital_text(deadline=deadline)
+    assert _pages_read(text) == [1, 2, 3, 4, 5]
+    assert deadline.skipped == []
+
+
+def test_parallel_text_extraction_stops_at_the_deadline(monkeypatch, make_pdf):
+    monkeypatch.setenv("INVOICE_PAGE_WORKERS", "2")
+    monkeypatch.setenv("INVOICE_PARALLEL_PAGE_THRESHOLD", "2")
+    deadline = Deadline(0)
+    pdf = BytesIO(make_pdf(pages=6))
+    text = OCRService(pdf).extract_digital_text(deadline=deadline)
+    pages = _pages_read(text)
+    # The first chunk holds the header, it is always awaited; the rest is kept
+    # in page order only if it was done in time
+    assert pages in ([1, 2, 3], [1, 2, 3, 4, 5, 6])
+    assert ("text_pages" in deadline.skipped) == (len(pages) < 6)
+
+
+@pytest.fixture
+def no_ocr(monkeypatch):
+    def extract_text_with_ocr(self, header_only=True, timeout=None):
+        raise AssertionError("OCR should have been skipped")
+
+    monkeypatch.setattr(OCRService, "extract_text_with_ocr", extract_text_with_ocr)
+
+
+def test_expired_budget_returns_a_partial_result(no_ocr, monkeypatch, make_pdf):
+    monkeypatch.setattr(QRParser, "extract_and_parse", lambda self: None)
+    # No CUIT, the OCR fallback would run with time left
+    pdf = BytesIO(make_pdf("Importe Total: $ 1.210,00", pages=4))
+    invoice_data = ParseInvoiceUseCase.parse_record(pdf, deadline=Deadline(0))
+    assert isinstance(invoice_data, InvoiceRecord)
+    assert invoice_data.cuit is None
+    assert invoice_data.skipped_stages == ["text_pages", "ocr_fallback"]
+
+
+def test_budget_left_runs_every_stage(monkeypatch, make_pdf):
+    monkeypatch.setattr(QRParser, "extract_and_parse", lambda self: None)
+    monkeypatch.setattr(
+        OCRService,
+        "extract_text_with_ocr",
+        lambda self, header_only=True, timeout=None: "FACTURA A\nCUIT: 30712345678\n",
+    )
+    pdf = BytesIO(make_pdf("Importe Total: $ 1.210,00", pages=4))
+    invoice_data = ParseInvoiceUseCase.parse_record(pdf, time_budget=60)
+    assert invoice_data.cuit == "30712345678"
+    assert invoice_data.skipped_stages == []
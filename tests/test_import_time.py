@@ -0,0 +1,62 @@
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time budget per entry point, in milliseconds. Each is set
+# between the measured time with lazy imports and the time with eager imports
+# (api.main: ~470 ms lazy, ~1160 ms eager), so a regression fails the test.
+IMPORT_BUDGET_MS = {
+    "cli.parse": 500,
+    "cli.batch": 500,
+    "cli.watch": 500,
+    "cli.run_api": 500,
+    "cli.daemon": 500,
+    "api.main": 800,
+}
+
+# Must only be imported on the code paths that use them
+HEAVY_MODULES = {
+    "pdfplumber",
+    "pytesseract",
+    "pdf2image",
+    "pymupdf",
+    "fitz",
+    "PIL",
+    "pyzbar",
+    "ollama",
+    "pandas",
+    "numpy",
+}
+
+
+def _importtime(module: str) -> dict[str, int]:
+    """Import ``module`` in a fresh interpreter and return cumulative import times (us)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGET_MS)
+def test_entry_point_import_budget(module):
+    times = _importtime(module)
+
+    heavy = {name for name in times if name.split(".")[0] in HEAVY_MODULES}
+    assert not heavy, f"{module} imports heavy dependencies eagerly: {sorted(heavy)}"
+
+    elapsed_ms = times[module] / 1000
+    assert elapsed_ms < IMPORT_BUDGET_MS[module], (
+        f"{module} took {elapsed_ms:.0f} ms to import "
+        f"(budget {IMPORT_BUDGET_MS[module]} ms)"
+    )
@@ -0,0 +1,114 @@
+from dataclasses import replace
+from io import BytesIO
+
+import pytest
+
+from dtos import InvoiceRecord, ParseProfile
+from parsers import QRParser
+from services import DataExtractionService, InvoiceIndex
+from use_cases import ParseInvoiceUseCase
+from utils import METRICS
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def _qr_record() -> InvoiceRecord:
+    return InvoiceRecord(
+        referencia="0003-00001234",
+        fecha="2025-03-01",
+        cuit="30712345678",
+        importe_bruto=1210.0,
+        tipo_cmp=1,
+        letra="E",
+        qr_decoded=True,
+    )
+
+
+@pytest.fixture
+def invoice_pdf(make_pdf):
+    """The same invoice, in the bytes of the given producer."""
+
+    def build(producer: str) -> BytesIO:
+        text = f"FACTURA A\nProducer: {producer}\nImporte Neto Gravado: $ 1.000,00"
+        return BytesIO(make_pdf(text))
+
+    return build
+
+
+def test_index_roundtrip(tmp_path):
+    index = InvoiceIndex(str(tmp_path / "index.db"))
+    record = _qr_record()
+    assert index.get(record) is None
+
+    record.importe_neto = 1000.0
+    record.skipped_stages = ["ocr_fallback"]
+    assert index.put(record)
+    # Without a QR identity nothing is stored
+    assert not index.put(InvoiceRecord(cuit="30712345678", referencia="0003-00001234"))
+
+    # A different reading of the same identity
+    stored = index.get(replace(_qr_record(), referencia="3-1234"))
+    assert stored.from_index and stored.importe_neto == 1000.0
+    assert stored.skipped_stages == []
+    assert index.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_index_hit_skips_enrichment_and_ocr(tmp_path, monkeypatch, invoice_pdf):
+    monkeypatch.setattr(QRParser, "extract_and_parse", lambda self: _qr_record())
+    enrichments = []
+    enrich = DataExtractionService._enrich_qr_with_regex
+    monkeypatch.setattr(
+        DataExtractionService,
+        "_enrich_qr_with_regex",
+        lambda self, data: enrichments.append(data) or enrich(self, data),
+    )
+    index = InvoiceIndex(str(tmp_path / "index.db"))
+
+    first = ParseInvoiceUseCase.parse_record(invoice_pdf("mail"), index=index)
+    assert not first.from_index and first.importe_neto == 1000.0
+
+    # Same invoice, other bytes
+    second = ParseInvoiceUseCase.parse_record(invoice_pdf("reprint"), index=index)
+    assert second.from_index
+    assert len(enrichments) == 1
+    assert second.to_dict() | {"from_index": False} == first.to_dict()
+    assert METRICS.snapshot("index.") == {
+        "index.miss": 1,
+        "index.stored": 1,
+        "index.hit": 1,
+    }
+
+
+def test_fast_results_are_not_served_to_complete_profiles(tmp_path):
+    index = InvoiceIndex(str(tmp_path / "index.db"))
+    assert index.put(_qr_record(), ParseProfile.FAST)
+    assert index.get(_qr_record(), ParseProfile.BALANCED) is None
+    assert index.get(_qr_record(), ParseProfile.THOROUGH) is None
+    assert index.get(_qr_record(), ParseProfile.FAST).from_index
+
+    complete = replace(_qr_record(), importe_neto=1000.0)
+    assert index.put(complete, ParseProfile.BALANCED)
+    # The most complete stored result wins
+    assert index.get(_qr_record(), ParseProfile.FAST).importe_neto == 1000.0
+    assert index.get(_qr_record(), ParseProfile.THOROUGH) is None
+    assert index.count() == 2
+
+
+def test_fast_parse_then_balanced_parse_reparses(tmp_path, monkeypatch, invoice_pdf):
+    monkeypatch.setattr(QRParser, "extract_and_parse", lambda self: _qr_record())
+    index = InvoiceIndex(str(tmp_path / "index.db"))
+
+    fast = ParseInvoiceUseCase.parse_record(
+        invoice_pdf("mail"), profile=ParseProfile.FAST, index=index
+    )
+    assert not fast.from_index
+    balanced = ParseInvoiceUseCase.parse_record(
+        invoice_pdf("mail"), profile=ParseProfile.BALANCED, index=index
+    )
+    assert not balanced.from_index
+    assert METRICS.get("index.stored") == 2
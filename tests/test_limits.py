@@ -0,0 +1,116 @@
+import pickle
+from io import BytesIO
+
+import pytest
+
+from parsers import QRParser
+from services import OCRService
+from utils import METRICS, ResourceGuard, ResourceLimitExceeded, ResourceLimits
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv("INVOICE_MAX_PAGES", "5")
+    monkeypatch.setenv("INVOICE_MAX_RSS_MB", "0")
+    monkeypatch.setenv("INVOICE_MAX_IMAGE_PIXELS", "lots")
+
+    limits = ResourceLimits.from_env()
+
+    assert limits.max_pages == 5
+    assert limits.max_rss_mb == 0
+    assert limits.max_image_pixels == ResourceLimits.max_image_pixels
+
+
+def test_guard_truncates_pages():
+    guard = ResourceGuard(ResourceLimits(max_pages=10))
+
+    assert guard.pages(3) == 3
+    assert guard.pages(5000) == 10
+    assert guard.degraded == ["pages_truncated"]
+    assert METRICS.get("guard.pages_truncated") == 1
+
+
+def test_guard_image_scale():
+    guard = ResourceGuard(ResourceLimits(max_image_pixels=1_000_000))
+
+    assert guard.image_scale(1000, 1000) == 1
+    assert guard.image_scale(4000, 1000) == pytest.approx(0.5)
+    assert ResourceGuard(ResourceLimits(max_image_pixels=0)).image_scale(9e4, 9e4) == 1
+
+
+def test_guard_pixel_budget_trips_once():
+    guard = ResourceGuard(ResourceLimits(max_total_pixels=100))
+
+    assert guard.reserve_pixels(60)
+    assert not guard.reserve_pixels(60)
+    assert not guard.reserve_pixels(1)
+    assert guard.exhausted
+    assert METRICS.snapshot("guard.") == {"guard.pixel_budget_exhausted": 1}
+
+
+def test_guard_rejects_memory_growth():
+    guard = ResourceGuard(ResourceLimits(max_rss_mb=16))
+    guard.check_memory("test")
+    if guard._rss_start is None:
+        pytest.skip("RSS not available on this platform")
+
+    ballast = bytearray(64 * 1024 * 1024)
+    with pytest.raises(ResourceLimitExceeded) as error:
+        guard.check_memory("test")
+    del ballast
+
+    assert error.value.limit == "rss"
+    assert METRICS.get("guard.rss_exceeded") == 1
+
+
+def test_digital_text_is_truncated_to_page_limit(make_pdf):
+    guard = ResourceGuard(ResourceLimits(max_pages=2))
+    text = OCRService(BytesIO(make_pdf(pages=5)), guard=guard).extract_digital_text()
+
+    assert "Pagina 2" in text
+    assert "Pagina 3" not in text
+    assert guard.degraded == ["pages_truncated"]
+
+
+def test_limit_is_counted_once_per_document(make_pdf):
+    pdf = BytesIO(make_pdf(pages=5))
+    guard = ResourceGuard(ResourceLimits(max_pages=2))
+    # Both engines read the pages through the same guard
+    OCRService(pdf, guard=guard).extract_digital_text()
+    QRParser(pdf, guard=guard).extract_and_parse()
+
+    assert guard.degraded == ["pages_truncated"]
+    assert METRICS.snapshot("guard.") == {"guard.pages_truncated": 1}
+
+    ResourceGuard(ResourceLimits(max_pages=2)).pages(5)
+    assert METRICS.get("guard.pages_truncated") == 2
+
+
+def test_limit_exceeded_survives_pickling():
+    error = pickle.loads(pickle.dumps(ResourceLimitExceeded("rss", "Memory grew")))
+    assert isinstance(error, ResourceLimitExceeded)
+    assert (error.limit, str(error)) == ("rss", "Memory grew")
+
+
+def test_oversized_images_are_downscaled_or_skipped(make_pdf):
+    images = [(1500, 1500, "PNG"), (1600, 1600, "JPEG"), (200, 200, "PNG")]
+    pdf = BytesIO(make_pdf(images=images))
+    guard = ResourceGuard(ResourceLimits(max_image_pixels=1_000_000))
+    parser = QRParser(pdf, guard=guard)
+
+    import pymupdf
+
+    images = list(parser._page_images(pymupdf.open(stream=pdf), 0))
+    scales = [scale for _, scale in images]
+    assert scales == [1.0, pytest.approx(0.625)]
+    assert METRICS.get("guard.image_skipped") == 1
+
+    image = parser._open_image(*images[1])
+    assert image.width * image.height <= 1_000_000
+    assert METRICS.get("guard.image_downscaled") == 1
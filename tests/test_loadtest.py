@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cli.loadtest import Document, LoadTest, parse_mix, percentile, summarize
+
+
+class ParseStub(ThreadingHTTPServer):
+    """Minimal emulation of /invoice/parse, answering by uploaded file name."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.01):
+        super().__init__(("127.0.0.1", 0), _ParseHandler)
+        self.latency = latency
+        self.files = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _ParseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        name = body.split(b'filename="')[1].split(b'"')[0].decode()
+        with self.server.lock:
+            self.server.files.append(name)
+        time.sleep(self.server.latency)
+        if name.startswith("broken"):
+            status, payload = 400, {"detail": "Error reading file"}
+        else:
+            path = "qr" if name.startswith("qr") else "regex"
+            status, payload = 200, {"success": True, "pipeline_path": path}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub():
+    server = ParseStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+DOCUMENTS = [
+    Document("qr_1.pdf", "qr", b"%PDF-1.7 qr"),
+    Document("digital_1.pdf", "digital", b"%PDF-1.7 digital"),
+    Document("broken_1.pdf", "broken", b"not a pdf"),
+]
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 95) == 0.0
+
+
+def test_parse_mix():
+    assert parse_mix("qr=5, digital=2,scanned") == {
+        "qr": 5.0,
+        "digital": 2.0,
+        "scanned": 1.0,
+    }
+    assert parse_mix(None) == {}
+
+
+def test_unknown_mix_group_is_rejected():
+    with pytest.raises(ValueError):
+        LoadTest("http://localhost", DOCUMENTS, mix={"scanned": 1})
+
+
+def test_closed_loop_reports_paths_groups_and_errors(stub):
+    load_test = LoadTest(stub.url, DOCUMENTS, concurrency=4, seed=1)
+    samples = asyncio.run(load_test.run(requests=60))
+    summary = summarize(samples, elapsed=1.0)
+
+    assert len(stub.files) == 60
+    assert summary["overall"]["requests"] == 60
+    assert set(summary["by_group"]) == {"qr", "digital", "broken"}
+    assert set(summary["by_path"]) == {"qr", "regex", "http_400"}
+    broken = summary["by_group"]["broken"]
+    assert broken["error_rate"] == 1.0
+    assert broken["errors"] == {"http_400": broken["requests"]}
+    assert summary["by_group"]["qr"]["error_rate"] == 0.0
+    assert summary["overall"]["p50_ms"] >= 10
+
+
+def test_open_loop_follows_rate_and_mix(stub):
+    load_test = LoadTest(
+        stub.url, DOCUMENTS, concurrency=8, rate=200, mix={"qr": 1}, seed=2
+    )
+    started = time.perf_counter()
+    samples = asyncio.run(load_test.run(requests=40))
+    elapsed = time.perf_counter() - started
+
+    assert {sample.group for sample in samples} == {"qr"}
+    assert len(samples) == 40
+    # 40 arrivals at 200/s take about 0.2s, far less than sending them one by one
+    assert elapsed < 40 * stub.latency * 2
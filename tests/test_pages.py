@@ -0,0 +1,111 @@
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+from dtos import InvoiceRecord
+from parsers import QRParser
+from services import OCRService
+from utils.pages import page_chunks
+
+
+@pytest.fixture
+def parallel_pages(monkeypatch):
+    monkeypatch.setenv("INVOICE_PAGE_WORKERS", "2")
+    monkeypatch.setenv("INVOICE_PARALLEL_PAGE_THRESHOLD", "2")
+
+
+@pytest.mark.parametrize(
+    "page_count, chunks, expected",
+    [
+        (10, 3, [range(0, 4), range(4, 7), range(7, 10)]),
+        (4, 4, [range(0, 1), range(1, 2), range(2, 3), range(3, 4)]),
+        (2, 5, [range(0, 1), range(1, 2)]),
+        (7, 1, [range(0, 7)]),
+        (5, 0, [range(0, 5)]),
+    ],
+)
+def test_page_chunks(page_count, chunks, expected):
+    assert page_chunks(page_count, chunks) == expected
+
+
+def test_parallel_text_keeps_page_order(parallel_pages, make_pdf):
+    text = OCRService(BytesIO(make_pdf(pages=7))).extract_digital_text()
+    lines = text.splitlines()
+    numbers = [int(line.split()[1]) for line in lines if line.startswith("Pagina")]
+    assert numbers == list(range(1, 8))
+
+
+def test_parallel_qr_scan_returns_first_page_with_a_hit(
+    parallel_pages, monkeypatch, make_pdf
+):
+    hits = {2: "0003-00000002", 5: "0003-00000005"}
+    scanned = []
+    lock = threading.Lock()
+
+    def page_images(self, doc, page_num):
+        yield page_num, 1.0
+
+    def scan_images(self, images):
+        ((page_num, _),) = images
+        with lock:
+            scanned.append(page_num)
+        # The later hit finishes first
+        time.sleep(0.2 if page_num == 2 else 0.0)
+        if page_num in hits:
+            return InvoiceRecord(referencia=hits[page_num], qr_decoded=True)
+        return None
+
+    monkeypatch.setattr(QRParser, "_page_images", page_images)
+    monkeypatch.setattr(QRParser, "_scan_images", scan_images)
+    invoice_data = QRParser(BytesIO(make_pdf(pages=8))).extract_and_parse()
+    assert invoice_data.referencia == "0003-00000002"
+    # Pages past the first window are never scanned
+    assert max(scanned) < 4
+
+
+def test_serial_scan_stops_extracting_at_the_qr(monkeypatch, make_pdf):
+    extracted = []
+
+    def page_images(self, doc, page_num):
+        for image in range(3):
+            extracted.append(image)
+            yield image, 1.0
+
+    monkeypatch.setattr(QRParser, "_page_images", page_images)
+    monkeypatch.setattr(QRParser, "_open_image", lambda self, image, scale: image)
+    monkeypatch.setattr(
+        QRParser, "_try_decode_with_enhancements", lambda self, image: [image]
+    )
+    monkeypatch.setattr(
+        QRParser,
+        "_afip_invoice_data",
+        lambda self, codes: InvoiceRecord(qr_decoded=True) if codes == [0] else None,
+    )
+    assert QRParser(BytesIO(make_pdf())).extract_and_parse().qr_decoded
+    assert extracted == [0]
+
+
+def test_parallel_scan_stops_extracting_at_the_qr(
+    parallel_pages, monkeypatch, make_pdf
+):
+    extracted = []
+
+    def page_images(self, doc, page_num):
+        for image in range(3):
+            extracted.append((page_num, image))
+            yield (page_num, image), 1.0
+
+    monkeypatch.setattr(QRParser, "_page_images", page_images)
+    monkeypatch.setattr(QRParser, "_open_image", lambda self, image, scale: image)
+    monkeypatch.setattr(
+        QRParser, "_try_decode_with_enhancements", lambda self, image: [image]
+    )
+    def afip_invoice_data(self, codes):
+        return InvoiceRecord(qr_decoded=True) if codes == [(0, 0)] else None
+
+    monkeypatch.setattr(QRParser, "_afip_invoice_data", afip_invoice_data)
+    assert QRParser(BytesIO(make_pdf(pages=4))).extract_and_parse().qr_decoded
+    # The first page's other images are never extracted
+    assert [image for page, image in extracted if page == 0] == [0]
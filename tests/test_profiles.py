@@ -0,0 +1,118 @@
+from io import BytesIO
+
+import pytest
+
+from dtos import PROFILE_SETTINGS, InvoiceRecord, ParseProfile
+from parsers import QRParser
+from services import OCRService
+from use_cases import ParseInvoiceUseCase
+
+# Cheapest first, each stage is either on or off
+STAGES = {
+    ParseProfile.FAST: {
+        "max_text_pages": 1,
+        "max_qr_pages": 1,
+        "qr_enhancements": False,
+        "qr_page_render": False,
+        "ocr_fallback": False,
+        "ocr_full_page": False,
+        "ocr_without_text": False,
+    },
+    ParseProfile.BALANCED: {
+        "max_text_pages": None,
+        "max_qr_pages": None,
+        "qr_enhancements": True,
+        "qr_page_render": False,
+        "ocr_fallback": True,
+        "ocr_full_page": False,
+        "ocr_without_text": False,
+    },
+    ParseProfile.THOROUGH: {
+        "max_text_pages": None,
+        "max_qr_pages": None,
+        "qr_enhancements": True,
+        "qr_page_render": True,
+        "ocr_fallback": True,
+        "ocr_full_page": True,
+        "ocr_without_text": True,
+    },
+}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Stub the QR scan and OCR, recording how the pipeline called them."""
+    recorded = {"qr": [], "ocr": [], "text_pages": []}
+
+    def extract_and_parse(self):
+        recorded["qr"].append(
+            {
+                "enhancements": self.enhancements,
+                "render_pages": self.render_pages,
+                "max_pages": self.max_pages,
+            }
+        )
+        return None
+
+    def extract_text_with_ocr(self, header_only=True, timeout=None):
+        recorded["ocr"].append(header_only)
+        return "FACTURA A\nCOD. 01\nCUIT: 30712345678\n" + "texto " * 20
+
+    extract_digital_text = OCRService.extract_digital_text
+
+    def record_text(self, max_pages=None, deadline=None):
+        recorded["text_pages"].append(max_pages)
+        return extract_digital_text(self, max_pages=max_pages, deadline=deadline)
+
+    monkeypatch.setattr(QRParser, "extract_and_parse", extract_and_parse)
+    monkeypatch.setattr(OCRService, "extract_text_with_ocr", extract_text_with_ocr)
+    monkeypatch.setattr(OCRService, "extract_digital_text", record_text)
+    return recorded
+
+
+@pytest.mark.parametrize("profile", list(ParseProfile))
+def test_profile_settings(profile):
+    settings = PROFILE_SETTINGS[profile]
+    assert {name: getattr(settings, name) for name in STAGES[profile]} == STAGES[profile]
+
+
+@pytest.mark.parametrize("profile", list(ParseProfile))
+def test_profile_drives_the_pipeline(profile, calls, make_pdf):
+    # No CUIT in the digital text: the OCR fallback is needed
+    pdf = BytesIO(make_pdf("Factura de prueba sin identificacion fiscal", pages=3))
+    invoice_data = ParseInvoiceUseCase.parse_record(pdf, profile=profile)
+    stages = STAGES[profile]
+
+    assert calls["text_pages"] == [stages["max_text_pages"]]
+    # One QR scan, the OCR fallback does not scan again
+    assert calls["qr"] == [
+        {
+            "enhancements": stages["qr_enhancements"],
+            "render_pages": stages["qr_page_render"],
+            "max_pages": stages["max_qr_pages"],
+        }
+    ]
+    if stages["ocr_fallback"]:
+        assert calls["ocr"] == [not stages["ocr_full_page"]]
+        assert invoice_data.cuit == "30712345678"
+    else:
+        assert calls["ocr"] == []
+        assert invoice_data.cuit is None
+
+
+@pytest.mark.parametrize("profile", list(ParseProfile))
+def test_scanned_invoices_only_ocr_under_thorough(profile, calls):
+    import pymupdf
+
+    doc = pymupdf.open()
+    doc.new_page()
+    invoice_data = ParseInvoiceUseCase.parse_record(
+        BytesIO(doc.tobytes()), profile=profile
+    )
+    if STAGES[profile]["ocr_without_text"]:
+        # Full-page OCR for the text, then the header fallback is not needed
+        assert calls["ocr"][0] is False
+        assert isinstance(invoice_data, InvoiceRecord)
+    else:
+        assert calls["ocr"] == []
+        assert invoice_data is None
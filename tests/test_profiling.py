@@ -0,0 +1,86 @@
+import pickle
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from utils import Profiler, tag_path
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _parse(path: str | None):
+    _busy(0.05)
+    if path:
+        tag_path(path)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Profiler("perf")
+
+
+def test_sampling_groups_documents_by_path(tmp_path):
+    profiler = Profiler("sample", interval=0.001)
+    for path in ("qr", "qr", "ocr_fallback", None):
+        with profiler.document():
+            _parse(path)
+
+    assert {path: data["documents"] for path, data in profiler.data.items()} == {
+        "qr": 2,
+        "ocr_fallback": 1,
+        "no_data": 1,
+    }
+
+    files = profiler.write(tmp_path)
+    assert [f.name for f in files] == ["report.txt", "stacks.collapsed"]
+    assert "=== qr: 2 documents" in files[0].read_text()
+    lines = files[1].read_text().splitlines()
+    assert lines
+    # Stacks start at the profiled block, prefixed by the pipeline path
+    root = f"{__name__}:test_sampling_groups_documents_by_path"
+    assert all(line.split(";")[1] == root for line in lines)
+    assert any(line.startswith("qr;") and f"{__name__}:_busy" in line for line in lines)
+
+
+def test_sampled_stacks_start_at_the_entering_frame():
+    profiler = Profiler("sample", interval=0.001)
+    # Entered through another context manager, not directly by a with statement
+    with ExitStack() as stack:
+        stack.enter_context(profiler.document())
+        _parse("qr")
+
+    root = f"{__name__}:test_sampled_stacks_start_at_the_entering_frame"
+    stacks = profiler.data["qr"]["stacks"]
+    assert stacks
+    assert all(stack.split(";")[0] == root for stack in stacks)
+
+
+def test_cprofile_data_merges_across_workers(tmp_path):
+    workers = []
+    for _ in range(2):
+        profiler = Profiler("cprofile")
+        with profiler.document():
+            _parse("regex")
+        # Worker data travels back to the parent process pickled
+        workers.append(pickle.loads(pickle.dumps(profiler.data)))
+
+    merged = Profiler("cprofile")
+    for data in workers:
+        merged.merge(data)
+
+    assert merged.data["regex"]["documents"] == 2
+    busy_calls = [
+        stat[1]
+        for (_, _, function), stat in merged.data["regex"]["stats"].items()
+        if function == "_busy"
+    ]
+    assert busy_calls == [2]
+
+    files = merged.write(tmp_path, top=5)
+    assert [f.name for f in files] == ["report.txt", "regex.prof"]
+    assert "_busy" in files[0].read_text()
@@ -0,0 +1,89 @@
+import math
+import pickle
+
+import pandas as pd
+import pytest
+
+from dtos import InvoiceColumns, InvoiceData, InvoiceRecord
+
+EXTRA = {"pdf_path": "str", "processing_time_sec": "float"}
+
+
+def _record(**overrides) -> InvoiceRecord:
+    values = dict(
+        referencia="0003-00001234",
+        fecha="2025-03-01",
+        cuit="30712345678",
+        importe_bruto=1210.0,
+        importe_neto=1000.0,
+        tipo_cmp=1,
+        letra="A",
+        qr_decoded=True,
+    )
+    return InvoiceRecord(**(values | overrides))
+
+
+def test_to_dict_matches_the_model_dump():
+    record = _record(skipped_stages=["ocr_fallback"])
+    assert record.to_dict() == InvoiceData(**record.to_dict()).model_dump()
+    assert list(record.to_dict()) == list(InvoiceData().model_dump())
+    # A copy, the record's list is not shared
+    record.to_dict()["skipped_stages"].append("qr_page_render")
+    assert record.skipped_stages == ["ocr_fallback"]
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        _record(),
+        _record(importe_neto=None, orden_compra="OC-77", from_index=True),
+        InvoiceRecord(),
+    ],
+)
+def test_to_model_round_trip(record):
+    model = record.to_model()
+    assert isinstance(model, InvoiceData)
+    assert model.check == record.check
+    assert InvoiceRecord(**model.model_dump(exclude={"check"})) == record
+
+
+def test_append_and_extend():
+    columns = InvoiceColumns(extra=EXTRA)
+    columns.append(_record(), pdf_path="a.pdf", processing_time_sec=0.5)
+    chunk = InvoiceColumns(extra=EXTRA)
+    chunk.append(_record(tipo_cmp=None, importe_neto=None), pdf_path="b.pdf")
+    chunk.append(_record(skipped_stages=["ocr_fallback", "text_pages"]))
+
+    # Chunks come back from worker processes
+    columns.extend(pickle.loads(pickle.dumps(chunk)))
+    assert len(columns) == 3
+
+    with pytest.raises(ValueError):
+        columns.extend(InvoiceColumns())
+
+
+def test_to_dataframe_keeps_missing_values():
+    records = [
+        _record(),
+        _record(tipo_cmp=None, importe_neto=None, cuit=None),
+        _record(skipped_stages=["ocr_fallback", "text_pages"]),
+    ]
+    columns = InvoiceColumns(extra=EXTRA)
+    columns.append(records[0], pdf_path="a.pdf", processing_time_sec=0.5)
+    columns.append(records[1])
+    columns.append(records[2])
+    df = columns.to_dataframe()
+
+    assert list(df.columns) == list(InvoiceColumns.COLUMNS) + list(EXTRA)
+    assert len(df) == 3
+    # Nullable integers: a missing tipo_cmp is <NA>, not 0
+    assert df["tipo_cmp"].dtype == pd.Int64Dtype()
+    assert df["tipo_cmp"][0] == 1
+    assert df["tipo_cmp"].isna().tolist() == [False, True, False]
+    assert df["importe_neto"][0] == 1000.0 and math.isnan(df["importe_neto"][1])
+    assert df["cuit"].isna().tolist() == [False, True, False]
+    assert df["pdf_path"][0] == "a.pdf" and df["pdf_path"][1:].isna().all()
+    assert math.isnan(df["processing_time_sec"][2])
+    assert df["skipped_stages"].tolist() == ["", "", "ocr_fallback,text_pages"]
+    assert df["qr_decoded"].dtype == bool and df["qr_decoded"].all()
+    assert df["check"].tolist() == [record.check for record in records]
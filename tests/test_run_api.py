@@ -0,0 +1,46 @@
+import logging
+import signal
+
+import pytest
+import uvicorn
+
+import cli.run_api
+from cli.run_api import MAX_STARTUP_CRASHES, _RestartBackoff, _serve_preforked
+
+
+def test_backoff_doubles_and_gives_up():
+    backoff = _RestartBackoff()
+    delays = [backoff.delay(uptime=0.1) for _ in range(MAX_STARTUP_CRASHES)]
+    assert delays == sorted(delays) and delays[1] == 2 * delays[0]
+    assert backoff.delay(uptime=0.1) is None
+
+
+def test_backoff_resets_after_a_healthy_worker():
+    backoff = _RestartBackoff()
+    backoff.delay(uptime=0.1)
+    backoff.delay(uptime=0.1)
+    assert backoff.delay(uptime=3600) == 0.0
+    assert backoff.delay(uptime=0.1) == cli.run_api.RESTART_DELAY
+
+
+class _CrashingServer:
+    def __init__(self, config):
+        pass
+
+    def run(self, sockets=None):
+        raise RuntimeError("bad config")
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_parent_exits_when_workers_crash_at_startup(monkeypatch):
+    monkeypatch.setattr(cli.run_api, "RESTART_DELAY", 0.01)
+    monkeypatch.setattr(cli.run_api.uvicorn, "Server", _CrashingServer)
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    config = uvicorn.Config("api.main:app", host="127.0.0.1", port=0)
+    try:
+        with pytest.raises(SystemExit) as exit_info:
+            _serve_preforked(config, 2, logging.getLogger(__name__))
+    finally:
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+    assert exit_info.value.code == 1
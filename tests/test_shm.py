@@ -0,0 +1,59 @@
+import io
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+
+import pytest
+
+from services import OCRService
+from utils import SharedDocuments, open_shared
+
+
+def _page_count(document) -> int:
+    import pymupdf
+
+    with open_shared(document) as buffer:
+        with pymupdf.open(stream=buffer.getvalue()) as doc:
+            return len(doc)
+
+
+def test_buffer_reads_like_bytesio():
+    data = b"line one\nline two\nend"
+    with SharedDocuments() as shared:
+        document = shared.put(data)
+        with open_shared(document) as buffer:
+            assert isinstance(buffer, BytesIO)
+            assert bytes(buffer.getvalue()) == data
+            assert buffer.readline() == b"line one\n"
+            assert buffer.read(4) == b"line"
+            buffer.seek(-3, io.SEEK_END)
+            assert buffer.read() == b"end"
+            assert buffer.read() == b""
+            target = bytearray(4)
+            buffer.seek(0)
+            assert buffer.readinto(target) == 4 and target == b"line"
+            with pytest.raises(io.UnsupportedOperation):
+                buffer.write(b"x")
+
+
+def test_pipeline_reads_shared_document_in_place(make_pdf):
+    data = make_pdf(pages=3)
+    with SharedDocuments() as shared:
+        document = shared.put(data, label="factura.pdf")
+        with open_shared(document) as buffer:
+            text = OCRService(buffer).extract_digital_text()
+    assert text == OCRService(BytesIO(data)).extract_digital_text()
+
+
+def test_worker_attaches_and_parent_releases(make_pdf):
+    with SharedDocuments() as shared:
+        document = shared.put(make_pdf(pages=3), label="factura.pdf")
+        # Only the handle crosses the process boundary
+        assert len(pickle.dumps(document)) < 200
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            assert executor.submit(_page_count, document).result() == 3
+        shared.release(document)
+        assert len(shared) == 0
+        with pytest.raises(FileNotFoundError):
+            _page_count(document)
@@ -0,0 +1,91 @@
+import pickle
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from use_cases import ParseInvoiceUseCase
+from utils import METRICS, InvalidPDF, validate_pdf
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+NO_PAGES = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+@pytest.mark.parametrize(
+    "data, code",
+    [
+        (b"", "empty"),
+        (b"<html>not a pdf</html>", "not_pdf"),
+        (b"%PDF-1.7\n" + b"\0" * 4096, "truncated"),
+        (b"%PDF-1.7\n" + b"\0" * 4096 + b"\n%%EOF\n", "corrupt"),
+        (NO_PAGES, "no_pages"),
+    ],
+    ids=["empty", "not_pdf", "truncated", "corrupt", "no_pages"],
+)
+def test_rejection_codes(data, code):
+    with pytest.raises(InvalidPDF) as raised:
+        validate_pdf(data)
+    assert raised.value.code == code
+    assert METRICS.snapshot("invalid_pdf.") == {f"invalid_pdf.{code}": 1}
+
+
+def test_password_protected_is_rejected_before_any_engine(monkeypatch, make_pdf):
+    import pymupdf
+    from services import OCRService
+
+    def engine(*args, **kwargs):
+        raise AssertionError("engine should not run")
+
+    monkeypatch.setattr(OCRService, "extract_digital_text", engine)
+    data = make_pdf(encryption=pymupdf.PDF_ENCRYPT_AES_256, user_pw="u", owner_pw="o")
+    with pytest.raises(InvalidPDF) as raised:
+        ParseInvoiceUseCase.parse_record(BytesIO(data))
+    assert raised.value.code == "encrypted"
+    # Raised in worker processes and pickled back to the parent
+    assert pickle.loads(pickle.dumps(raised.value)).code == "encrypted"
+
+
+def test_owner_password_only_is_accepted(make_pdf):
+    import pymupdf
+
+    data = make_pdf(encryption=pymupdf.PDF_ENCRYPT_AES_256, owner_pw="o")
+    assert validate_pdf(data).page_count == 1
+
+
+def test_damaged_xref_is_repaired_once(make_pdf):
+    data = make_pdf()
+    # Drop the xref table, keeping the objects
+    damaged = data[: data.rindex(b"xref")] + b"%%EOF\n"
+    validated = validate_pdf(damaged)
+    assert validated.page_count == 1
+    assert validated.repaired is not None
+    assert validate_pdf(validated.repaired).repaired is None
+    assert METRICS.get("pdf.repaired") == 1
+
+
+@pytest.mark.parametrize(
+    "data, status, code",
+    [
+        (b"", 400, "empty"),
+        (b"GIF89a", 415, "not_pdf"),
+        (NO_PAGES, 422, "no_pages"),
+    ],
+    ids=["empty", "not_pdf", "no_pages"],
+)
+def test_api_answers_4xx_with_the_code(data, status, code):
+    response = TestClient(app).post(
+        "/invoice/parse", files={"file": ("factura.pdf", data, "application/pdf")}
+    )
+    assert response.status_code == status
+    assert response.json()["detail"]["code"] == code
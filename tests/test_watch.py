@@ -0,0 +1,273 @@
+import json
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import cli.watch
+from cli.watch import (
+    FolderWatcher,
+    JsonlSink,
+    _file_signature,
+    _WatchPool,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cli.watch.time, "monotonic", clock)
+    return clock
+
+
+def _write(path, data: bytes, mtime_ns: int | None = None):
+    with open(path, "ab") as f:
+        f.write(data)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_file_is_reported_once_it_settles(tmp_path, clock):
+    watcher = FolderWatcher([tmp_path], settle_seconds=2, force_polling=True)
+    pdf = tmp_path / "factura.pdf"
+    _write(pdf, b"%PDF-1.7\n", mtime_ns=1)
+    (tmp_path / "notas.txt").write_text("no es un pdf")
+
+    for path in watcher._scan():
+        watcher._mark(path)
+    assert watcher._settled() == []
+
+    # Still being written: the wait starts over
+    clock.now += 1.5
+    _write(pdf, b"x" * 100, mtime_ns=2)
+    assert watcher._settled() == []
+    clock.now += 1.5
+    assert watcher._settled() == []
+
+    clock.now += 0.5
+    assert watcher._settled() == [pdf]
+    # Reported once, until it changes again
+    watcher._mark(pdf)
+    clock.now += 5
+    assert watcher._settled() == []
+
+    _write(pdf, b"%%EOF\n", mtime_ns=3)
+    watcher._mark(pdf)
+    clock.now += 2
+    assert watcher._settled() == [pdf]
+
+
+def test_deleted_file_is_forgotten(tmp_path, clock):
+    watcher = FolderWatcher([tmp_path], settle_seconds=1, force_polling=True)
+    pdf = tmp_path / "factura.pdf"
+    _write(pdf, b"%PDF-1.7\n")
+    watcher._mark(pdf)
+    pdf.unlink()
+    clock.now += 2
+    assert watcher._settled() == []
+    assert not watcher._pending
+
+
+def test_polling_watch_skips_partial_writes(tmp_path):
+    watcher = FolderWatcher(
+        [tmp_path], settle_seconds=0.3, poll_interval=0.05, force_polling=True
+    )
+    reported = []
+
+    def run():
+        for ready in watcher.watch():
+            reported.extend(ready)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        pdf = tmp_path / "factura.pdf"
+        # A slow copy: appended to for longer than the settle time
+        for _ in range(8):
+            _write(pdf, b"x" * 10)
+            time.sleep(0.1)
+            assert reported == []
+        deadline = time.monotonic() + 5
+        while not reported and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert reported == [pdf]
+    finally:
+        watcher.stop()
+        thread.join()
+
+
+def test_resume_from_the_sink(tmp_path, clock):
+    names = ("done.pdf", "failed.pdf", "changed.pdf", "new.pdf")
+    done, failed, changed, new = (tmp_path / name for name in names)
+    for path in (done, failed, changed, new):
+        _write(path, b"%PDF-1.7\n")
+    output = tmp_path / "out" / "invoices.jsonl"
+
+    sink = JsonlSink(output)
+    for path, status in ((done, "ok"), (failed, "failed"), (changed, "ok")):
+        size, mtime_ns = _file_signature(path)
+        sink.write(
+            {
+                "pdf_path": str(path),
+                "status": status,
+                "file_size": size,
+                "file_mtime_ns": mtime_ns,
+            }
+        )
+    sink.close()
+    with open(output, "a") as f:
+        f.write("not json\n")
+    _write(changed, b"more bytes")
+
+    known = JsonlSink(output).processed_signatures()
+    assert set(known) == {done, failed, changed}
+
+    watcher = FolderWatcher(
+        [tmp_path], settle_seconds=1, force_polling=True, known=known
+    )
+    for path in watcher._scan():
+        watcher._mark(path)
+    clock.now += 1
+    assert sorted(watcher._settled()) == sorted([changed, new])
+
+
+def test_relative_and_absolute_paths_are_the_same_file(tmp_path, clock, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "in").mkdir()
+    done, new = tmp_path / "in" / "f0.pdf", tmp_path / "in" / "f1.pdf"
+    for path in (done, new):
+        _write(path, b"%PDF-1.7\n")
+
+    # Recorded by a run that was given the relative directory
+    sink = JsonlSink(tmp_path / "invoices.jsonl")
+    size, mtime_ns = _file_signature(done)
+    sink.write(
+        {"pdf_path": "in/f0.pdf", "file_size": size, "file_mtime_ns": mtime_ns}
+    )
+    sink.close()
+
+    known = JsonlSink(tmp_path / "invoices.jsonl").processed_signatures()
+    assert set(known) == {done}
+    watcher = FolderWatcher(
+        [Path("in")], settle_seconds=1, force_polling=True, known=known
+    )
+    for path in watcher._scan():
+        watcher._mark(path)
+    # As watchfiles reports them
+    watcher._mark(done)
+    watcher._mark(Path("in/f1.pdf"))
+    clock.now += 1
+    assert watcher._settled() == [new]
+
+
+def _parse(pdf_path, own_cuit, profile):
+    name = os.path.basename(pdf_path)
+    if name.startswith("crash"):
+        os._exit(1)
+    if name.startswith("empty"):
+        return None
+    if name.startswith("error"):
+        raise ValueError("unreadable")
+    return {"pdf_path": pdf_path, "referencia": "0003-00001234"}
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_pool_records_every_outcome_and_survives_a_dead_worker(tmp_path):
+    sink = JsonlSink(tmp_path / "invoices.jsonl")
+    pool = _WatchPool(1, sink, parse=_parse)
+    names = ("ok.pdf", "empty.pdf", "error.pdf", "crash.pdf", "after.pdf")
+    for name in names:
+        _write(tmp_path / name, b"%PDF-1.7\n")
+        pool.submit(tmp_path / name)
+    first_pool = pool.executor
+    pool.close()
+    sink.close()
+
+    records = {}
+    for line in (tmp_path / "invoices.jsonl").read_text().splitlines():
+        record = json.loads(line)
+        records[os.path.basename(record["pdf_path"])] = record
+    assert {name: record["status"] for name, record in records.items()} == {
+        "ok.pdf": "ok",
+        "empty.pdf": "no_data",
+        "error.pdf": "failed",
+        "crash.pdf": "failed",
+        "after.pdf": "ok",
+    }
+    assert records["error.pdf"]["error"] == "unreadable"
+    assert all(record["file_size"] == 9 for record in records.values())
+    assert pool.executor is not first_pool
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_file_changed_while_parsed_is_submitted_again_afterwards(tmp_path):
+    sink = JsonlSink(tmp_path / "invoices.jsonl")
+    pool = _WatchPool(1, sink, parse=_parse)
+    pdf = tmp_path / "ok.pdf"
+    _write(pdf, b"%PDF-1.7\n")
+    pool.submit(pdf)
+    # Rewritten and reported again while the first parse is in flight
+    _write(pdf, b"%%EOF\n")
+    pool.submit(pdf)
+    assert len(pool.in_flight) == 1
+    pool.close()
+    sink.close()
+
+    lines = (tmp_path / "invoices.jsonl").read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["status"] for record in records] == ["ok", "ok"]
+    assert [record["file_size"] for record in records] == [9, 15]
+
+
+def _parse_slowly(pdf_path, own_cuit, profile):
+    time.sleep(0.5)
+    return _parse(pdf_path, own_cuit, profile)
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_workers_finish_their_file_on_sigterm(tmp_path):
+    sink = JsonlSink(tmp_path / "invoices.jsonl")
+    pool = _WatchPool(1, sink, parse=_parse_slowly)
+    _write(tmp_path / "ok.pdf", b"%PDF-1.7\n")
+    pool.submit(tmp_path / "ok.pdf")
+    started_pool = pool.executor
+    time.sleep(0.2)
+    # As a systemd stop sends it to the whole process group
+    for pid in started_pool._processes:
+        os.kill(pid, signal.SIGTERM)
+    pool.close()
+    sink.close()
+
+    (line,) = (tmp_path / "invoices.jsonl").read_text().splitlines()
+    assert json.loads(line)["status"] == "ok"
+    assert pool.executor is started_pool
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_broken_pool_does_not_wait_for_its_other_workers(tmp_path):
+    sink = JsonlSink(tmp_path / "invoices.jsonl")
+    pool = _WatchPool(2, sink, parse=_parse_slowly)
+    for name in ("ok.pdf", "crash.pdf"):
+        _write(tmp_path / name, b"%PDF-1.7\n")
+        pool.submit(tmp_path / name)
+    broken = pool.executor
+    workers = list(broken._processes.values())
+    pool.close()
+    sink.close()
+
+    assert pool.executor is not broken
+    # Killed, they ignore the SIGTERM the broken pool stops them with
+    for process in workers:
+        process.join(timeout=5)
+        assert not process.is_alive()
@@ -1,17 +1,111 @@
-from services import OCRService, DataExtractionService
+from services import OCRService, DataExtractionService, InvoiceIndex, default_index
+from parsers import RegexParser
 from io import BytesIO
-from dtos import InvoiceData
+from dtos import InvoiceData, InvoiceRecord, ParseProfile, PROFILE_SETTINGS
+from utils import Deadline, ResourceGuard, ResourceLimits, profiling, validate_pdf
 import logging
 
+logger = logging.getLogger(__name__)
+
+# Minimum remaining budget (seconds) to start an OCR pass
+OCR_MIN_SECONDS = 1.0
+
 
 class ParseInvoiceUseCase:
+    @staticmethod
+    def _ocr_text(
+        ocr_service: OCRService, deadline: Deadline, stage: str, header_only: bool
+    ) -> str | None:
+        """Run OCR within the remaining budget, recording the stage as skipped otherwise."""
+        if not deadline.allows(OCR_MIN_SECONDS):
+            deadline.skip(stage)
+            return None
+        try:
+            return ocr_service.extract_text_with_ocr(
+                header_only=header_only, timeout=deadline.remaining()
+            )
+        except Exception as e:
+            if not deadline.expired:
+                raise
+            logger.warning(f"OCR aborted, time budget exhausted: {e}")
+            deadline.skip(stage)
+            return None
+
     @staticmethod
     def parse_invoice(
-        file_content: BytesIO, own_cuit: str | None = None, verbose: bool = False
+        file_content: BytesIO,
+        own_cuit: str | None = None,
+        verbose: bool = False,
+        profile: ParseProfile = ParseProfile.BALANCED,
+        time_budget: float | None = None,
+        deadline: Deadline | None = None,
+        limits: ResourceLimits | None = None,
+        index: InvoiceIndex | None = None,
     ) -> InvoiceData | None:
+        """Parse an invoice PDF into the ``InvoiceData`` model (see ``parse_record``)."""
+        invoice_record = ParseInvoiceUseCase.parse_record(
+            file_content,
+            own_cuit=own_cuit,
+            verbose=verbose,
+            profile=profile,
+            time_budget=time_budget,
+            deadline=deadline,
+            limits=limits,
+            index=index,
+        )
+        return invoice_record.to_model() if invoice_record else None
+
+    @staticmethod
+    def parse_record(
+        file_content: BytesIO,
+        own_cuit: str | None = None,
+        verbose: bool = False,
+        profile: ParseProfile = ParseProfile.BALANCED,
+        time_budget: float | None = None,
+        deadline: Deadline | None = None,
+        limits: ResourceLimits | None = None,
+        index: InvoiceIndex | None = None,
+    ) -> InvoiceRecord | None:
+        """Parse an invoice PDF into a lightweight ``InvoiceRecord``.
+
+        ``time_budget`` (seconds) or an already running ``deadline`` bound the parse:
+        expensive stages are skipped or aborted when the budget runs out and the best
+        partial result is returned, listing them in ``skipped_stages``.
+
+        ``limits`` (default: from the environment) bound pages, pixels and memory;
+        oversized inputs are degraded, also listed in ``skipped_stages``, or
+        rejected with ``ResourceLimitExceeded``.
+
+        Empty, non-PDF, broken beyond repair, password-protected or page-less
+        inputs are rejected up front with ``InvalidPDF``, before any engine runs;
+        files with a damaged xref are parsed from a repaired copy.
+
+        ``index`` (default: ``$INVOICE_INDEX_PATH``, if set) returns the stored
+        result of an invoice whose QR identity was already parsed, flagged
+        ``from_index``, and stores the complete results of new ones under
+        ``profile``.
+        """
+        profile = ParseProfile(profile)
+        settings = PROFILE_SETTINGS[profile]
+        deadline = deadline or Deadline(time_budget)
+        guard = ResourceGuard(limits)
+        index = index or default_index()
+
+        validated = validate_pdf(file_content.getvalue())
+        if validated.repaired is not None:
+            # Every engine reads the repaired copy instead of tripping over the damage
+            file_content = BytesIO(validated.repaired)
+
         # Extract text via OCR
-        ocr_service = OCRService(file_content)
-        raw_text = ocr_service.extract_digital_text()
+        ocr_service = OCRService(file_content, guard=guard)
+        raw_text = ocr_service.extract_digital_text(
+            max_pages=settings.max_text_pages, deadline=deadline
+        )
+        if not raw_text and settings.ocr_without_text:
+            # Scanned invoice: OCR the first page instead
+            raw_text = ParseInvoiceUseCase._ocr_text(
+                ocr_service, deadline, "ocr_without_text", header_only=False
+            )
         if not raw_text:
             return None
 
@@ -20,20 +114,39 @@ class ParseInvoiceUseCase:
 
         # Extract data via DataExtractionService
         data_extraction_service = DataExtractionService(
-            file_content=file_content, raw_text=raw_text, own_cuit=own_cuit
+            file_content=file_content,
+            raw_text=raw_text,
+            own_cuit=own_cuit,
+            settings=settings,
+            deadline=deadline,
+            guard=guard,
+            index=index,
+            profile=profile,
         )
         invoice_data = data_extraction_service.parse()
         if not invoice_data:
             return None
+        if invoice_data.from_index:
+            invoice_data.skipped_stages = deadline.skipped + guard.degraded
+            profiling.tag_path(profiling.PATH_INDEX)
+            return invoice_data
 
         # If no cuit, tipo_cmp, letra or fecha found, try to extract via OCR from the header
-        if not invoice_data.cuit or not invoice_data.tipo_cmp or not invoice_data.letra:
-            ocr_text = ocr_service.extract_text_with_ocr()
+        needs_ocr = (
+            not invoice_data.cuit or not invoice_data.tipo_cmp or not invoice_data.letra
+        )
+        path = profiling.PATH_QR if invoice_data.qr_decoded else profiling.PATH_REGEX
+        if needs_ocr and settings.ocr_fallback:
+            ocr_text = ParseInvoiceUseCase._ocr_text(
+                ocr_service,
+                deadline,
+                "ocr_fallback",
+                header_only=not settings.ocr_full_page,
+            )
             if ocr_text:
-                ocr_data_extraction_service = DataExtractionService(
-                    file_content=file_content, raw_text=ocr_text, own_cuit=own_cuit
-                )
-                ocr_invoice_data = ocr_data_extraction_service.parse()
+                path = profiling.PATH_OCR_FALLBACK
+                # The QR scan already ran on this file, only the text is new
+                ocr_invoice_data = RegexParser(ocr_text, own_cuit=own_cuit).extract_data()
                 if ocr_invoice_data:
                     if not invoice_data.cuit:
                         invoice_data.cuit = ocr_invoice_data.cuit
@@ -44,4 +157,9 @@ class ParseInvoiceUseCase:
                     if not invoice_data.fecha:
                         invoice_data.fecha = ocr_invoice_data.fecha
 
+        invoice_data.skipped_stages = deadline.skipped + guard.degraded
+        # Partial results are not worth serving again
+        if index and not invoice_data.skipped_stages:
+            index.put(invoice_data, profile)
+        profiling.tag_path(path)
         return invoice_data
@@ -1,3 +1,41 @@
 from .core import setup_logging
+from .cpu import (
+    CPUBudget,
+    add_cpu_budget_args,
+    budget_from_args,
+    resolve_cpu_budget,
+)
+from .deadline import Deadline
+from .limits import ResourceGuard, ResourceLimitExceeded, ResourceLimits
+from .metrics import METRICS, Counters
+from .preload import preload_dependencies
+from .profiling import PROFILER_MODES, Profiler, tag_path, track_path
+from .shm import SharedBuffer, SharedDocument, SharedDocuments, open_shared
+from .validation import INVALID_PDF_CODES, InvalidPDF, ValidatedPDF, validate_pdf
 
-__all__ = ["setup_logging"]
+__all__ = [
+    "setup_logging",
+    "CPUBudget",
+    "add_cpu_budget_args",
+    "budget_from_args",
+    "resolve_cpu_budget",
+    "Deadline",
+    "ResourceGuard",
+    "ResourceLimitExceeded",
+    "ResourceLimits",
+    "METRICS",
+    "Counters",
+    "preload_dependencies",
+    "PROFILER_MODES",
+    "Profiler",
+    "tag_path",
+    "track_path",
+    "SharedBuffer",
+    "SharedDocument",
+    "SharedDocuments",
+    "open_shared",
+    "INVALID_PDF_CODES",
+    "InvalidPDF",
+    "ValidatedPDF",
+    "validate_pdf",
+]
@@ -1,4 +1,7 @@
 import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 
 def setup_logging(debug=False):
@@ -9,3 +12,15 @@ def setup_logging(debug=False):
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
     return logging.getLogger()
+
+
+def env_int(name: str, default: int | None = None) -> int | None:
+    """Positive integer from the environment, ``default`` when unset or invalid."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return default
@@ -0,0 +1,192 @@
+"""CPU budget shared by API workers, process pools and Tesseract threads."""
+
+import argparse
+import logging
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from .core import env_int
+
+logger = logging.getLogger(__name__)
+
+CPU_BUDGET_ENV = "INVOICE_CPU_BUDGET"
+OCR_THREADS_ENV = "INVOICE_OCR_THREADS"
+PAGE_WORKERS_ENV = "INVOICE_PAGE_WORKERS"
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+WORKERS_HELP = "Number of worker processes (default: derived from the CPU budget)"
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> float | None:
+    """Return the CPU quota of the current cgroup (v2 or v1), or None if unlimited."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = root / "cpu.max"
+    if cpu_max.is_file():
+        try:
+            quota, period = cpu_max.read_text().split()[:2]
+            if quota != "max":
+                return int(quota) / int(period)
+        except (OSError, ValueError):
+            pass
+        return None
+
+    # cgroup v1: quota is -1 when unlimited
+    for controller in ("cpu", "cpu,cpuacct"):
+        quota_file = root / controller / "cpu.cfs_quota_us"
+        period_file = root / controller / "cpu.cfs_period_us"
+        if quota_file.is_file() and period_file.is_file():
+            try:
+                quota = int(quota_file.read_text())
+                period = int(period_file.read_text())
+                if quota > 0 and period > 0:
+                    return quota / period
+            except (OSError, ValueError):
+                pass
+            return None
+    return None
+
+
+def available_cpus() -> tuple[int, str]:
+    """CPUs this process may actually use and where the number comes from.
+
+    Takes the smallest of the host core count, the scheduler affinity mask and
+    the cgroup quota, so containers are sized by their limit and not by the host.
+    """
+    cpus, source = os.cpu_count() or 1, "host"
+    try:
+        affinity = len(os.sched_getaffinity(0))
+        if affinity < cpus:
+            cpus, source = affinity, "affinity"
+    except (AttributeError, OSError):
+        pass
+
+    quota = cgroup_cpu_limit()
+    if quota is not None and quota < cpus:
+        # A 1.5 CPU quota still gives room for one busy worker
+        cpus, source = max(1, math.floor(quota)), "cgroup"
+    return cpus, source
+
+
+@dataclass(frozen=True)
+class CPUBudget:
+    """Effective CPU settings: total budget split into workers x OCR threads.
+
+    ``page_workers`` is the pool one worker may use to split the pages of a very
+    large document; it only kicks in above the page threshold (see utils.pages),
+    but each worker owns such a pool, so it is counted per worker like OCR threads.
+    """
+
+    total: int
+    workers: int
+    ocr_threads: int
+    source: str
+    page_workers: int = 1
+
+    def apply(self):
+        """Export per-worker limits so worker processes and Tesseract inherit them."""
+        os.environ["OMP_THREAD_LIMIT"] = str(self.ocr_threads)
+        os.environ[PAGE_WORKERS_ENV] = str(self.page_workers)
+
+    def describe(self) -> str:
+        return (
+            f"CPU budget {self.total} ({self.source}): {self.workers} workers "
+            f"x {self.ocr_threads} OCR threads (OMP_THREAD_LIMIT={self.ocr_threads}), "
+            f"{self.page_workers} page workers per document"
+        )
+
+
+def resolve_cpu_budget(
+    total: int | None = None,
+    workers: int | None = None,
+    ocr_threads: int | None = None,
+    page_workers: int | None = None,
+) -> CPUBudget:
+    """Build the CPU budget from explicit values, environment and detected limits.
+
+    Precedence for each value is argument > environment variable > default. By
+    default every worker gets a single OCR thread and a serial page pool, and there
+    is one worker per CPU, so workers x OCR threads x page workers never exceeds
+    the budget.
+    """
+    if total:
+        source = "argument"
+    elif env_total := env_int(CPU_BUDGET_ENV):
+        total, source = env_total, CPU_BUDGET_ENV
+    else:
+        total, source = available_cpus()
+
+    ocr_threads = ocr_threads or env_int(OCR_THREADS_ENV) or 1
+    ocr_threads = min(ocr_threads, total)
+    page_workers = min(page_workers or env_int(PAGE_WORKERS_ENV) or 1, total)
+    per_worker = ocr_threads * page_workers
+
+    if workers:
+        if workers * per_worker > total:
+            logger.warning(
+                f"{workers} workers x {ocr_threads} OCR threads x {page_workers} "
+                f"page workers exceeds the CPU budget of {total}"
+            )
+    else:
+        workers = max(1, total // per_worker)
+
+    return CPUBudget(
+        total=total,
+        workers=workers,
+        ocr_threads=ocr_threads,
+        source=source,
+        page_workers=page_workers,
+    )
+
+
+def add_cpu_budget_args(
+    parser: argparse.ArgumentParser,
+    page_workers: bool = False,
+    workers_help: str = WORKERS_HELP,
+):
+    """Add the ``--workers``, ``--cpu-budget`` and ``--ocr-threads`` options.
+
+    ``--page-workers`` is only offered where a worker may split the pages of one
+    document; elsewhere documents already run one per worker.
+    """
+    parser.add_argument("--workers", type=int, default=None, help=workers_help)
+    parser.add_argument(
+        "--cpu-budget",
+        type=int,
+        default=None,
+        help=f"Total CPUs to use (default: ${CPU_BUDGET_ENV} or cgroup/affinity limit)",
+    )
+    parser.add_argument(
+        "--ocr-threads",
+        type=int,
+        default=None,
+        help=f"Tesseract threads per worker (default: ${OCR_THREADS_ENV} or 1)",
+    )
+    if page_workers:
+        parser.add_argument(
+            "--page-workers",
+            type=int,
+            default=None,
+            help="Workers splitting the pages of very large PDFs "
+            f"(default: ${PAGE_WORKERS_ENV} or 1)",
+        )
+
+
+def budget_from_args(
+    args: argparse.Namespace, log: logging.Logger, workers: int | None = None
+) -> CPUBudget:
+    """Resolve the budget of the ``add_cpu_budget_args`` options, apply and log it.
+
+    ``workers`` overrides ``--workers``. Without a ``--page-workers`` option the
+    pages of each document are processed serially.
+    """
+    budget = resolve_cpu_budget(
+        total=args.cpu_budget,
+        workers=workers or args.workers,
+        ocr_threads=args.ocr_threads,
+        page_workers=getattr(args, "page_workers", 1),
+    )
+    budget.apply()
+    log.info(budget.describe())
+    return budget
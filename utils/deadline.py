@@ -0,0 +1,32 @@
+import time
+
+
+class Deadline:
+    """Time budget of a single parse, shared by every pipeline stage.
+
+    Stages ask ``allows(cost)`` before doing expensive work and call ``skip(stage)``
+    when they give up, so the caller can report which stages did not run.
+    """
+
+    def __init__(self, seconds: float | None = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.skipped: list[str] = []
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None when there is no budget."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def allows(self, seconds: float) -> bool:
+        """True if at least ``seconds`` remain."""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def skip(self, stage: str):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
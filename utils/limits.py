@@ -0,0 +1,157 @@
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGES_ENV = "INVOICE_MAX_PAGES"
+MAX_IMAGE_PIXELS_ENV = "INVOICE_MAX_IMAGE_PIXELS"
+MAX_TOTAL_PIXELS_ENV = "INVOICE_MAX_TOTAL_PIXELS"
+MAX_RSS_MB_ENV = "INVOICE_MAX_RSS_MB"
+
+MiB = 1024 * 1024
+
+
+class ResourceLimitExceeded(Exception):
+    """A document needs more resources than allowed and cannot be degraded further."""
+
+    def __init__(self, limit: str, message: str):
+        super().__init__(message)
+        self.limit = limit
+
+    def __reduce__(self):
+        # Raised in worker processes, must survive the trip back
+        return type(self), (self.limit, str(self))
+
+
+def _env_limit(name: str, default: int) -> int:
+    """Non-negative integer from the environment, 0 disables the limit."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(0, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}")
+        return default
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes, None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Per-document limits, 0 disables a limit.
+
+    ``max_pages`` truncates the pages read, ``max_image_pixels`` bounds a single
+    bitmap (embedded image, rendered page or OCR page, larger ones are downscaled
+    or skipped), ``max_total_pixels`` bounds all bitmaps decoded for one document
+    and ``max_rss_mb`` the growth of the worker's memory while parsing it.
+    """
+
+    max_pages: int = 200
+    max_image_pixels: int = 40_000_000
+    max_total_pixels: int = 300_000_000
+    max_rss_mb: int = 1024
+
+    @classmethod
+    def from_env(cls) -> "ResourceLimits":
+        return cls(
+            max_pages=_env_limit(MAX_PAGES_ENV, cls.max_pages),
+            max_image_pixels=_env_limit(MAX_IMAGE_PIXELS_ENV, cls.max_image_pixels),
+            max_total_pixels=_env_limit(MAX_TOTAL_PIXELS_ENV, cls.max_total_pixels),
+            max_rss_mb=_env_limit(MAX_RSS_MB_ENV, cls.max_rss_mb),
+        )
+
+
+class ResourceGuard:
+    """Resource limits of a single parse, shared by every pipeline stage.
+
+    Stages ask the guard before expensive work and degrade (truncate, downscale,
+    skip) when it says no. Each limit tripped is counted once per document in
+    ``METRICS`` as ``guard.<name>`` and listed in ``degraded``, however many stages
+    run into it; only the memory limit rejects the document.
+    """
+
+    def __init__(self, limits: ResourceLimits | None = None):
+        self.limits = limits or ResourceLimits.from_env()
+        self.pixels = 0
+        self.exhausted = False
+        self.degraded: list[str] = []
+        self._rss_start = current_rss()
+        self._lock = threading.Lock()
+
+    def trip(self, name: str, message: str):
+        with self._lock:
+            first_trip = name not in self.degraded
+            if first_trip:
+                self.degraded.append(name)
+        if not first_trip:
+            logger.debug(message)
+            return
+        METRICS.increment(f"guard.{name}")
+        logger.warning(message)
+
+    def pages(self, page_count: int) -> int:
+        """Number of pages to process out of ``page_count``."""
+        max_pages = self.limits.max_pages
+        if max_pages and page_count > max_pages:
+            self.trip(
+                "pages_truncated",
+                f"Document has {page_count} pages, processing the first {max_pages}",
+            )
+            return max_pages
+        return page_count
+
+    def image_scale(self, width: float, height: float) -> float:
+        """Factor (at most 1) that brings a ``width`` x ``height`` bitmap within limits."""
+        max_pixels = self.limits.max_image_pixels
+        pixels = width * height
+        if not max_pixels or pixels <= max_pixels:
+            return 1.0
+        return math.sqrt(max_pixels / pixels)
+
+    def reserve_pixels(self, pixels: int) -> bool:
+        """Account for a bitmap about to be decoded, False once the budget is spent."""
+        max_total = self.limits.max_total_pixels
+        with self._lock:
+            if not self.exhausted and (
+                not max_total or self.pixels + pixels <= max_total
+            ):
+                self.pixels += pixels
+                return True
+            first_trip = not self.exhausted
+            self.exhausted = True
+        if first_trip:
+            self.trip(
+                "pixel_budget_exhausted",
+                f"Decoded {self.pixels} pixels, not decoding more bitmaps",
+            )
+        return False
+
+    def check_memory(self, stage: str):
+        """Raise ``ResourceLimitExceeded`` if memory grew beyond the limit."""
+        max_rss_mb = self.limits.max_rss_mb
+        if not max_rss_mb or self._rss_start is None:
+            return
+        rss = current_rss()
+        if rss is None:
+            return
+        growth_mb = (rss - self._rss_start) / MiB
+        if growth_mb > max_rss_mb:
+            METRICS.increment("guard.rss_exceeded")
+            raise ResourceLimitExceeded(
+                "rss",
+                f"Memory grew by {growth_mb:.0f} MiB during {stage}, "
+                f"above the {max_rss_mb} MiB limit",
+            )
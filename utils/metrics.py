@@ -0,0 +1,34 @@
+import threading
+from collections import Counter
+
+
+class Counters:
+    """Thread-safe named counters of one process (exposed by the API on /metrics)."""
+
+    def __init__(self):
+        self._counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counts[name]
+
+    def snapshot(self, prefix: str = "") -> dict[str, int]:
+        """Current values, optionally only those whose name starts with ``prefix``."""
+        with self._lock:
+            return {
+                name: count
+                for name, count in sorted(self._counts.items())
+                if name.startswith(prefix)
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+METRICS = Counters()
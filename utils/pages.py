@@ -0,0 +1,75 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .core import env_int
+from .cpu import PAGE_WORKERS_ENV
+
+PARALLEL_THRESHOLD_ENV = "INVOICE_PARALLEL_PAGE_THRESHOLD"
+DEFAULT_PARALLEL_THRESHOLD = 40
+
+_executors: dict[tuple[str, int], Executor] = {}
+_executors_lock = threading.Lock()
+
+
+def page_workers() -> int:
+    """Workers to split the pages of one document across (1 = serial)."""
+    return env_int(PAGE_WORKERS_ENV, 1)
+
+
+def parallel_page_threshold() -> int:
+    """Documents with fewer pages than this are always processed serially."""
+    return env_int(PARALLEL_THRESHOLD_ENV, DEFAULT_PARALLEL_THRESHOLD)
+
+
+def use_parallel_pages(page_count: int) -> bool:
+    return page_workers() > 1 and page_count >= parallel_page_threshold()
+
+
+def page_chunks(page_count: int, chunks: int) -> list[range]:
+    """Split ``range(page_count)`` into up to ``chunks`` contiguous ranges."""
+    chunks = max(1, min(chunks, page_count))
+    size, extra = divmod(page_count, chunks)
+    ranges, start = [], 0
+    for index in range(chunks):
+        stop = start + size + (1 if index < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def page_executor(kind: str, workers: int) -> Executor:
+    """Shared pool for page-level work: ``"thread"`` or ``"process"``.
+
+    Thread pools are for work that releases the GIL (pyzbar, PIL); process pools
+    for pure Python work such as pdfplumber. Process pools use the forkserver
+    start method, forking a process that already runs threads is unsafe.
+    """
+    key = (kind, workers)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            if kind == "thread":
+                executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="page"
+                )
+            else:
+                method = (
+                    "forkserver"
+                    if "forkserver" in multiprocessing.get_all_start_methods()
+                    else "spawn"
+                )
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context(method)
+                )
+            _executors[key] = executor
+    return executor
+
+
+@atexit.register
+def _shutdown_executors():
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
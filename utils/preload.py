@@ -0,0 +1,23 @@
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the parsers and services, preload them in long-running processes
+PDF_STACK_MODULES = (
+    "pdfplumber",
+    "pytesseract",
+    "pdf2image",
+    "pymupdf",
+    "PIL.Image",
+    "pyzbar.pyzbar",
+)
+
+
+def preload_dependencies(modules: tuple[str, ...] = PDF_STACK_MODULES):
+    """Import the heavy PDF/OCR stack up front so the first parse does not pay for it."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Could not preload {module}: {e}")
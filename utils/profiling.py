@@ -0,0 +1,268 @@
+"""Per-document profiling (cProfile or stack sampling) aggregated by pipeline path."""
+
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILER_MODES = ("cprofile", "sample")
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 30
+
+# Pipeline paths a document can take, set by the parse use case
+PATH_QR = "qr"
+PATH_REGEX = "regex"
+PATH_OCR_FALLBACK = "ocr_fallback"
+PATH_INDEX = "index"
+PATH_NONE = "no_data"
+
+_current: ContextVar["_Document | None"] = ContextVar("profiled_document", default=None)
+
+# cProfile hooks are process-wide since Python 3.12, profile one document at a time
+_cprofile_lock = threading.Lock()
+
+# Frames of these files sit between a profiled with block and the profiler
+_INTERNAL_FILES = {__file__, contextlib.__file__}
+
+
+def tag_path(path: str):
+    """Record the pipeline path of the document being profiled, if any."""
+    document = _current.get()
+    if document is not None:
+        document.path = path
+
+
+class _Document:
+    def __init__(self):
+        self.path = PATH_NONE
+
+
+@contextmanager
+def track_path():
+    """Collect the pipeline path tagged by the code run inside the block."""
+    document = _Document()
+    token = _current.set(document)
+    try:
+        yield document
+    finally:
+        _current.reset(token)
+
+
+class _RawStats:
+    """Adapter letting ``pstats.Stats`` load a raw stats dict."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _block_frame(frame):
+    """First frame in ``frame``'s stack outside this module and contextlib.
+
+    Called from a context manager of this module, that is the frame running the
+    ``with`` block.
+    """
+    while frame is not None and frame.f_code.co_filename in _INTERNAL_FILES:
+        frame = frame.f_back
+    return frame
+
+
+def _stack_depth(frame) -> int:
+    depth = 0
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+class _Sampler(threading.Thread):
+    """Samples the stack of one thread every ``interval`` seconds.
+
+    The ``skip`` outermost frames (those above the profiled block) are dropped.
+    """
+
+    def __init__(self, thread_id: int, interval: float, skip: int = 0):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.skip = skip
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get("__name__", "?")
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            stack = stack[::-1][self.skip :]
+            if stack:
+                self.stacks[";".join(stack)] += 1
+
+    def stop(self) -> Counter[str]:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+class Profiler:
+    """Profiles documents one by one and aggregates the results per pipeline path.
+
+    ``data`` is a plain picklable dict so batch workers can send theirs back to be
+    combined with ``merge``. ``write`` produces the hotspot report and, for the
+    sampling mode, a collapsed-stack file (one ``path;frame;...;frame count`` line
+    per stack) for flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, mode: str = "sample", interval: float = DEFAULT_INTERVAL):
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Unknown profiler {mode!r}, use one of {PROFILER_MODES}")
+        self.mode = mode
+        self.interval = interval
+        self.data: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _path_data(self, path: str) -> dict:
+        return self.data.setdefault(
+            path, {"documents": 0, "seconds": 0.0, "stats": {}, "stacks": Counter()}
+        )
+
+    @contextmanager
+    def document(self):
+        """Profile the code run inside the block as one document."""
+        caller = _block_frame(sys._getframe())
+        with track_path() as document:
+            yield from self._profile(document, caller)
+
+    def _profile(self, document: _Document, caller):
+        profile = sampler = None
+        if self.mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                profile = cProfile.Profile()
+                profile.enable()
+        else:
+            # Only the frames below the with block are sampled
+            sampler = _Sampler(
+                threading.get_ident(), self.interval, skip=_stack_depth(caller) - 1
+            )
+            sampler.start()
+
+        started = time.perf_counter()
+        try:
+            yield document
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                _cprofile_lock.release()
+                profile.create_stats()
+                self._add(document.path, elapsed, stats=profile.stats)
+            elif sampler is not None:
+                self._add(document.path, elapsed, stacks=sampler.stop())
+            else:
+                logger.debug("Another document is being profiled, not profiling this one")
+
+    def _add(self, path: str, seconds: float, stats=None, stacks=None):
+        self.merge(
+            {
+                path: {
+                    "documents": 1,
+                    "seconds": seconds,
+                    "stats": stats or {},
+                    "stacks": stacks or Counter(),
+                }
+            }
+        )
+
+    def merge(self, data: dict[str, dict]):
+        """Add the ``data`` of another profiler (e.g. from a batch worker)."""
+        with self._lock:
+            for path, other in data.items():
+                own = self._path_data(path)
+                own["documents"] += other["documents"]
+                own["seconds"] += other["seconds"]
+                own["stacks"].update(other["stacks"])
+                if other["stats"]:
+                    stats = pstats.Stats(_RawStats(dict(other["stats"])))
+                    if own["stats"]:
+                        stats.add(_RawStats(own["stats"]))
+                    own["stats"] = stats.stats
+
+    def report(self, top: int = DEFAULT_TOP) -> str:
+        """Top-``top`` hotspots per pipeline path."""
+        out = io.StringIO()
+        with self._lock:
+            for path, data in sorted(self.data.items()):
+                documents = data["documents"]
+                out.write(
+                    f"=== {path}: {documents} documents, {data['seconds']:.2f}s "
+                    f"({data['seconds'] / max(documents, 1):.3f}s/doc) ===\n"
+                )
+                if self.mode == "cprofile":
+                    if data["stats"]:
+                        stats = pstats.Stats(_RawStats(data["stats"]), stream=out)
+                        stats.sort_stats("tottime").print_stats(top)
+                else:
+                    self._write_samples(out, data["stacks"], top)
+                out.write("\n")
+        return out.getvalue()
+
+    @staticmethod
+    def _write_samples(out, stacks: Counter[str], top: int):
+        total = sum(stacks.values())
+        if not total:
+            out.write("no samples\n")
+            return
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        out.write(f"{total} samples\n{'own %':>7} {'total %':>8}  function\n")
+        for frame, count in own.most_common(top):
+            out.write(
+                f"{100 * count / total:>6.1f}% {100 * inclusive[frame] / total:>7.1f}%"
+                f"  {frame}\n"
+            )
+
+    def write(self, output_dir: str | os.PathLike, top: int = DEFAULT_TOP) -> list[Path]:
+        """Write the report and the raw profiles to ``output_dir``, return the files."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        report = output_dir / "report.txt"
+        report.write_text(self.report(top))
+        written = [report]
+
+        with self._lock:
+            if self.mode == "cprofile":
+                for path, data in sorted(self.data.items()):
+                    if data["stats"]:
+                        prof = output_dir / f"{path}.prof"
+                        pstats.Stats(_RawStats(data["stats"])).dump_stats(prof)
+                        written.append(prof)
+            else:
+                collapsed = output_dir / "stacks.collapsed"
+                with open(collapsed, "w") as f:
+                    for path, data in sorted(self.data.items()):
+                        for stack, count in sorted(data["stacks"].items()):
+                            f.write(f"{path};{stack} {count}\n")
+                written.append(collapsed)
+        return written
@@ -0,0 +1,158 @@
+"""Hand PDF bytes to worker processes through shared memory instead of pickling them."""
+
+import io
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SharedDocument:
+    """Picklable reference to a document held in a shared memory segment."""
+
+    name: str
+    size: int
+    # What the document is called in logs and results (path, zip member, ...)
+    label: str
+
+
+class SharedBuffer(io.BytesIO):
+    """Read-only ``BytesIO`` over a memory view, without copying it.
+
+    ``getvalue()`` returns the view itself, so PyMuPDF opens the document in
+    place; ``read`` and ``seek`` serve stream readers such as pdfplumber.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def getvalue(self) -> memoryview:
+        return self._view
+
+    def getbuffer(self) -> memoryview:
+        return self._view
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return False
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def read(self, size: int | None = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        data = bytes(self._view[self._position : end])
+        self._position += len(data)
+        return data
+
+    read1 = read
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position : self._position + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def readline(self, size: int | None = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        chunk = self._view[self._position : end]
+        newline = bytes(chunk).find(b"\n")
+        if newline >= 0:
+            chunk = chunk[: newline + 1]
+        return self.read(len(chunk))
+
+    def write(self, data):
+        raise io.UnsupportedOperation("SharedBuffer is read-only")
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+class SharedDocuments:
+    """Owner of the shared memory segments handed to worker processes.
+
+    The parent process ``put``s each document once and ``release``s it when the
+    worker is done with it; leaving the ``with`` block releases the rest. Workers
+    only attach to the segments (``open_shared``), they never unlink them.
+    """
+
+    def __init__(self):
+        self._segments: dict[str, SharedMemory] = {}
+        # Bytes of the documents currently held, /dev/shm is small in containers
+        self.nbytes = 0
+
+    def put(self, data: bytes, label: str = "") -> SharedDocument:
+        segment = SharedMemory(create=True, size=max(1, len(data)))
+        segment.buf[: len(data)] = data
+        self._segments[segment.name] = segment
+        self.nbytes += len(data)
+        return SharedDocument(segment.name, len(data), label)
+
+    def release(self, document: SharedDocument):
+        segment = self._segments.pop(document.name, None)
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+            self.nbytes -= document.size
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def __enter__(self) -> "SharedDocuments":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def open_shared(document: SharedDocument) -> Iterator[SharedBuffer]:
+    """Attach to ``document`` from a worker and read it in place.
+
+    Everything opened from the buffer (PyMuPDF documents, ...) must be gone when
+    the block ends, the mapping cannot be closed while views of it are alive.
+    """
+    # The parent owns the segment, do not let this process' tracker unlink it
+    segment = SharedMemory(name=document.name, track=False)
+    buffer = SharedBuffer(segment.buf[: document.size])
+    try:
+        yield buffer
+    finally:
+        try:
+            buffer.close()
+            segment.close()
+        except BufferError:
+            # Still referenced somewhere, the mapping goes away with the last view
+            logger.warning(f"Shared document {document.label} still in use on close")
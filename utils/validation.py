@@ -0,0 +1,83 @@
+"""Up-front classification of uploads, before any parsing engine sees them."""
+
+import logging
+from dataclasses import dataclass
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Rejection reasons, counted as invalid_pdf.<code>
+EMPTY = "empty"
+NOT_PDF = "not_pdf"
+TRUNCATED = "truncated"
+CORRUPT = "corrupt"
+ENCRYPTED = "encrypted"
+NO_PAGES = "no_pages"
+INVALID_PDF_CODES = (EMPTY, NOT_PDF, TRUNCATED, CORRUPT, ENCRYPTED, NO_PAGES)
+
+# The header may follow some junk, the trailer may be followed by padding
+HEADER_WINDOW = 1024
+TRAILER_WINDOW = 2048
+
+
+class InvalidPDF(Exception):
+    """The input cannot be parsed at all, ``code`` is one of ``INVALID_PDF_CODES``."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+    def __reduce__(self):
+        # Raised in worker processes, must survive the trip back
+        return type(self), (self.code, str(self))
+
+
+@dataclass(frozen=True)
+class ValidatedPDF:
+    page_count: int
+    # Clean copy of a damaged file MuPDF had to repair, None when it was sound
+    repaired: bytes | None = None
+
+
+def _reject(code: str, message: str):
+    METRICS.increment(f"invalid_pdf.{code}")
+    raise InvalidPDF(code, message)
+
+
+def validate_pdf(data: bytes | memoryview) -> ValidatedPDF:
+    """Classify ``data`` once, before the text, QR and OCR engines try it.
+
+    Raises ``InvalidPDF`` for empty input, non-PDF bytes, truncated or corrupt
+    files MuPDF cannot repair, documents that need a password and documents
+    without pages. Header and trailer checks cost microseconds; MuPDF then only
+    reads the xref and the page tree. Files with a damaged xref that MuPDF
+    repairs are accepted with a clean copy (pdfminer and poppler would fail on
+    the original) and counted as ``pdf.repaired``.
+    """
+    if not len(data):
+        _reject(EMPTY, "The file is empty")
+    if b"%PDF-" not in bytes(data[:HEADER_WINDOW]):
+        _reject(NOT_PDF, "The file is not a PDF (no %PDF- header)")
+    # Without the trailer MuPDF can only rebuild the xref from the objects
+    truncated = b"%%EOF" not in bytes(data[-TRAILER_WINDOW:])
+
+    import pymupdf
+
+    try:
+        with pymupdf.open(stream=data, filetype="pdf") as doc:
+            if doc.needs_pass:
+                _reject(ENCRYPTED, "The PDF is password-protected")
+            if not doc.page_count:
+                _reject(NO_PAGES, "The PDF has no pages")
+            if not doc.is_repaired:
+                return ValidatedPDF(doc.page_count)
+            logger.info("Damaged PDF cross-reference table, using a repaired copy")
+            METRICS.increment("pdf.repaired")
+            return ValidatedPDF(doc.page_count, doc.tobytes())
+    except InvalidPDF:
+        raise
+    except Exception as e:
+        if truncated:
+            _reject(TRUNCATED, f"The PDF is truncated and cannot be repaired: {e}")
+        _reject(CORRUPT, f"The PDF is corrupt: {e}")